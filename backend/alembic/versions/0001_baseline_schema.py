@@ -0,0 +1,121 @@
+"""baseline schema
+
+Tables as created by Base.metadata.create_all before migrations were
+introduced; existing databases are stamped at this revision.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 17:02:16.890337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('reset_password_token', sa.String(length=255), nullable=True),
+    sa.Column('reset_password_token_expiry', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_reset_password_token'), ['reset_password_token'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_username'), ['username'], unique=True)
+
+    op.create_table('fields',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('location', sa.String(length=255), nullable=True),
+    sa.Column('area', sa.Float(), nullable=True),
+    sa.Column('planting_date', sa.Date(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('fields', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_fields_id'), ['id'], unique=False)
+
+    op.create_table('photo_groups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('field_id', sa.Integer(), nullable=False),
+    sa.Column('capture_date', sa.Date(), nullable=False),
+    sa.Column('rice_variety', sa.String(length=100), nullable=True),
+    sa.Column('drone_photo_path', sa.String(length=512), nullable=False),
+    sa.Column('side_photo_05m_path', sa.String(length=512), nullable=False),
+    sa.Column('side_photo_3m_horizontal_path', sa.String(length=512), nullable=False),
+    sa.Column('side_photo_3m_vertical_path', sa.String(length=512), nullable=False),
+    sa.Column('analysis_status', sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='analysisstatusenum'), nullable=True),
+    sa.Column('celery_task_id', sa.String(length=255), nullable=True),
+    sa.Column('uploaded_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['field_id'], ['fields.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('photo_groups', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_photo_groups_celery_task_id'), ['celery_task_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_photo_groups_id'), ['id'], unique=False)
+
+    op.create_table('analysis_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('photo_group_id', sa.Integer(), nullable=False),
+    sa.Column('coverage', sa.Float(), nullable=True),
+    sa.Column('avg_plant_height', sa.Float(), nullable=True),
+    sa.Column('height_std_dev', sa.Float(), nullable=True),
+    sa.Column('canopy_color_index', sa.Float(), nullable=True),
+    sa.Column('uniformity_index', sa.Float(), nullable=True),
+    sa.Column('tiller_density_estimate', sa.Float(), nullable=True),
+    sa.Column('panicles_per_mu', sa.Float(), nullable=True),
+    sa.Column('est_basic_seedlings_per_mu', sa.Float(), nullable=True),
+    sa.Column('lodging_status', sa.String(length=100), nullable=True),
+    sa.Column('estimated_leaf_age', sa.Float(), nullable=True),
+    sa.Column('estimated_tillers_per_plant', sa.Float(), nullable=True),
+    sa.Column('notes', sa.String(length=1000), nullable=True),
+    sa.Column('gemini_analysis_text', sa.Text(), nullable=True),
+    sa.Column('gemini_suggestions', sa.Text(), nullable=True),
+    sa.Column('pest_risk', sa.String(length=100), nullable=True),
+    sa.Column('leaf_color_health', sa.String(length=100), nullable=True),
+    sa.Column('analysis_time', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['photo_group_id'], ['photo_groups.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('photo_group_id')
+    )
+    with op.batch_alter_table('analysis_results', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_analysis_results_id'), ['id'], unique=False)
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('analysis_results', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_analysis_results_id'))
+
+    op.drop_table('analysis_results')
+    with op.batch_alter_table('photo_groups', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_photo_groups_id'))
+        batch_op.drop_index(batch_op.f('ix_photo_groups_celery_task_id'))
+
+    op.drop_table('photo_groups')
+    with op.batch_alter_table('fields', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_fields_id'))
+
+    op.drop_table('fields')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username'))
+        batch_op.drop_index(batch_op.f('ix_users_reset_password_token'))
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+
+    op.drop_table('users')
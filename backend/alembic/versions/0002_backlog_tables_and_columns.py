@@ -0,0 +1,169 @@
+"""backlog tables and columns
+
+Step cache, staged analysis results, resumable upload sessions,
+content-addressed blobs, bulk upload batches and the photo metadata columns.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:03:04.586836
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('step_result_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('step', sa.String(length=50), nullable=False),
+    sa.Column('result_json', sa.Text(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('last_accessed_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('step_result_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_step_result_cache_cache_key'), ['cache_key'], unique=True)
+        batch_op.create_index(batch_op.f('ix_step_result_cache_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_step_result_cache_last_accessed_at'), ['last_accessed_at'], unique=False)
+
+    op.create_table('stored_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_table('upload_batches',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('group_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('upload_batches', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_upload_batches_owner_id'), ['owner_id'], unique=False)
+
+    op.create_table('analysis_stage_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('photo_group_id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(length=50), nullable=False),
+    sa.Column('result_json', sa.Text(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['photo_group_id'], ['photo_groups.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('photo_group_id', 'stage', name='uq_stage_result_group_stage')
+    )
+    with op.batch_alter_table('analysis_stage_results', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_analysis_stage_results_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_analysis_stage_results_photo_group_id'), ['photo_group_id'], unique=False)
+
+    op.create_table('upload_sessions',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('field_id', sa.Integer(), nullable=False),
+    sa.Column('capture_date', sa.Date(), nullable=False),
+    sa.Column('rice_variety', sa.String(length=100), nullable=True),
+    sa.Column('files', sa.JSON(), nullable=False),
+    sa.Column('chunk_size', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('ACTIVE', 'FINALIZING', 'COMPLETED', name='uploadsessionstatusenum'), nullable=False),
+    sa.Column('photo_group_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['field_id'], ['fields.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['photo_group_id'], ['photo_groups.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_upload_sessions_expires_at'), ['expires_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_upload_sessions_owner_id'), ['owner_id'], unique=False)
+
+    op.create_table('upload_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.String(length=32), nullable=False),
+    sa.Column('photo', sa.String(length=50), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['upload_sessions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'photo', 'chunk_index', name='uq_upload_chunk')
+    )
+    with op.batch_alter_table('upload_chunks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_upload_chunks_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_upload_chunks_session_id'), ['session_id'], unique=False)
+
+    with op.batch_alter_table('analysis_results', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seedlings_per_mu', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('estimated_row_spacing_cm', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('estimated_plant_spacing_cm', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('is_provisional', sa.Boolean(), server_default='false', nullable=False))
+
+    with op.batch_alter_table('photo_groups', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('photo_checksums', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('photo_metadata', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('photo_derivatives', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('derivatives_generated_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('batch_id', sa.String(length=32), nullable=True))
+        batch_op.create_index(batch_op.f('ix_photo_groups_batch_id'), ['batch_id'], unique=False)
+        batch_op.create_foreign_key('fk_photo_groups_batch_id_upload_batches', 'upload_batches', ['batch_id'], ['id'], ondelete='SET NULL')
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('photo_groups', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_photo_groups_batch_id_upload_batches', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_photo_groups_batch_id'))
+        batch_op.drop_column('batch_id')
+        batch_op.drop_column('derivatives_generated_at')
+        batch_op.drop_column('photo_derivatives')
+        batch_op.drop_column('photo_metadata')
+        batch_op.drop_column('photo_checksums')
+
+    with op.batch_alter_table('analysis_results', schema=None) as batch_op:
+        batch_op.drop_column('is_provisional')
+        batch_op.drop_column('estimated_plant_spacing_cm')
+        batch_op.drop_column('estimated_row_spacing_cm')
+        batch_op.drop_column('seedlings_per_mu')
+
+    with op.batch_alter_table('upload_chunks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_chunks_session_id'))
+        batch_op.drop_index(batch_op.f('ix_upload_chunks_id'))
+
+    op.drop_table('upload_chunks')
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_owner_id'))
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_expires_at'))
+
+    op.drop_table('upload_sessions')
+    with op.batch_alter_table('analysis_stage_results', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_analysis_stage_results_photo_group_id'))
+        batch_op.drop_index(batch_op.f('ix_analysis_stage_results_id'))
+
+    op.drop_table('analysis_stage_results')
+    with op.batch_alter_table('upload_batches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_batches_owner_id'))
+
+    op.drop_table('upload_batches')
+    op.drop_table('stored_blobs')
+    with op.batch_alter_table('step_result_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_step_result_cache_last_accessed_at'))
+        batch_op.drop_index(batch_op.f('ix_step_result_cache_id'))
+        batch_op.drop_index(batch_op.f('ix_step_result_cache_cache_key'))
+
+    op.drop_table('step_result_cache')
@@ -0,0 +1,41 @@
+"""time series indexes
+
+Fields by owner, a field's photo groups by capture date, and a covering
+(capture_date, field_id, id) index for the cross-field period queries.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 17:03:20.442124
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('fields', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_fields_owner_id'), ['owner_id'], unique=False)
+
+    with op.batch_alter_table('photo_groups', schema=None) as batch_op:
+        batch_op.create_index('ix_photo_groups_capture_date_field_id_id', ['capture_date', 'field_id', 'id'], unique=False)
+        batch_op.create_index('ix_photo_groups_field_id_capture_date', ['field_id', 'capture_date'], unique=False)
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('photo_groups', schema=None) as batch_op:
+        batch_op.drop_index('ix_photo_groups_field_id_capture_date')
+        batch_op.drop_index('ix_photo_groups_capture_date_field_id_id')
+
+    with op.batch_alter_table('fields', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_fields_owner_id'))
+
@@ -0,0 +1,47 @@
+"""field period stats
+
+Per-field dekad rollup of the numeric indicators, read by the inter-field
+comparison summary. Existing results are not aggregated here: run
+`python -m app.scripts.rebuild_field_period_stats` after upgrading.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 17:20:50.633622
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('field_period_stats',
+    sa.Column('field_id', sa.Integer(), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('indicator', sa.String(length=50), nullable=False),
+    sa.Column('value_count', sa.Integer(), nullable=False),
+    sa.Column('value_sum', sa.Float(), nullable=False),
+    sa.Column('value_min', sa.Float(), nullable=False),
+    sa.Column('value_max', sa.Float(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['field_id'], ['fields.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('field_id', 'period_start', 'indicator')
+    )
+    with op.batch_alter_table('field_period_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_field_period_stats_period_start_indicator_field_id', ['period_start', 'indicator', 'field_id'], unique=False)
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('field_period_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_field_period_stats_period_start_indicator_field_id')
+
+    op.drop_table('field_period_stats')
@@ -0,0 +1,33 @@
+"""analysis result cell grid
+
+Per-cell coverage/ExG/G/R grids of the drone photo, served by the growth
+heatmap. Results analysed earlier keep NULL and are shown uniformly.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:28:47.534866
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('analysis_results', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cell_grid', sa.Text(), nullable=True))
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('analysis_results', schema=None) as batch_op:
+        batch_op.drop_column('cell_grid')
+
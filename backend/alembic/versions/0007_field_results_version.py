@@ -0,0 +1,31 @@
+"""field results version
+
+Counter bumped whenever a photo group or analysis result of the field is
+written; ETags of the result listings and the heatmap cache derive from it.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 17:43:00.713162
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('fields', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('results_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('fields', schema=None) as batch_op:
+        batch_op.drop_column('results_version')
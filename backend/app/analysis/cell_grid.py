@@ -0,0 +1,100 @@
+import base64
+import io
+from typing import Tuple
+
+import numpy as np
+
+# Per-cell grids of a drone photo, as computed by DroneViewAccumulator: one
+# float32 layer per channel, row 0 at the top of the image. They are stored
+# on the analysis result as base64 text of a .npy array of shape
+# (len(CHANNELS), rows, cols), so they also pass through the JSON step cache
+# and stage checkpoints unchanged (5x5 cells: ~0.6 kB, 200x200: ~640 kB).
+
+CHANNELS = ("coverage", "exg", "gr_ratio")
+
+# Neighbourhood (per side, in source cells) each interpolated point is weighted over
+IDW_NEIGHBOURS = 4
+IDW_POWER = 2.0
+
+
+def encode(grids: np.ndarray) -> str:
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(grids, dtype=np.float32), allow_pickle=False)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def decode(text: str) -> np.ndarray:
+    """The (channel, row, col) float32 array of `encode`; raises ValueError if malformed."""
+    grids = np.load(io.BytesIO(base64.b64decode(text)), allow_pickle=False)
+    if grids.ndim != 3 or grids.shape[0] != len(CHANNELS):
+        raise ValueError(f"Expected a ({len(CHANNELS)}, rows, cols) grid, got shape {grids.shape}")
+    return grids
+
+
+def _bin_starts(source: int, target: int) -> np.ndarray:
+    """Start index of each of `target` near-equal consecutive bins over `source` cells."""
+    return (np.arange(target) * source) // target
+
+
+def downsample(grid: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """Area mean of a 2-D grid onto a coarser rows x cols grid (bins differ by at most one cell)."""
+    row_starts = _bin_starts(grid.shape[0], rows)
+    col_starts = _bin_starts(grid.shape[1], cols)
+    sums = np.add.reduceat(np.add.reduceat(grid, col_starts, axis=1, dtype=np.float64), row_starts, axis=0)
+    counts = np.outer(np.diff(np.append(row_starts, grid.shape[0])), np.diff(np.append(col_starts, grid.shape[1])))
+    return (sums / counts).astype(np.float32)
+
+
+def idw(grid: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """
+    Inverse distance weighted interpolation of a 2-D grid onto rows x cols
+    cell centres, each from the IDW_NEIGHBOURS x IDW_NEIGHBOURS nearest source
+    cells (all at once: no per-point Python loop). A target centre that falls
+    on a source centre takes its value exactly.
+    """
+    source_rows, source_cols = grid.shape
+    # Target centres in source cell coordinates (source centres at 0, 1, 2, ...)
+    target_y = (np.arange(rows) + 0.5) * source_rows / rows - 0.5
+    target_x = (np.arange(cols) + 0.5) * source_cols / cols - 0.5
+    offsets = np.arange(IDW_NEIGHBOURS) - (IDW_NEIGHBOURS // 2 - 1)
+    raw_y = np.floor(target_y)[:, None] + offsets
+    raw_x = np.floor(target_x)[:, None] + offsets
+    neighbour_y = np.clip(raw_y, 0, source_rows - 1).astype(np.intp)
+    neighbour_x = np.clip(raw_x, 0, source_cols - 1).astype(np.intp)
+    # Neighbours past the border were clipped onto an edge cell; they get no weight
+    inside = ((raw_y >= 0) & (raw_y < source_rows))[:, None, :, None] & ((raw_x >= 0) & (raw_x < source_cols))[None, :, None, :]
+
+    # (rows, cols, k, k) squared distances and values
+    distance_y = (neighbour_y - target_y[:, None])[:, None, :, None]
+    distance_x = (neighbour_x - target_x[:, None])[None, :, None, :]
+    squared = distance_y ** 2 + distance_x ** 2
+    values = grid[neighbour_y[:, None, :, None], neighbour_x[None, :, None, :]].astype(np.float64)
+
+    exact = (squared < 1e-12) & inside
+    with np.errstate(divide="ignore"):
+        weights = np.where(exact | ~inside, 0.0, squared ** (-IDW_POWER / 2))
+    interpolated = (weights * values).sum(axis=(2, 3)) / weights.sum(axis=(2, 3))
+    hits = exact.any(axis=(2, 3))
+    if hits.any():
+        interpolated[hits] = (values * exact).sum(axis=(2, 3))[hits] / exact.sum(axis=(2, 3))[hits]
+    return interpolated.astype(np.float32)
+
+
+def resample(grid: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """A 2-D grid on rows x cols cells: unchanged, area-averaged down, or IDW-interpolated up."""
+    if grid.shape == (rows, cols):
+        return grid
+    if rows <= grid.shape[0] and cols <= grid.shape[1]:
+        return downsample(grid, rows, cols)
+    if rows >= grid.shape[0] and cols >= grid.shape[1]:
+        return idw(grid, rows, cols)
+    # Finer along one axis and coarser along the other: interpolate, then average
+    finer = idw(grid, max(rows, grid.shape[0]), max(cols, grid.shape[1]))
+    return downsample(finer, rows, cols)
+
+
+def capped_shape(shape: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+    """`shape` scaled down (keeping the aspect ratio) so neither side exceeds `max_size`."""
+    rows, cols = shape
+    scale = min(1.0, max_size / max(rows, cols))
+    return max(1, int(rows * scale)), max(1, int(cols * scale))
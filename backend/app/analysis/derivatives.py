@@ -0,0 +1,92 @@
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from .tiled_reader import iter_tiff_bgr_blocks
+
+# Web renditions, as (PIL format, file extension, MIME type, encoder options)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", ".webp", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Rows of a TIFF strip read at once while downscaling an orthomosaic
+_STRIP_PIXELS = 16 * 1024 * 1024
+
+
+def rendition_sizes() -> Dict[str, int]:
+    """Longest side in pixels of each rendition, smallest first."""
+    return {
+        "thumb": settings.DERIVATIVE_THUMB_SIZE,
+        "medium": settings.DERIVATIVE_MEDIUM_SIZE,
+    }
+
+
+def _fit(width: int, height: int, max_side: int) -> tuple:
+    scale = min(1.0, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _downscale_tiff(image_path: str, width: int, height: int, max_side: int) -> Image.Image:
+    """Shrink a streamable TIFF block by block; the full image is never in memory."""
+    out_width, out_height = _fit(width, height, max_side)
+    scale_x, scale_y = out_width / width, out_height / height
+    canvas = np.zeros((out_height, out_width, 3), dtype=np.uint8)
+    for row_start, col_start, block in iter_tiff_bgr_blocks(image_path, _STRIP_PIXELS):
+        # Each block maps onto a disjoint output rectangle (floor of both edges)
+        top, bottom = int(row_start * scale_y), int((row_start + block.shape[0]) * scale_y)
+        left, right = int(col_start * scale_x), int((col_start + block.shape[1]) * scale_x)
+        if bottom > top and right > left:
+            canvas[top:bottom, left:right] = cv2.resize(
+                np.ascontiguousarray(block[:, :, :3]), (right - left, bottom - top), interpolation=cv2.INTER_AREA
+            )
+    return Image.fromarray(cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB))
+
+
+def load_downscaled(image_path: str, max_side: int, image_info: Optional[dict] = None) -> Image.Image:
+    """
+    RGB image no larger than `max_side`, upright according to EXIF orientation.
+
+    JPEGs are decoded at a reduced DCT scale (draft mode), streamable TIFFs are
+    downscaled block by block, other formats are decoded once and shrunk.
+    """
+    if image_info and image_info.get("streamable_tiff"):
+        return _downscale_tiff(image_path, image_info["width"], image_info["height"], max_side)
+    if image_info and image_info.get("format") == "TIFF":
+        # Non-RGB or 16-bit TIFFs: OpenCV converts to 8-bit BGR (and applies orientation)
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not load image from {image_path}")
+        height, width = image.shape[:2]
+        image = cv2.resize(image, _fit(width, height, max_side), interpolation=cv2.INTER_AREA)
+        return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+    with Image.open(image_path) as image:
+        # thumbnail() lets the JPEG decoder scale by 1/2..1/8 before resampling
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+        return image.convert("RGB")
+
+
+def render_derivatives(image_path: str, image_info: Optional[dict] = None) -> Dict[str, Image.Image]:
+    """
+    Build every rendition of a photo. The source is decoded once, at the size
+    of the largest rendition; smaller ones are resampled from it.
+    """
+    sizes = rendition_sizes()
+    largest = max(sizes, key=sizes.get)
+    source = load_downscaled(image_path, sizes[largest], image_info)
+    renditions = {}
+    for rendition, max_side in sizes.items():
+        image = source.copy()
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        renditions[rendition] = image
+    return renditions
+
+
+def save_derivative(image: Image.Image, image_format: str, destination: str):
+    pil_format, _, _, options = DERIVATIVE_FORMATS[image_format]
+    image.save(destination, pil_format, **options)
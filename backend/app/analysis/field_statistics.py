@@ -0,0 +1,55 @@
+from typing import Dict, Hashable, Iterable, Sequence
+
+import numpy as np
+
+# Descriptive statistics of indicator values, computed with NumPy over the
+# whole array at once (a few O(n) passes and one partial sort per percentile
+# set) instead of element by element in Python.
+
+PERCENTILES = {"p25": 25, "median": 50, "p75": 75}
+
+
+def describe(values: np.ndarray) -> Dict[str, float]:
+    """
+    average/min/max/std_dev (population)/count and the PERCENTILES of a 1-D
+    array, rounded to 2 decimals; all zeros for an empty array. Percentiles
+    interpolate linearly, like PostgreSQL's percentile_cont.
+    """
+    if values.size == 0:
+        return {"average": 0, "min": 0, "max": 0, "std_dev": 0, **dict.fromkeys(PERCENTILES, 0), "count": 0}
+    percentiles = np.percentile(values, list(PERCENTILES.values()))
+    return {
+        "average": round(float(values.mean()), 2),
+        "min": round(float(values.min()), 2),
+        "max": round(float(values.max()), 2),
+        "std_dev": round(float(values.std()), 2),
+        **{name: round(float(value), 2) for name, value in zip(PERCENTILES, percentiles)},
+        "count": int(values.size),
+    }
+
+
+def describe_groups(values: np.ndarray, labels: np.ndarray, names: Sequence[Hashable]) -> Dict[Hashable, Dict[str, float]]:
+    """`describe` of the values labelled 0..len(names)-1, by name; sorts by label once and slices."""
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(len(names) + 1))
+    sorted_values = values[order]
+    return {
+        name: describe(sorted_values[bounds[position]:bounds[position + 1]])
+        for position, name in enumerate(names)
+    }
+
+
+def describe_nested(
+    values: np.ndarray, outer_labels: np.ndarray, outer_names: Sequence[Hashable], inner_labels: np.ndarray, inner_names: Sequence[Hashable]
+) -> Dict[Hashable, Dict[Hashable, Dict[str, float]]]:
+    """`describe_groups` by outer then inner label (e.g. date bucket, then region), still with a single sort."""
+    flat = describe_groups(values, outer_labels * len(inner_names) + inner_labels, range(len(outer_names) * len(inner_names)))
+    return {
+        outer_name: {inner_name: flat[outer * len(inner_names) + inner] for inner, inner_name in enumerate(inner_names)}
+        for outer, outer_name in enumerate(outer_names)
+    }
+
+
+def non_zero_values(values: Iterable) -> np.ndarray:
+    """Float array of the values that are neither None nor zero (the values a chart can plot)."""
+    return np.fromiter((value for value in values if value), dtype=np.float64)
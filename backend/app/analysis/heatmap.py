@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.crud.crud_analysis_result import INDICATOR_NAMES
+from . import cell_grid
+
+# Growth heatmaps of a field: one frame per analysed capture, built from the
+# per-cell grids of the drone photo (see cell_grid). Indicators with a
+# spatial channel are served cell by cell; the others have a single value
+# per capture, which is spread uniformly over the frame. Results analysed
+# before the grids were stored fall back to that uniform frame too.
+
+# Indicator -> cell grid channel holding its per-cell values
+SPATIAL_CHANNELS = {"coverage": "coverage", "canopy_color_index": "gr_ratio", "exg": "exg"}
+HEATMAP_INDICATORS = tuple(INDICATOR_NAMES) + tuple(name for name in SPATIAL_CHANNELS if name not in INDICATOR_NAMES)
+
+
+@dataclass
+class Heatmap:
+    dates: List[date]
+    spatial: List[bool]  # Per frame: from a cell grid, or one value spread uniformly
+    values: np.ndarray  # (frame, row, col) float32, row 0 at the top of the photo
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def frames(self) -> List[Dict[str, Any]]:
+        rounded = self.values.astype(np.float64).round(2)
+        return [
+            {"capture_date": capture_date.isoformat(), "spatial": spatial, "values": values.tolist()}
+            for capture_date, spatial, values in zip(self.dates, self.spatial, rounded)
+        ]
+
+
+def build_heatmap(rows: Sequence[Tuple[date, Optional[float], Optional[str]]], indicator: str, resolution: Optional[int] = None, max_size: Optional[int] = None) -> Heatmap:
+    """
+    Heatmap from (capture date, indicator value, encoded cell grid) rows. Every
+    frame is resampled to `resolution` x `resolution` cells when given (IDW up,
+    area mean down); otherwise to the largest grid among the frames, averaged
+    down so neither side exceeds `max_size` (default HEATMAP_MAX_GRID_SIZE).
+    """
+    max_size = max_size or settings.HEATMAP_MAX_GRID_SIZE
+    channel = SPATIAL_CHANNELS.get(indicator)
+    dates, spatial, layers = [], [], []
+    for capture_date, value, encoded_grid in rows:
+        if channel is not None and encoded_grid is not None:
+            try:
+                layer = cell_grid.decode(encoded_grid)[cell_grid.CHANNELS.index(channel)]
+            except ValueError as e:
+                print(f"Skipping unreadable cell grid of {capture_date}: {e}")
+                layer = None
+            if layer is not None:
+                dates.append(capture_date)
+                spatial.append(True)
+                layers.append(layer)
+                continue
+        if value is not None:
+            dates.append(capture_date)
+            spatial.append(False)
+            layers.append(np.full((1, 1), value, dtype=np.float32))
+
+    if resolution:
+        shape = (resolution, resolution)
+    else:
+        largest = max((layer.shape for layer in layers), key=lambda shape: shape[0] * shape[1], default=(1, 1))
+        shape = cell_grid.capped_shape(largest, max_size)
+    values = np.empty((len(layers), *shape), dtype=np.float32)
+    for position, layer in enumerate(layers):
+        values[position] = np.full(shape, layer[0, 0]) if layer.size == 1 else cell_grid.resample(layer, *shape)
+    return Heatmap(dates=dates, spatial=spatial, values=values)
+
+
+class HeatmapCache:
+    """
+    Per-process LRU of built heatmaps, bounded by the bytes of their arrays.
+    An entry stores the signature of the results it was built from (the
+    field's results_version) and is only served while the current signature
+    matches, so no invalidation is needed when workers add or rewrite results.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Heatmap]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, signature: Hashable) -> Optional[Heatmap]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, signature: Hashable, heatmap: Heatmap):
+        if heatmap.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1].nbytes
+            self._entries[key] = (signature, heatmap)
+            self._bytes += heatmap.nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
+@lru_cache(maxsize=None)
+def get_heatmap_cache() -> HeatmapCache:
+    return HeatmapCache(settings.HEATMAP_CACHE_MAX_BYTES)
@@ -0,0 +1,155 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+# cv2.imread flags for each supported decode reduction factor
+_REDUCED_READ_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class ImageContext:
+    """
+    Per-task image cache shared by all analysis steps of a photo group.
+
+    Each file is decoded at most once; derived views (gray, HSV, PIL) are built
+    from the cached BGR array on first use. All arrays are returned read-only so
+    steps can share them without copying. Call `close()` (or use the context
+    manager form) to release the pixel buffers when the task finishes.
+
+    With `reduction` of 2, 4 or 8 images are decoded at that fraction of their
+    size (JPEG scales during decoding, so this is much cheaper than a full
+    decode); steps can use `scale` to adapt pixel-size thresholds.
+
+    The context is thread-safe: concurrent requests for the same file wait for a
+    single decode, and step attribution is tracked per thread.
+    """
+
+    def __init__(self, reduction: int = 1):
+        if reduction not in _REDUCED_READ_FLAGS:
+            raise ValueError(f"Unsupported reduction factor: {reduction}")
+        self.reduction = reduction
+        self.scale = 1.0 / reduction
+        self._bgr: Dict[str, Optional[np.ndarray]] = {}
+        self._gray: Dict[str, np.ndarray] = {}
+        self._hsv: Dict[str, np.ndarray] = {}
+        self._pil: Dict[str, Image.Image] = {}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._path_locks: Dict[str, threading.RLock] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def __enter__(self) -> "ImageContext":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # region Stats
+    @property
+    def _current_step(self) -> str:
+        return getattr(self._local, "step", "unscoped")
+
+    def _record(self, step: str, **increments: float):
+        with self._stats_lock:
+            stats = self.stats.setdefault(step, {"decodes": 0, "decode_seconds": 0.0, "step_seconds": 0.0})
+            for key, value in increments.items():
+                stats[key] += value
+
+    @contextmanager
+    def step(self, name: str):
+        """Attribute decodes and elapsed time inside the block (in this thread) to the step `name`."""
+        previous_step = self._current_step
+        self._local.step = name
+        self._record(name)
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self._record(name, step_seconds=time.perf_counter() - started)
+            self._local.step = previous_step
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Return per-step decode counts and timings, rounded for logging."""
+        with self._stats_lock:
+            stats = {step: dict(values) for step, values in self.stats.items()}
+        return {
+            step: {
+                "decodes": int(values["decodes"]),
+                "decode_seconds": round(values["decode_seconds"], 4),
+                "step_seconds": round(values["step_seconds"], 4),
+            }
+            for step, values in stats.items()
+        }
+    # endregion
+
+    # region Views
+    def _path_lock(self, image_path: str) -> threading.RLock:
+        # dict.setdefault is atomic, so concurrent callers always share one lock per file
+        return self._path_locks.setdefault(image_path, threading.RLock())
+
+    def has_decoded(self, image_path: str) -> bool:
+        return self._bgr.get(image_path) is not None
+
+    def bgr(self, image_path: str) -> Optional[np.ndarray]:
+        """Decoded BGR image, or None if the file cannot be read (like cv2.imread)."""
+        with self._path_lock(image_path):
+            if image_path not in self._bgr:
+                started = time.perf_counter()
+                image = cv2.imread(image_path, _REDUCED_READ_FLAGS[self.reduction])
+                self._record(self._current_step, decodes=1, decode_seconds=time.perf_counter() - started)
+                if image is not None:
+                    image.setflags(write=False)
+                self._bgr[image_path] = image
+            return self._bgr[image_path]
+
+    def gray(self, image_path: str) -> Optional[np.ndarray]:
+        with self._path_lock(image_path):
+            if image_path not in self._gray:
+                image = self.bgr(image_path)
+                if image is None:
+                    return None
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+                gray.setflags(write=False)
+                self._gray[image_path] = gray
+            return self._gray[image_path]
+
+    def hsv(self, image_path: str) -> Optional[np.ndarray]:
+        with self._path_lock(image_path):
+            if image_path not in self._hsv:
+                image = self.bgr(image_path)
+                if image is None:
+                    return None
+                hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+                hsv.setflags(write=False)
+                self._hsv[image_path] = hsv
+            return self._hsv[image_path]
+
+    def pil(self, image_path: str) -> Image.Image:
+        """RGB PIL image built from the cached decode (for the Gemini step)."""
+        with self._path_lock(image_path):
+            if image_path not in self._pil:
+                image = self.bgr(image_path)
+                if image is None:
+                    raise ValueError(f"Could not load image from {image_path}")
+                self._pil[image_path] = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            return self._pil[image_path]
+    # endregion
+
+    def close(self):
+        """Drop every cached buffer so the memory can be reclaimed."""
+        for pil_image in self._pil.values():
+            pil_image.close()
+        self._bgr.clear()
+        self._gray.clear()
+        self._hsv.clear()
+        self._pil.clear()
@@ -0,0 +1,142 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import tifffile
+from PIL import Image, UnidentifiedImageError
+
+from .tiled_reader import is_streamable_page
+
+# Formats the OpenCV steps can decode, with the extension their blobs are stored under
+SUPPORTED_FORMATS = {
+    "JPEG": ".jpg",
+    "MPO": ".jpg",  # multi-picture JPEG written by many drones and phones
+    "PNG": ".png",
+    "WEBP": ".webp",
+    "BMP": ".bmp",
+    "TIFF": ".tif",
+}
+
+# Smaller images cannot hold a usable field or calibration board
+MIN_IMAGE_SIDE = 64
+
+_TIFF_MAGIC = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+
+# EXIF tags
+_ORIENTATION = 0x0112
+_DATETIME = 0x0132
+_EXIF_IFD = 0x8769
+_DATETIME_ORIGINAL = 0x9003
+_GPS_IFD = 0x8825
+
+
+class ImageProbeError(ValueError):
+    """The file is not an image the analysis can use."""
+
+
+def _exif_datetime(value: Any) -> Optional[str]:
+    try:
+        return datetime.strptime(str(value).strip("\x00 "), "%Y:%m:%d %H:%M:%S").isoformat()
+    except ValueError:
+        return None
+
+
+def _gps_degrees(dms: Any, ref: Any) -> Optional[float]:
+    try:
+        parts = list(dms)
+        if len(parts) == 6:
+            # tifffile returns rationals flattened as (num, den, num, den, num, den)
+            parts = [parts[i] / parts[i + 1] for i in (0, 2, 4)]
+        degrees, minutes, seconds = (float(part) for part in parts)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    value = degrees + minutes / 60 + seconds / 3600
+    return -value if str(ref).strip("\x00 ").upper() in ("S", "W") else value
+
+
+def _gps(gps_ifd: Dict[Any, Any]) -> Optional[Dict[str, float]]:
+    """Decimal coordinates from a GPS IFD keyed by tag number (1-6) or name."""
+    def tag(number: int, name: str):
+        return gps_ifd.get(number, gps_ifd.get(name))
+
+    latitude = _gps_degrees(tag(2, "GPSLatitude"), tag(1, "GPSLatitudeRef"))
+    longitude = _gps_degrees(tag(4, "GPSLongitude"), tag(3, "GPSLongitudeRef"))
+    if latitude is None or longitude is None:
+        return None
+    gps = {"latitude": round(latitude, 7), "longitude": round(longitude, 7)}
+    altitude = tag(6, "GPSAltitude")
+    if altitude is not None:
+        try:
+            altitude = float(altitude[0]) / float(altitude[1]) if isinstance(altitude, tuple) else float(altitude)
+            gps["altitude"] = round(-altitude if tag(5, "GPSAltitudeRef") in (1, b"\x01") else altitude, 2)
+        except (TypeError, ValueError, ZeroDivisionError):
+            pass
+    return gps
+
+
+def _probe_tiff(image_path: str) -> Dict[str, Any]:
+    # tifffile reads only the header and IFDs, and handles BigTIFF orthomosaics
+    with tifffile.TiffFile(image_path) as tif:
+        page = tif.pages[0]
+        tags = page.tags
+        orientation = tags.get(274)
+        captured = tags.get(306)
+        gps = tags.get(34853)
+        return {
+            "format": "TIFF",
+            "width": int(page.imagewidth),
+            "height": int(page.imagelength),
+            "orientation": int(orientation.value) if orientation else None,
+            "captured_at": _exif_datetime(captured.value) if captured else None,
+            "gps": _gps(gps.value) if gps and isinstance(gps.value, dict) else None,
+            "streamable_tiff": is_streamable_page(page),
+            "geotiff": 33922 in tags,  # ModelTiepointTag
+        }
+
+
+def _probe_pil(image_path: str) -> Dict[str, Any]:
+    # Image.open parses the header only; pixel data is never decoded here
+    with Image.open(image_path) as image:
+        exif = image.getexif()
+        captured = exif.get_ifd(_EXIF_IFD).get(_DATETIME_ORIGINAL) or exif.get(_DATETIME)
+        return {
+            "format": image.format,
+            "width": image.width,
+            "height": image.height,
+            "orientation": exif.get(_ORIENTATION),
+            "captured_at": _exif_datetime(captured) if captured else None,
+            "gps": _gps(exif.get_ifd(_GPS_IFD)),
+            "streamable_tiff": False,
+            "geotiff": False,
+        }
+
+
+def probe_image(image_path: str) -> Dict[str, Any]:
+    """
+    Read format, dimensions, EXIF orientation, capture time and GPS position
+    from the image headers, without decoding pixels. Raises ImageProbeError
+    for files the analysis could not use.
+
+    The result is stored per photo on PhotoGroup.photo_metadata, so the
+    analysis can plan decoding (tiled vs in-memory) without reopening files.
+    """
+    with open(image_path, "rb") as image_file:
+        magic = image_file.read(4)
+    try:
+        metadata = _probe_tiff(image_path) if magic in _TIFF_MAGIC else _probe_pil(image_path)
+    except Image.DecompressionBombError:
+        raise ImageProbeError("Image is too large to decode in memory; upload large orthomosaics as tiled TIFF")
+    except UnidentifiedImageError:
+        raise ImageProbeError("Not a recognized image format")
+    except (tifffile.TiffFileError, OSError, SyntaxError, ValueError) as e:
+        raise ImageProbeError(f"Not a readable image: {e}")
+
+    if metadata["format"] not in SUPPORTED_FORMATS:
+        raise ImageProbeError(f"Unsupported image format {metadata['format']}; use one of {', '.join(SUPPORTED_FORMATS)}")
+    if min(metadata["width"], metadata["height"]) < MIN_IMAGE_SIDE:
+        raise ImageProbeError(f"Image is too small ({metadata['width']}x{metadata['height']})")
+    return metadata
+
+
+def stored_extension(metadata: Dict[str, Any]) -> str:
+    """File extension matching the probed format (not whatever the client named the file)."""
+    return SUPPORTED_FORMATS[metadata["format"]]
@@ -1,45 +1,244 @@
+import os
+import time
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
 from sqlalchemy.orm import Session
+from app.core import storage, uploads
+from app.core.config import settings
 from app.db import models, base
-from app.crud import crud_analysis_result
+from app.crud import crud_analysis_result, crud_stage_result
+from . import derivatives
 from . import steps_analyze
 from . import steps_gemini
+from . import result_cache
+from .image_context import ImageContext
+from .result_cache import StepResultCache
+
+# Versions of every analysis step; part of the ETags of served results, so
+# bumping a step version makes clients fetch results again
+ALGORITHM_VERSION = "-".join(
+    f"{step}.{version}" for step, version in sorted({**steps_analyze.STEP_VERSIONS, "gemini": steps_gemini.PROMPT_VERSION}.items())
+)
+
+def _photo_path(photo_group: models.PhotoGroup, name: str) -> str:
+    """Local path of one photo of the group, fetched from the blob store if needed."""
+    return storage.local_photo_path(getattr(photo_group, f"{name}_path"))
+
+
+def _cache_path(photo_group: models.PhotoGroup, name: str) -> str:
+    """Path identifying the photo in step cache keys; nothing is fetched (see `_step_cache_for`)."""
+    return storage.cached_photo_path(getattr(photo_group, f"{name}_path"))
+
+
+def _photo_info(photo_group: models.PhotoGroup, name: str) -> Optional[dict]:
+    """Header metadata probed at upload (format, size, streamable TIFF, ...), None for older photo groups."""
+    return (photo_group.photo_metadata or {}).get(name)
+
+
+def run_preview(db: Session, photo_group: models.PhotoGroup, step_cache: StepResultCache):
+    """
+    Phase 1: compute coverage, color index and height on a reduced-resolution
+    decode and store them as a provisional result, so users see numbers while
+    the full-resolution steps and the Gemini call are still running. Tiled
+    orthomosaics, which are never decoded whole, are subsampled instead (see
+    `steps_analyze.drone_view_metrics_tiled`).
+    """
+    reduction = settings.PREVIEW_REDUCTION
+    with ImageContext(reduction=reduction) as preview_context:
+        with preview_context.step("preview_drone_view"):
+            coverage_results = step_cache.get_or_compute(
+                "preview_drone_view",
+                f"{steps_analyze.STEP_VERSIONS['drone_view']}-grid{settings.DRONE_VIEW_GRID_SIZE}-r{reduction}",
+                [_cache_path(photo_group, "drone_photo")],
+                lambda: steps_analyze.analyze_drone_view(
+                    _photo_path(photo_group, "drone_photo"), preview_context, image_info=_photo_info(photo_group, "drone_photo")
+                ),
+            )
+        with preview_context.step("preview_side_view_height"):
+            height_results = step_cache.get_or_compute(
+                "preview_side_view_height",
+                f"{steps_analyze.STEP_VERSIONS['side_view_height']}-r{reduction}",
+                [_cache_path(photo_group, "side_photo_3m_vertical")],
+                lambda: steps_analyze.analyze_side_view_height(_photo_path(photo_group, "side_photo_3m_vertical"), preview_context),
+            )
+        print(f"Preview decode stats for PhotoGroup {photo_group.id}: {preview_context.report()}")
+
+    crud_analysis_result.upsert_analysis_result(
+        db, photo_group.id, {**coverage_results, **height_results}, is_provisional=True
+    )
+
+
+# Full-resolution OpenCV stages, in the order the in-process pipeline runs them
+CV_STAGES = ("drone_view", "side_view_height", "side_view_advanced")
+
+# How the Celery DAG batches CV_STAGES into subtasks. Both side-view stages read
+# the 3 m vertical photo, so they run in one subtask sharing an ImageContext and
+# the photo is decoded once, as in the in-process pipeline; each stage keeps its
+# own checkpoint. The price is that they no longer run in parallel.
+CV_SUBTASKS = (("drone_view",), ("side_view_height", "side_view_advanced"))
+
+
+def _cv_stage_args(stage: str, photo_group: models.PhotoGroup, image_context: ImageContext) -> Tuple[str, List[str], Callable[[], dict]]:
+    """(cache version, input images, compute function) of an OpenCV stage."""
+    if stage == "drone_view":
+        return (
+            f"{steps_analyze.STEP_VERSIONS['drone_view']}-grid{settings.DRONE_VIEW_GRID_SIZE}",
+            [_cache_path(photo_group, "drone_photo")],
+            lambda: steps_analyze.analyze_drone_view(
+                _photo_path(photo_group, "drone_photo"), image_context, image_info=_photo_info(photo_group, "drone_photo")
+            ),
+        )
+    if stage == "side_view_height":
+        return (
+            steps_analyze.STEP_VERSIONS["side_view_height"],
+            [_cache_path(photo_group, "side_photo_3m_vertical")],
+            lambda: steps_analyze.analyze_side_view_height(_photo_path(photo_group, "side_photo_3m_vertical"), image_context),
+        )
+    if stage == "side_view_advanced":
+        return (
+            steps_analyze.STEP_VERSIONS["side_view_advanced"],
+            [_cache_path(photo_group, "side_photo_3m_horizontal"), _cache_path(photo_group, "side_photo_3m_vertical")],
+            lambda: steps_analyze.analyze_side_view_advanced(
+                horizontal_path=_photo_path(photo_group, "side_photo_3m_horizontal"),
+                vertical_path=_photo_path(photo_group, "side_photo_3m_vertical"),
+                image_context=image_context
+            ),
+        )
+    raise ValueError(f"Unknown analysis stage: {stage}")
+
+
+def run_cv_stage(stage: str, photo_group: models.PhotoGroup, image_context: ImageContext, step_cache: StepResultCache) -> dict:
+    version, image_paths, compute = _cv_stage_args(stage, photo_group, image_context)
+    with image_context.step(stage):
+        return step_cache.get_or_compute(stage, version, image_paths, compute)
+
+
+def _gemini_cache_args(photo_group: models.PhotoGroup):
+    version = f"{steps_gemini.GEMINI_MODEL_NAME}-{steps_gemini.PROMPT_VERSION}"
+    image_paths = [
+        _cache_path(photo_group, "drone_photo"),
+        _cache_path(photo_group, "side_photo_05m"),
+        _cache_path(photo_group, "side_photo_3m_horizontal"),
+        _cache_path(photo_group, "side_photo_3m_vertical"),
+    ]
+    return "gemini", version, image_paths
+
+
+def submit_gemini(executor: ThreadPoolExecutor, step_cache: StepResultCache, photo_group: models.PhotoGroup, image_context: ImageContext) -> Tuple[Future, bool]:
+    """
+    Start the Gemini step on `executor` so the network round trip overlaps with
+    the OpenCV steps. Returns (future, from_cache); a cached result is returned
+    as an already completed future. The worker thread only reads images through
+    the (thread-safe) context and never touches the DB session.
+    """
+    cached_result = step_cache.get(*_gemini_cache_args(photo_group))
+    if cached_result is not None:
+        future = Future()
+        future.set_result(cached_result)
+        return future, True
+
+    def run():
+        with image_context.step("gemini"):
+            return steps_gemini.analyze_with_gemini(
+                drone_image_path=_photo_path(photo_group, "drone_photo"),
+                side_image_05m_path=_photo_path(photo_group, "side_photo_05m"),
+                side_image_horizontal_path=_photo_path(photo_group, "side_photo_3m_horizontal"),
+                side_image_vertical_path=_photo_path(photo_group, "side_photo_3m_vertical"),
+                image_context=image_context
+            )
+
+    return executor.submit(run), False
+
+
+def collect_gemini(future: Future, from_cache: bool, started: float, step_cache: StepResultCache, photo_group: models.PhotoGroup) -> dict:
+    """
+    Wait for the Gemini step for what is left of GEMINI_TIMEOUT_SECONDS since
+    `started`. On timeout the call is abandoned (the request itself is bounded by
+    the same timeout) and the fallback result is used; fallback results are
+    never cached.
+    """
+    timeout = settings.GEMINI_TIMEOUT_SECONDS
+    try:
+        gemini_results = future.result(timeout=max(0.0, timeout - (time.monotonic() - started)))
+    except FutureTimeoutError:
+        future.cancel()
+        print(f"Gemini analysis for PhotoGroup {photo_group.id} timed out after {timeout}s")
+        return steps_gemini.failure_result(f"timed out after {timeout}s")
+
+    if not from_cache and not steps_gemini.is_failed_result(gemini_results):
+        step_cache.put(*_gemini_cache_args(photo_group), gemini_results)
+    return gemini_results
+
+def _step_cache_for(db: Session, photo_group: models.PhotoGroup) -> StepResultCache:
+    """
+    Step cache seeded with the photo digests already known: blob keys embed the
+    SHA-256, and uploads record it while streaming. Cache lookups then never
+    read (or fetch) the photos; only legacy files without checksums are hashed.
+    """
+    step_cache = StepResultCache(db)
+    step_cache.add_known_hashes({
+        _cache_path(photo_group, name): checksum["sha256"]
+        for name, checksum in (photo_group.photo_checksums or {}).items()
+    })
+    step_cache.add_known_hashes({
+        _cache_path(photo_group, name): storage.blob_sha256(getattr(photo_group, f"{name}_path"))
+        for name in uploads.PHOTO_NAMES
+        if storage.is_blob_key(getattr(photo_group, f"{name}_path"))
+    })
+    return step_cache
+
 
 def process_photo_group(photo_group_id: int):
     db: Session = next(base.get_db())
+    image_context = ImageContext()
+    gemini_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gemini")
+    gemini_future: Optional[Future] = None
     try:
         photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
         if not photo_group:
             print(f"Error: PhotoGroup {photo_group_id} not found.")
             return
+        step_cache = _step_cache_for(db, photo_group)
 
         # Update status to PROCESSING
         photo_group.analysis_status = models.AnalysisStatusEnum.PROCESSING
         db.commit()
 
-        # --- Run Analysis Steps ---
-        coverage_results = steps_analyze.analyze_drone_view(photo_group.drone_photo_path)
-        height_results = steps_analyze.analyze_side_view_height(photo_group.side_photo_3m_vertical_path)
-        advanced_side_view_results = steps_analyze.analyze_side_view_advanced(
-            horizontal_path=photo_group.side_photo_3m_horizontal_path,
-            vertical_path=photo_group.side_photo_3m_vertical_path
-        )
+        # --- Start Gemini AI Analysis in the background ---
+        # Task wall-clock time becomes max(OpenCV, Gemini) instead of their sum
+        gemini_started = time.monotonic()
+        gemini_future, gemini_from_cache = submit_gemini(gemini_executor, step_cache, photo_group, image_context)
 
-        # --- Run Gemini AI Analysis ---
-        gemini_results = steps_gemini.analyze_with_gemini(
-            drone_image_path=photo_group.drone_photo_path,
-            side_image_05m_path=photo_group.side_photo_05m_path,
-            side_image_horizontal_path=photo_group.side_photo_3m_horizontal_path,
-            side_image_vertical_path=photo_group.side_photo_3m_vertical_path
-        )
+        # --- Phase 1: Provisional preview metrics ---
+        # A failed preview must not block the full analysis
+        try:
+            run_preview(db, photo_group, step_cache)
+        except Exception as e:
+            db.rollback()
+            print(f"Preview analysis for PhotoGroup {photo_group_id} failed: {e}")
+
+        # --- Phase 2: Full-resolution Analysis Steps ---
+        # Every step reads pixels through the shared context, so each photo is decoded once,
+        # and outputs for identical images are reused from the step cache.
+        stage_results = {
+            stage: run_cv_stage(stage, photo_group, image_context, step_cache) for stage in CV_STAGES
+        }
 
-        # --- Create Result Record ---
+        # --- Join Gemini AI Analysis ---
+        gemini_results = collect_gemini(gemini_future, gemini_from_cache, gemini_started, step_cache, photo_group)
+        print(f"Image decode stats for PhotoGroup {photo_group_id}: {image_context.report()}")
+        print(f"Step cache stats: {result_cache.report()}")
+
+        # --- Create or Finalize Result Record ---
         analysis_data = {
-            **coverage_results,
-            **height_results,
-            **advanced_side_view_results,
+            **stage_results["drone_view"],
+            **stage_results["side_view_height"],
+            **stage_results["side_view_advanced"],
             **gemini_results,
         }
-        crud_analysis_result.create_analysis_result(db, photo_group_id, analysis_data)
+        crud_analysis_result.upsert_analysis_result(db, photo_group_id, analysis_data, is_provisional=False)
 
         # Update status to COMPLETED
         photo_group.analysis_status = models.AnalysisStatusEnum.COMPLETED
@@ -53,5 +252,232 @@ def process_photo_group(photo_group_id: int):
             photo_group.analysis_status = models.AnalysisStatusEnum.FAILED
             db.commit()
         print(f"An error occurred during analysis for PhotoGroup {photo_group_id}: {e}")
+    finally:
+        # If an OpenCV step failed, don't wait for Gemini: drop it if it hasn't started
+        gemini_executor.shutdown(wait=False, cancel_futures=True)
+        # A Gemini call already running (timed out, or outlived a failed step) cannot be
+        # stopped and may still be encoding the context's PIL images: leave them to GC
+        if gemini_future is None or gemini_future.done():
+            image_context.close()
+        db.close()
+
+
+
+# region Stage DAG
+# Entry points for the Celery stage subtasks (see app.worker.tasks). Each stage
+# checkpoints its output in analysis_stage_results, so a retried or re-run
+# stage whose checkpoint exists returns immediately, and the merge stage builds
+# the AnalysisResult from the checkpoints.
+
+def start_analysis(photo_group_id: int) -> bool:
+    """Mark the photo group PROCESSING. Returns False if it does not exist."""
+    db: Session = next(base.get_db())
+    try:
+        photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
+        if not photo_group:
+            print(f"Error: PhotoGroup {photo_group_id} not found.")
+            return False
+        photo_group.analysis_status = models.AnalysisStatusEnum.PROCESSING
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def run_preview_stage(photo_group_id: int) -> None:
+    """Provisional preview stage. Failures are logged and never fail the DAG."""
+    db: Session = next(base.get_db())
+    try:
+        photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
+        if photo_group:
+            run_preview(db, photo_group, _step_cache_for(db, photo_group))
+    except Exception as e:
+        db.rollback()
+        print(f"Preview analysis for PhotoGroup {photo_group_id} failed: {e}")
+    finally:
+        db.close()
+
+
+def run_cv_stages(photo_group_id: int, stages: Sequence[str]) -> Dict[str, dict]:
+    """
+    Run full-resolution OpenCV stages (entries of CV_STAGES) in one ImageContext,
+    so the photos they share are decoded once, and checkpoint each stage as soon
+    as it completes. Stages already checkpointed are skipped, so a retry only
+    reruns the stages that did not finish. Exceptions propagate so the Celery
+    subtask can retry.
+    """
+    db: Session = next(base.get_db())
+    image_context = ImageContext()
+    try:
+        checkpoints = crud_stage_result.get_stage_results(db, photo_group_id)
+        results = {stage: checkpoints[stage] for stage in stages if stage in checkpoints}
+        pending = [stage for stage in stages if stage not in results]
+        if not pending:
+            return results
+
+        photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
+        if not photo_group:
+            raise ValueError(f"PhotoGroup {photo_group_id} not found")
+        step_cache = _step_cache_for(db, photo_group)
+        for stage in pending:
+            results[stage] = run_cv_stage(stage, photo_group, image_context, step_cache)
+            crud_stage_result.save_stage_result(db, photo_group_id, stage, results[stage])
+        print(f"Stages {', '.join(pending)} for PhotoGroup {photo_group_id} done, decode stats: {image_context.report()}")
+        return results
+    finally:
+        image_context.close()
+        db.close()
+
+
+def run_analysis_stage(photo_group_id: int, stage: str, allow_fallback: bool = True) -> dict:
+    """
+    Run one full-resolution stage (an entry of CV_STAGES, or "gemini") and
+    checkpoint its output.
+
+    Exceptions propagate so the Celery subtask can retry just this stage. A
+    failed Gemini call raises RuntimeError unless `allow_fallback` is set (on the
+    last retry), in which case its fallback values are returned without being
+    checkpointed or cached.
+    """
+    if stage != "gemini":
+        return run_cv_stages(photo_group_id, [stage])[stage]
+
+    db: Session = next(base.get_db())
+    image_context = ImageContext()
+    try:
+        checkpoint = crud_stage_result.get_stage_result(db, photo_group_id, stage)
+        if checkpoint is not None:
+            return checkpoint
+
+        photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
+        if not photo_group:
+            raise ValueError(f"PhotoGroup {photo_group_id} not found")
+        step_cache = _step_cache_for(db, photo_group)
+
+        cached_result = step_cache.get(*_gemini_cache_args(photo_group))
+        if cached_result is not None:
+            crud_stage_result.save_stage_result(db, photo_group_id, stage, cached_result)
+            return cached_result
+        # Release the DB connection while waiting on the network; the thread
+        # pool running this stage is much larger than the connection pool.
+        # Loaded attributes of photo_group stay readable after close().
+        db.close()
+
+        def analyze():
+            with image_context.step("gemini"):
+                return steps_gemini.analyze_with_gemini(
+                    drone_image_path=_photo_path(photo_group, "drone_photo"),
+                    side_image_05m_path=_photo_path(photo_group, "side_photo_05m"),
+                    side_image_horizontal_path=_photo_path(photo_group, "side_photo_3m_horizontal"),
+                    side_image_vertical_path=_photo_path(photo_group, "side_photo_3m_vertical"),
+                    image_context=image_context
+                )
+        result = analyze()
+        if steps_gemini.is_failed_result(result):
+            if not allow_fallback:
+                raise RuntimeError(result["gemini_analysis_text"])
+            return result
+        step_cache.put(*_gemini_cache_args(photo_group), result)
+
+        crud_stage_result.save_stage_result(db, photo_group_id, stage, result)
+        print(f"Stage {stage} for PhotoGroup {photo_group_id} done, decode stats: {image_context.report()}")
+        return result
+    finally:
+        image_context.close()
+        db.close()
+
+
+def merge_analysis_stages(photo_group_id: int) -> None:
+    """Final stage: assemble the AnalysisResult from the stage checkpoints and mark the group COMPLETED."""
+    db: Session = next(base.get_db())
+    try:
+        stage_results: Dict[str, dict] = crud_stage_result.get_stage_results(db, photo_group_id)
+        missing = [stage for stage in CV_STAGES if stage not in stage_results]
+        if missing:
+            raise ValueError(f"Missing stage results for PhotoGroup {photo_group_id}: {missing}")
+        # Gemini has no checkpoint when it exhausted its retries
+        gemini_results = stage_results.get("gemini") or steps_gemini.failure_result("no result after retries")
+
+        analysis_data = {
+            **stage_results["drone_view"],
+            **stage_results["side_view_height"],
+            **stage_results["side_view_advanced"],
+            **gemini_results,
+        }
+        crud_analysis_result.upsert_analysis_result(db, photo_group_id, analysis_data, is_provisional=False)
+
+        photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
+        photo_group.analysis_status = models.AnalysisStatusEnum.COMPLETED
+        db.commit()
+        print(f"Analysis for PhotoGroup {photo_group_id} completed successfully.")
+    finally:
+        db.close()
+
+
+def mark_analysis_failed(photo_group_id: int) -> None:
+    db: Session = next(base.get_db())
+    try:
+        photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
+        if photo_group:
+            photo_group.analysis_status = models.AnalysisStatusEnum.FAILED
+            db.commit()
+    finally:
+        db.close()
+# endregion
+
+
+# region Derivatives
+def _photo_sha256(photo_group: models.PhotoGroup, name: str) -> str:
+    stored_path = getattr(photo_group, f"{name}_path")
+    if storage.is_blob_key(stored_path):
+        return storage.blob_sha256(stored_path)
+    checksum = (photo_group.photo_checksums or {}).get(name)
+    return checksum["sha256"] if checksum else uploads.hash_file(stored_path).sha256
+
+
+def _store_derivative(image, image_format: str, key: str) -> int:
+    """Encode `image` into the staging area and move it into storage under `key`. Returns the byte size."""
+    staging_path = uploads.new_staging_path()
+    os.makedirs(os.path.dirname(staging_path), exist_ok=True)
+    try:
+        derivatives.save_derivative(image, image_format, staging_path)
+        size = os.path.getsize(staging_path)
+        storage.get_storage().put_file(staging_path, key)
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+    return size
+
+
+def generate_derivatives(photo_group_id: int) -> None:
+    """
+    Render the thumbnail and medium-size WebP/JPEG renditions of every photo of
+    the group and store them next to the originals. Renditions are keyed by
+    the photo's content hash, so re-running this (or uploading the same photo
+    again) rewrites identical files.
+    """
+    db: Session = next(base.get_db())
+    try:
+        photo_group = db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
+        if not photo_group:
+            print(f"Error: PhotoGroup {photo_group_id} not found.")
+            return
+        sizes = derivatives.rendition_sizes()
+        photo_derivatives = {}
+        for name in uploads.PHOTO_NAMES:
+            sha256 = _photo_sha256(photo_group, name)
+            renditions = derivatives.render_derivatives(_photo_path(photo_group, name), _photo_info(photo_group, name))
+            photo_derivatives[name] = {}
+            for rendition, image in renditions.items():
+                formats = {}
+                for image_format, (_, extension, _, _) in derivatives.DERIVATIVE_FORMATS.items():
+                    key = storage.derivative_key(sha256, rendition, sizes[rendition], extension)
+                    formats[image_format] = {"key": key, "size": _store_derivative(image, image_format, key)}
+                photo_derivatives[name][rendition] = {"width": image.width, "height": image.height, "formats": formats}
+        photo_group.photo_derivatives = photo_derivatives
+        photo_group.derivatives_generated_at = datetime.now(timezone.utc)
+        db.commit()
+        print(f"Derivatives for PhotoGroup {photo_group_id} generated")
     finally:
         db.close()
+# endregion
@@ -0,0 +1,94 @@
+import hashlib
+import json
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_step_cache
+
+# Size of the chunks read when hashing image files
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+# Process-wide counters per step: {"drone_view": {"hits": 3, "misses": 1, "evictions": 0}}
+cache_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "evictions": 0})
+
+
+def file_sha256(image_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as image_file:
+        for chunk in iter(lambda: image_file.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StepResultCache:
+    """
+    Content-addressed cache of analysis step outputs, shared by all workers
+    through the `step_result_cache` table.
+
+    An entry is keyed by the step name, the step's algorithm/prompt version and
+    the SHA-256 of every input image, so re-uploads of the same photos and task
+    retries reuse earlier outputs while any algorithm change misses. The table
+    is kept under STEP_CACHE_MAX_BYTES by evicting least recently used entries.
+    """
+
+    def __init__(self, db: Session, enabled: Optional[bool] = None):
+        self.db = db
+        self.enabled = settings.STEP_CACHE_ENABLED if enabled is None else enabled
+        self._file_hashes: Dict[str, str] = {}
+
+    def add_known_hashes(self, hashes: Dict[str, str]):
+        """Register SHA-256 digests computed elsewhere (e.g. at upload) so files are not re-read."""
+        self._file_hashes.update(hashes)
+
+    def image_hash(self, image_path: str) -> str:
+        if image_path not in self._file_hashes:
+            self._file_hashes[image_path] = file_sha256(image_path)
+        return self._file_hashes[image_path]
+
+    def cache_key(self, step: str, version: str, image_paths: Sequence[str]) -> str:
+        parts = [step, version, *(self.image_hash(path) for path in image_paths)]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, step: str, version: str, image_paths: Sequence[str]) -> Optional[dict]:
+        """Cached output of `step` for these images, or None on a miss (or when disabled)."""
+        if not self.enabled:
+            return None
+        entry = crud_step_cache.get_cache_entry(self.db, self.cache_key(step, version, image_paths))
+        if entry is None:
+            cache_stats[step]["misses"] += 1
+            return None
+        cache_stats[step]["hits"] += 1
+        return json.loads(entry.result_json)
+
+    def put(self, step: str, version: str, image_paths: Sequence[str], result: dict):
+        if not self.enabled:
+            return
+        cache_key = self.cache_key(step, version, image_paths)
+        if crud_step_cache.add_cache_entry(self.db, cache_key, step, json.dumps(result, default=float)):
+            cache_stats[step]["evictions"] += crud_step_cache.evict_cache_entries(
+                self.db, settings.STEP_CACHE_MAX_BYTES
+            )
+
+    def get_or_compute(
+        self,
+        step: str,
+        version: str,
+        image_paths: Sequence[str],
+        compute: Callable[[], dict],
+        cacheable: Callable[[dict], bool] = lambda result: True,
+    ) -> dict:
+        """Return the cached output of `step` for these images, or compute and store it."""
+        result = self.get(step, version, image_paths)
+        if result is None:
+            result = compute()
+            if cacheable(result):
+                self.put(step, version, image_paths, result)
+        return result
+
+
+def report() -> Dict[str, Dict[str, int]]:
+    """Snapshot of the per-step hit/miss/eviction counters of this process."""
+    return {step: dict(counters) for step, counters in cache_stats.items()}
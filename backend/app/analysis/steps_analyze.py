@@ -1,84 +1,234 @@
 import random
 import cv2
 import numpy as np
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 
+from app.core.config import settings
+from . import cell_grid
+from .image_context import ImageContext
+from .tiled_reader import iter_tiff_bgr_blocks, probe_streamable_tiff
 
-def analyze_drone_view(image_path: str) -> dict:
-    """Analyze drone view for coverage, color index, and uniformity."""
+
+# Bump a step's version whenever its algorithm changes, so cached results are not reused
+STEP_VERSIONS = {
+    "drone_view": "2",
+    "side_view_height": "1",
+    "side_view_advanced": "1",
+}
+
+# ExG (2G - R - B) above this value is counted as vegetation
+EXG_VEGETATION_THRESHOLD = 50
+
+# Rows are processed in strips of roughly this many pixels to bound temporaries
+DRONE_VIEW_STRIP_PIXELS = 1 << 20
+
+
+def _segment_starts(sorted_index: np.ndarray) -> np.ndarray:
+    """Start positions of runs of equal values in a non-decreasing index array."""
+    return np.concatenate(([0], np.flatnonzero(np.diff(sorted_index)) + 1))
+
+
+class DroneViewAccumulator:
+    """
+    Incrementally accumulates drone-view metrics over blocks (strips or tiles) of an image.
+
+    Per pixel only int16 ExG, a boolean mask and two float32 channel buffers are
+    allocated, and only for the current block. Per-cell vegetation counts and
+    ExG and G/R sums come from `np.add.reduceat`, so the cost does not depend on
+    the grid size. Cells follow the legacy layout: `height // grid_rows` by
+    `width // grid_cols` pixels, with the remainder rows/columns counted towards
+    overall coverage but not towards any cell. Blocks may be added in any order.
+    """
+
+    def __init__(self, height: int, width: int, grid_rows: int = 5, grid_cols: int = 5):
+        self.height = height
+        self.width = width
+        # A cell must contain at least one pixel
+        self.grid_rows = max(1, min(grid_rows, height))
+        self.grid_cols = max(1, min(grid_cols, width))
+        self.cell_height = height // self.grid_rows
+        self.cell_width = width // self.grid_cols
+        self._cell_rows_end = self.cell_height * self.grid_rows
+        self._cell_cols_end = self.cell_width * self.grid_cols
+
+        self.vegetation_pixels = 0
+        self.gr_ratio_sum = 0.0
+        self.cell_counts = np.zeros((self.grid_rows, self.grid_cols), dtype=np.int64)
+        self.cell_exg_sums = np.zeros((self.grid_rows, self.grid_cols), dtype=np.int64)
+        self.cell_gr_ratio_sums = np.zeros((self.grid_rows, self.grid_cols), dtype=np.float64)
+
+    def _cell_layout(self, row_start: int, col_start: int, block_shape) -> Optional[tuple]:
+        """How a block's pixels map onto grid cells, or None if it covers no cell."""
+        local_rows = min(block_shape[0], self._cell_rows_end - row_start)
+        local_cols = min(block_shape[1], self._cell_cols_end - col_start)
+        if local_rows <= 0 or local_cols <= 0:
+            return None
+        cell_row_index = (row_start + np.arange(local_rows)) // self.cell_height
+        cell_col_index = (col_start + np.arange(local_cols)) // self.cell_width
+        row_segments = _segment_starts(cell_row_index)
+        col_segments = _segment_starts(cell_col_index)
+        cells = np.ix_(cell_row_index[row_segments], cell_col_index[col_segments])
+        return local_rows, local_cols, row_segments, col_segments, cells
+
+    @staticmethod
+    def _add_cell_sums(target: np.ndarray, values: np.ndarray, layout: tuple):
+        # Reduce consecutive columns, then consecutive rows, that fall into the same grid cell
+        local_rows, local_cols, row_segments, col_segments, cells = layout
+        per_row = np.add.reduceat(values[:local_rows, :local_cols], col_segments, axis=1, dtype=target.dtype)
+        target[cells] += np.add.reduceat(per_row, row_segments, axis=0)
+
+    def add_block(self, row_start: int, col_start: int, block: np.ndarray):
+        """Add a BGR block whose top-left pixel is (`row_start`, `col_start`) in the full image."""
+        b, g, r = block[:, :, 0], block[:, :, 1], block[:, :, 2]
+        layout = self._cell_layout(row_start, col_start, block.shape)
+
+        # ExG in int16 so 2*G - R - B cannot wrap around
+        exg = g.astype(np.int16)
+        exg *= 2
+        exg -= r
+        exg -= b
+        vegetation = exg > EXG_VEGETATION_THRESHOLD
+        if layout is not None:
+            self._add_cell_sums(self.cell_exg_sums, exg, layout)
+            self._add_cell_sums(self.cell_counts, vegetation, layout)
+        del exg
+        self.vegetation_pixels += int(np.count_nonzero(vegetation))
+        del vegetation
+
+        # G/R ratio, same epsilon as before to prevent division by zero
+        green = g.astype(np.float32)
+        green += 1e-6
+        red = r.astype(np.float32)
+        red += 1e-6
+        np.divide(green, red, out=green)
+        self.gr_ratio_sum += float(green.sum(dtype=np.float64))
+        if layout is not None:
+            self._add_cell_sums(self.cell_gr_ratio_sums, green, layout)
+        del green, red
+
+    def cell_coverage(self) -> np.ndarray:
+        """Vegetation coverage (%) of each grid cell."""
+        return self.cell_counts / float(self.cell_height * self.cell_width) * 100
+
+    def cell_grids(self) -> np.ndarray:
+        """Per-cell coverage (%), mean ExG and mean G/R, stacked in cell_grid.CHANNELS order."""
+        cell_pixels = float(self.cell_height * self.cell_width)
+        return np.stack([self.cell_coverage(), self.cell_exg_sums / cell_pixels, self.cell_gr_ratio_sums / cell_pixels])
+
+    def result(self) -> dict:
+        total_pixels = self.height * self.width
+        coverage_percentage = self.vegetation_pixels / total_pixels * 100
+        gr_ratio = self.gr_ratio_sum / total_pixels
+
+        # Coefficient of variation (CV) of the per-cell coverage as uniformity measure
+        coverage_values = self.cell_coverage()
+        mean_coverage = float(np.mean(coverage_values))
+        std_coverage = float(np.std(coverage_values))
+        uniformity_index = (std_coverage / mean_coverage * 100) if mean_coverage > 0 else 0
+
+        return {
+            "coverage": round(coverage_percentage, 2),
+            "canopy_color_index": round(gr_ratio, 2),
+            "uniformity_index": round(uniformity_index, 2)
+        }
+
+
+def drone_view_metrics(image: np.ndarray, grid_rows: int = 5, grid_cols: int = 5) -> DroneViewAccumulator:
+    """Run the drone-view accumulator over an in-memory BGR image, strip by strip."""
+    height, width = image.shape[:2]
+    accumulator = DroneViewAccumulator(height, width, grid_rows, grid_cols)
+    strip_rows = max(1, DRONE_VIEW_STRIP_PIXELS // width)
+    for row_start in range(0, height, strip_rows):
+        accumulator.add_block(row_start, 0, image[row_start:row_start + strip_rows])
+    return accumulator
+
+
+def drone_view_metrics_tiled(image_path: str, height: int, width: int, grid_rows: int = 5, grid_cols: int = 5, reduction: int = 1) -> DroneViewAccumulator:
+    """
+    Run the drone-view accumulator over a TIFF read block by block, without ever
+    holding the full image in memory.
+
+    Coverage and per-cell counts are integer sums and match the in-memory path
+    exactly. The G/R mean is summed in float64 per block, so it differs from the
+    in-memory value only by summation order (relative error < 1e-9, i.e. at most
+    one unit in the last of the 2 reported decimals).
+
+    With a `reduction` above 1 (the preview phase), only every `reduction`-th
+    row and column is analysed, like a reduced decode: the per-pixel work drops
+    by `reduction`², and uncompressed (memory-mapped) images only read those
+    rows. Compressed tiles are still decoded whole.
+    """
+    accumulator = DroneViewAccumulator(-(-height // reduction), -(-width // reduction), grid_rows, grid_cols)
+    for row_start, col_start, block in iter_tiff_bgr_blocks(image_path, DRONE_VIEW_STRIP_PIXELS * reduction ** 2):
+        if reduction > 1:
+            # Keep the pixels on the image-wide sampling lattice, whichever block they fall in
+            row_offset, col_offset = -row_start % reduction, -col_start % reduction
+            block = block[row_offset::reduction, col_offset::reduction]
+            if block.size == 0:
+                continue
+            row_start, col_start = (row_start + row_offset) // reduction, (col_start + col_offset) // reduction
+        accumulator.add_block(row_start, col_start, block)
+    return accumulator
+
+
+def _drone_view_result(accumulator: DroneViewAccumulator) -> dict:
+    return {**accumulator.result(), "cell_grid": cell_grid.encode(accumulator.cell_grids())}
+
+
+def analyze_drone_view(image_path: str, image_context: Optional[ImageContext] = None, grid_size: Optional[int] = None, tiled: Optional[bool] = None, image_info: Optional[dict] = None) -> dict:
+    """
+    Analyze drone view for coverage, color index, and uniformity.
+
+    Coverage uses the ExG (Excess Green) index to separate vegetation from
+    background (soil, water, etc.), the color index is the mean G/R ratio, and
+    uniformity is the CV of coverage over a `grid_size` x `grid_size` grid.
+    The per-cell grids (see cell_grid.CHANNELS) are returned as `cell_grid`.
+
+    Large TIFF orthomosaics are streamed in tiles (see `drone_view_metrics_tiled`)
+    when `tiled` is True, or when it is None and the image has at least
+    DRONE_VIEW_TILED_MIN_MEGAPIXELS pixels and is not already decoded in the context.
+    `image_info` (the metadata probed at upload, see image_probe) answers that
+    without reopening the file. Streamed images honour the context's reduction
+    by subsampling the tiles, so the preview of an orthomosaic stays cheap.
+    """
     print(f"Analyzing drone view: {image_path}")
+    image_context = image_context or ImageContext()
+    grid_size = grid_size or settings.DRONE_VIEW_GRID_SIZE
+
+    if tiled is not False and not image_context.has_decoded(image_path):
+        if image_info is not None:
+            tiff_size = (image_info["height"], image_info["width"]) if image_info.get("streamable_tiff") else None
+        else:
+            tiff_size = probe_streamable_tiff(image_path)
+        if tiff_size is not None:
+            height, width = tiff_size
+            if tiled or height * width >= settings.DRONE_VIEW_TILED_MIN_MEGAPIXELS * 1_000_000:
+                print(f"Using tiled mode for {width}x{height} drone image")
+                return _drone_view_result(
+                    drone_view_metrics_tiled(image_path, height, width, grid_size, grid_size, reduction=image_context.reduction)
+                )
     
-    # Load the image
-    image = cv2.imread(image_path)
+    # Load the image (decoded once per task and shared through the context)
+    image = image_context.bgr(image_path)
     if image is None:
         raise ValueError(f"Could not load image from {image_path}")
     
-    # Calculate coverage percentage using ExG (Excess Green) index
-    # This separates vegetation (green) from background (soil, water, etc.)
-    b, g, r = cv2.split(image)
-    ExG = 2 * g - r - b
-    
-    # Threshold to separate vegetation from background
-    # Values above threshold are considered vegetation
-    _, mask = cv2.threshold(ExG, 50, 255, cv2.THRESH_BINARY)
-    
-    # Calculate coverage percentage
-    total_pixels = image.shape[0] * image.shape[1]
-    vegetation_pixels = cv2.countNonZero(mask)
-    coverage_percentage = (vegetation_pixels / total_pixels) * 100
-    
-    # Calculate average canopy color index (G/R ratio)
-    # Higher values indicate greener, healthier plants
-    green_channel = image[:, :, 1].astype(np.float32) + 1e-6  # Add small value to prevent division by zero
-    red_channel = image[:, :, 2].astype(np.float32) + 1e-6
-    gr_ratio = np.mean(green_channel / red_channel)
-    
-    # Calculate uniformity index (coefficient of variation in grid cells)
-    # Divide image into grid and calculate coverage in each cell
-    rows, cols = mask.shape
-    grid_rows, grid_cols = 5, 5  # 5x5 grid
-    cell_height = rows // grid_rows
-    cell_width = cols // grid_cols
-    
-    coverage_values = []
-    for i in range(grid_rows):
-        for j in range(grid_cols):
-            start_row = i * cell_height
-            end_row = (i + 1) * cell_height
-            start_col = j * cell_width
-            end_col = (j + 1) * cell_width
-            
-            cell_mask = mask[start_row:end_row, start_col:end_col]
-            cell_total = cell_mask.shape[0] * cell_mask.shape[1]
-            cell_vegetation = cv2.countNonZero(cell_mask)
-            cell_coverage = (cell_vegetation / cell_total) * 100 if cell_total > 0 else 0
-            coverage_values.append(cell_coverage)
-    
-    # Calculate coefficient of variation (CV) as uniformity measure
-    coverage_values = np.array(coverage_values)
-    mean_coverage = np.mean(coverage_values)
-    std_coverage = np.std(coverage_values)
-    uniformity_index = (std_coverage / mean_coverage * 100) if mean_coverage > 0 else 0
-    
-    return {
-        "coverage": round(coverage_percentage, 2),
-        "canopy_color_index": round(gr_ratio, 2),
-        "uniformity_index": round(uniformity_index, 2)
-    }
+    return _drone_view_result(drone_view_metrics(image, grid_size, grid_size))
 
 
-def analyze_side_view_height(image_path_3m_vertical: str) -> dict:
+def analyze_side_view_height(image_path_3m_vertical: str, image_context: Optional[ImageContext] = None) -> dict:
     """Analyze side view for plant height using whiteboard calibration."""
     print(f"Analyzing side view for height: {image_path_3m_vertical}")
+    image_context = image_context or ImageContext()
     
     # Load the image
-    image = cv2.imread(image_path_3m_vertical)
+    image = image_context.bgr(image_path_3m_vertical)
     if image is None:
         raise ValueError(f"Could not load image from {image_path_3m_vertical}")
     
     # Find white background board in the image to use as reference for calibration
-    # Convert to HSV for better color segmentation
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    # Use the shared HSV view for better color segmentation
+    hsv = image_context.hsv(image_path_3m_vertical)
     
     # Define range for white color in HSV
     lower_white = np.array([0, 0, 200])
@@ -99,8 +249,8 @@ def analyze_side_view_height(image_path_3m_vertical: str) -> dict:
         pixels_per_cm = h / 200.0
         
         # Now find plant contours to measure their height
-        # Convert image to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Grayscale view of the image (shared through the context)
+        gray = image_context.gray(image_path_3m_vertical)
         
         # Apply threshold to separate plants from background
         _, plant_mask = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY)
@@ -110,13 +260,14 @@ def analyze_side_view_height(image_path_3m_vertical: str) -> dict:
         plant_mask = cv2.morphologyEx(plant_mask, cv2.MORPH_CLOSE, kernel)
         plant_mask = cv2.morphologyEx(plant_mask, cv2.MORPH_OPEN, kernel)
         
-        # Find plant contours
+        # Find plant contours (noise threshold is 100 px² at full resolution)
+        min_plant_area = 100 * image_context.scale ** 2
         plant_contours, _ = cv2.findContours(plant_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         # Calculate heights for each plant in the image
         plant_heights = []
         for contour in plant_contours:
-            if cv2.contourArea(contour) > 100:  # Filter out small noise
+            if cv2.contourArea(contour) > min_plant_area:  # Filter out small noise
                 # Get bounding rectangle of the plant
                 x_plant, y_plant, w_plant, h_plant = cv2.boundingRect(contour)
                 
@@ -142,9 +293,10 @@ def analyze_side_view_height(image_path_3m_vertical: str) -> dict:
     }
 
 
-def analyze_side_view_advanced(horizontal_path: str, vertical_path: str) -> dict:
+def analyze_side_view_advanced(horizontal_path: str, vertical_path: str, image_context: Optional[ImageContext] = None) -> dict:
     """Analyze side views to estimate basic seedling count per mu and panicles per mu."""
     print(f"Analyzing advanced metrics from: {horizontal_path} and {vertical_path}")
+    image_context = image_context or ImageContext()
     
     # Using the horizontal image to calculate row spacing (between rows)
     # Using the vertical image to calculate plant spacing (within rows)
@@ -156,8 +308,8 @@ def analyze_side_view_advanced(horizontal_path: str, vertical_path: str) -> dict
     
     try:
         # Load images
-        horizontal_img = cv2.imread(horizontal_path)
-        vertical_img = cv2.imread(vertical_path)
+        horizontal_img = image_context.bgr(horizontal_path)
+        vertical_img = image_context.bgr(vertical_path)
         
         # Estimate row spacing from horizontal image
         # Estimate plant spacing from vertical image
@@ -3,26 +3,67 @@ import google.generativeai as genai
 from app.core.config import settings
 import pathlib
 import json
-from PIL import Image
+import mimetypes
+from typing import Optional
+
+from .image_context import ImageContext
 
 # Configure the Gemini API key
 genai.configure(api_key=settings.GEMINI_API_KEY)
 
-def analyze_with_gemini(drone_image_path: str, side_image_05m_path: str, side_image_horizontal_path: str, side_image_vertical_path: str) -> dict:
+GEMINI_MODEL_NAME = 'gemini-pro-vision'
+# Bump whenever the prompt or the response parsing changes, so cached results are not reused
+PROMPT_VERSION = "1"
+# Image formats Gemini accepts as-is; these are sent as the uploaded bytes without decoding
+NATIVE_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic", "image/heif"}
+# Prefix of gemini_analysis_text when the call failed and fallback values were returned
+FAILURE_PREFIX = "AI analysis failed"
+
+
+def is_failed_result(gemini_results: dict) -> bool:
+    return (gemini_results.get("gemini_analysis_text") or "").startswith(FAILURE_PREFIX)
+
+
+def _image_part(image_path: str, image_context: ImageContext):
+    """
+    Request part for one image. Natively supported formats are sent as the
+    original file bytes, so this I/O-bound step does no pixel decoding; anything
+    else (e.g. TIFF orthomosaics) is converted through the shared image context.
+    """
+    mime_type, _ = mimetypes.guess_type(image_path)
+    if mime_type in NATIVE_MIME_TYPES:
+        return {"mime_type": mime_type, "data": pathlib.Path(image_path).read_bytes()}
+    return image_context.pil(image_path)
+
+
+def failure_result(error: str) -> dict:
+    """Fallback values stored when the Gemini analysis could not be completed."""
+    return {
+        "gemini_analysis_text": f"{FAILURE_PREFIX}: {error}",
+        "gemini_suggestions": "Could not generate suggestions due to an error.",
+        "pest_risk": "Unknown",
+        "leaf_color_health": "Unknown",
+        "lodging_status": "Unknown",
+    }
+
+
+def analyze_with_gemini(drone_image_path: str, side_image_05m_path: str, side_image_horizontal_path: str, side_image_vertical_path: str, image_context: Optional[ImageContext] = None) -> dict:
     """
     Analyzes rice paddy images using the Gemini Pro Vision model.
+    Images that must be converted are decoded through `image_context`.
     """
     print("Starting analysis with Gemini Pro Vision...")
+    image_context = image_context or ImageContext()
 
     try:
         # Model initialization
-        model = genai.GenerativeModel('gemini-pro-vision')
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
 
         # Load images
-        drone_image = Image.open(drone_image_path)
-        side_image_05m = Image.open(side_image_05m_path)
-        side_image_horizontal = Image.open(side_image_horizontal_path)
-        side_image_vertical = Image.open(side_image_vertical_path)
+        drone_image = _image_part(drone_image_path, image_context)
+        side_image_05m = _image_part(side_image_05m_path, image_context)
+        side_image_horizontal = _image_part(side_image_horizontal_path, image_context)
+        side_image_vertical = _image_part(side_image_vertical_path, image_context)
 
         prompt = """
         You are an expert agricultural analyst specializing in rice cultivation.
@@ -74,7 +115,10 @@ def analyze_with_gemini(drone_image_path: str, side_image_05m_path: str, side_im
         """
 
         # Generate content
-        response = model.generate_content([prompt, drone_image, side_image_horizontal, side_image_vertical, side_image_05m])
+        response = model.generate_content(
+            [prompt, drone_image, side_image_horizontal, side_image_vertical, side_image_05m],
+            request_options={"timeout": settings.GEMINI_TIMEOUT_SECONDS},
+        )
 
         # Clean and parse the JSON response
         cleaned_response_text = response.text.strip().replace("```json", "").replace("```", "")
@@ -106,11 +150,5 @@ def analyze_with_gemini(drone_image_path: str, side_image_05m_path: str, side_im
     except Exception as e:
         print(f"An error occurred during Gemini analysis: {e}")
         # Return a dictionary with error information
-        return {
-            "gemini_analysis_text": f"AI analysis failed: {e}",
-            "gemini_suggestions": "Could not generate suggestions due to an error.",
-            "pest_risk": "Unknown",
-            "leaf_color_health": "Unknown",
-            "lodging_status": "Unknown",
-        }
+        return failure_result(str(e))
 
@@ -0,0 +1,73 @@
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import tifffile
+
+# Photometric interpretations / sample layouts the drone-view step can stream
+_STREAMABLE_PHOTOMETRIC = (tifffile.PHOTOMETRIC.RGB,)
+_STREAMABLE_SAMPLES = (3, 4)  # RGB or RGBA
+
+# Upper bound on compressed bytes tifffile reads ahead while streaming chunks
+_READ_BUFFER_BYTES = 8 * 1024 * 1024
+
+
+def is_streamable_page(page: "tifffile.TiffPage") -> bool:
+    """True if the page can be streamed block by block (8-bit, chunky RGB/RGBA)."""
+    return (
+        page.photometric in _STREAMABLE_PHOTOMETRIC
+        and page.samplesperpixel in _STREAMABLE_SAMPLES
+        and page.planarconfig == tifffile.PLANARCONFIG.CONTIG
+        and page.dtype == np.uint8
+    )
+
+
+def probe_streamable_tiff(image_path: str) -> Optional[Tuple[int, int]]:
+    """
+    Return (height, width) if `image_path` is a TIFF/GeoTIFF whose first page can
+    be streamed block by block, else None.
+
+    Only the TIFF header and IFD are read; no pixel data is decoded.
+    """
+    try:
+        with tifffile.TiffFile(image_path) as tif:
+            page = tif.pages[0]
+            if is_streamable_page(page):
+                return page.imagelength, page.imagewidth
+    except (tifffile.TiffFileError, OSError, ValueError):
+        pass
+    return None
+
+
+def iter_tiff_bgr_blocks(image_path: str, max_block_pixels: int) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Yield (row_start, col_start, bgr_block) covering the first page of a TIFF.
+
+    Uncompressed contiguous images are memory-mapped and sliced into row strips of
+    at most `max_block_pixels`. Compressed images are decoded one strip or tile at
+    a time, so peak memory is bounded by the chunk size chosen when the file was
+    written (GeoTIFF orthomosaics are typically 256x256 or 512x512 tiles).
+    Blocks are channel-reversed views, not copies.
+    """
+    with tifffile.TiffFile(image_path) as tif:
+        page = tif.pages[0]
+        height, width = page.imagelength, page.imagewidth
+
+        if page.is_memmappable:
+            image = tif.asarray(out="memmap")
+            strip_rows = max(1, max_block_pixels // width)
+            try:
+                for row_start in range(0, height, strip_rows):
+                    yield row_start, 0, image[row_start:row_start + strip_rows, :, 2::-1]
+            finally:
+                del image
+            return
+
+        # Decoded segments are (1, rows, cols, samples); edge tiles may be padded.
+        # Compressed chunks are read from disk in batches of at most _READ_BUFFER_BYTES.
+        for segment, indices, shape in page.segments(maxworkers=1, buffersize=_READ_BUFFER_BYTES):
+            if segment is None:
+                # Sparse (empty) chunk, read back as zeros by full decoders
+                segment = np.zeros(shape, dtype=np.uint8)
+            row_start, col_start = indices[2], indices[3]
+            block = segment[0, :height - row_start, :width - col_start]
+            yield row_start, col_start, block[:, :, 2::-1]
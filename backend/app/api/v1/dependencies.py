@@ -1,32 +1,78 @@
+from typing import Tuple
+
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 
 from app.core.security import oauth2_scheme
 from app.core.config import settings
-from app.crud import crud_user
-from app.db.base import get_db
+from app.core.user_cache import get_user_cache, user_from_snapshot, user_snapshot
+from app.crud import crud_user, crud_user_async
+from app.db.base import get_async_db, get_db
 from app.db.models import User
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_claims(token: str) -> Tuple[str, int]:
+    """Username and token version of an access token (tokens issued before versioning count as version 0)."""
     try:
         # Decode JWT token to get user information
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
+            raise _credentials_exception()
+        token_version = int(payload.get("ver", 0))
+    except (JWTError, TypeError, ValueError):
+        raise _credentials_exception()
+    return username, token_version
+
+def _check_token_version(user: User, token_version: int) -> User:
+    # A password reset bumps the version, revoking the tokens issued before it
+    if user is None or user.token_version != token_version:
+        raise _credentials_exception()
+    return user
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    username, token_version = _token_claims(token)
+    if not settings.USER_CACHE_ENABLED:
+        return _check_token_version(crud_user.get_user_by_username(db, username=username), token_version)
+
+    cache = get_user_cache()
+    snapshot = cache.get(username, token_version)
+    if snapshot is not None:
+        return user_from_snapshot(snapshot)
     # Get user from database
-    user = crud_user.get_user_by_username(db, username=username)
-    if user is None:
-        raise credentials_exception
+    read_generation = cache.generation
+    user = _check_token_version(crud_user.get_user_by_username(db, username=username), token_version)
+    cache.put(user_snapshot(user), read_generation)
+    return user
+
+async def _off_loop(cache, method, *args):
+    # The Redis tier uses a blocking client: keep its calls off the event loop
+    if cache.redis is not None:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    """`get_current_user` for async endpoints: runs on the event loop with the async pool."""
+    username, token_version = _token_claims(token)
+    if not settings.USER_CACHE_ENABLED:
+        return _check_token_version(await crud_user_async.get_user_by_username(db, username=username), token_version)
+
+    cache = get_user_cache()
+    snapshot = cache.get_local(username, token_version) or await _off_loop(cache, cache.get_shared, username, token_version)
+    if snapshot is not None:
+        return user_from_snapshot(snapshot)
+    read_generation = cache.generation
+    user = _check_token_version(await crud_user_async.get_user_by_username(db, username=username), token_version)
+    await _off_loop(cache, cache.put, user_snapshot(user), read_generation)
     return user
 
 def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
@@ -36,4 +82,3 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)) -> Us
             detail="The user doesn't have enough privileges",
         )
     return current_user
-
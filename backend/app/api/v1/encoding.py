@@ -0,0 +1,174 @@
+import gzip
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Type
+
+import brotli
+import msgpack
+import numpy as np
+import orjson
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.config import settings
+
+# Content negotiation of the analysis endpoints, whose bodies (a season of
+# heatmap frames, a period of results) reach several MB.
+#
+# Format (Accept): JSON by default, serialized with orjson. Endpoints with a
+# tabular or grid payload also offer application/msgpack, a columnar
+# encoding: numeric columns and grids are msgpack bin values holding
+# little-endian arrays (float64 columns, see `columns`; fixed-point int32
+# grids, see `fixed_point`), which the frontend views as typed arrays
+# without parsing numbers (see frontend/src/api).
+#
+# Compression (Accept-Encoding): bodies of at least
+# RESPONSE_COMPRESSION_MIN_BYTES are sent with brotli when the client accepts
+# it, else gzip.
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+# OpenAPI `responses` of the endpoints offering the columnar encoding
+COLUMNAR_RESPONSES = {200: {"content": {MSGPACK_MEDIA_TYPES[0]: {}}}}
+
+
+def _qualities(header: Optional[str]) -> Dict[str, float]:
+    """Lower-cased token -> q of an Accept or Accept-Encoding header (a malformed q counts as 0)."""
+    qualities = {}
+    for item in (header or "").split(","):
+        token, *parameters = (part.strip() for part in item.split(";"))
+        if not token:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[token.lower()] = quality
+    return qualities
+
+
+def wants_columnar(request: Request) -> bool:
+    """Whether the client asked for msgpack at least as strongly as for JSON."""
+    accepted = _qualities(request.headers.get("accept"))
+    quality = max(accepted.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    return quality > 0 and quality >= accepted.get(JSON_MEDIA_TYPE, 0.0)
+
+
+def content_coding(request: Request) -> Optional[str]:
+    """"br", "gzip" or None (identity), by server preference among the codings the client accepts."""
+    accepted = _qualities(request.headers.get("accept-encoding"))
+    for coding in ("br", "gzip"):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: Optional[str]) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+    return body
+
+
+def encode_json(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot encode {type(value).__name__} as msgpack")
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True, default=_msgpack_default)
+
+
+def typed_array(array: np.ndarray) -> bytes:
+    """Little-endian bytes of an array, row-major (a msgpack bin value of the columnar encoding)."""
+    return np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).tobytes()
+
+
+def fixed_point(array: np.ndarray, decimals: int) -> Dict[str, Any]:
+    """
+    Array rounded to `decimals` as int32 multiples of `scale`, which compress
+    far better than float mantissas: {"dtype": "int32", "scale", "data"}.
+    """
+    return {"dtype": "int32", "scale": 10 ** -decimals, "data": typed_array(np.round(array * 10 ** decimals).astype(np.int32))}
+
+
+def _is_numeric(values: Sequence[Any]) -> bool:
+    present = [value for value in values if value is not None]
+    return bool(present) and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present)
+
+
+def columns(records: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Columnar form of a list of rows sharing their keys: {"length": n,
+    "columns": {name: values}}. Numeric columns are float64 arrays (None as
+    NaN; integers are exact up to 2**53, like JavaScript numbers), the
+    others are plain lists.
+    """
+    names = list(records[0]) if records else []
+    encoded = {}
+    for name in names:
+        values = [record[name] for record in records]
+        if _is_numeric(values):
+            encoded[name] = typed_array(np.array([np.nan if value is None else value for value in values], dtype=np.float64))
+        else:
+            encoded[name] = values
+    return {"length": len(records), "columns": encoded}
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def dump_models(schema: Type[BaseModel], items: Sequence[Any]) -> List[dict]:
+    """JSON-ready dicts of ORM objects or models through a response schema, as `response_model` does."""
+    adapter = _list_adapter(schema)
+    return adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+
+
+def _encode(content: Callable[[], Any], columnar_content: Optional[Callable[[], Any]], columnar: bool, coding: Optional[str]):
+    if columnar:
+        body, media_type = encode_msgpack(columnar_content()), MSGPACK_MEDIA_TYPES[0]
+    else:
+        body, media_type = encode_json(content()), JSON_MEDIA_TYPE
+    if coding is None or len(body) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        return body, media_type, None
+    return compress(body, coding), media_type, coding
+
+
+async def negotiated_response(
+    request: Request,
+    content: Callable[[], Any],
+    columnar_content: Optional[Callable[[], Any]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    Response in the format and content coding the request negotiates. The
+    payload builders are only called for the chosen format: `content` for
+    JSON, `columnar_content` (when the endpoint offers it) for msgpack.
+    Serialization and compression run in the thread pool, off the event loop.
+    Headers set on an injected Response (e.g. X-Next-Cursor) must be passed
+    in `headers`, since FastAPI does not merge them into a returned Response.
+    """
+    columnar = columnar_content is not None and wants_columnar(request)
+    body, media_type, coding = await run_in_threadpool(
+        _encode, content, columnar_content, columnar, content_coding(request)
+    )
+    response = Response(content=body, media_type=media_type, headers=dict(headers or {}))
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    if coding is not None:
+        response.headers["Content-Encoding"] = coding
+    return response
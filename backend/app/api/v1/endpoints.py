@@ -1,38 +1,119 @@
-from datetime import date, timedelta
-from typing import List, Optional
+import asyncio
+import hashlib
+import math
+import os
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional
+from uuid import uuid4
 
-from fastapi import APIRouter, Body, Depends, HTTPException, status, UploadFile, File
+import numpy as np
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from celery import group as celery_group
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.analysis import derivatives, field_statistics, heatmap, image_probe, main_processor
+from app.core import storage, uploads
+from app.core.config import settings
+from app.core.password_hashing import PasswordHashingBusy, get_password_hasher
 from app.core.security import create_access_token
-from app.crud import crud_analysis_result, crud_field, crud_user, crud_photogroup
-from app.db.base import get_db
-from app.db.models import User, PhotoGroup, AnalysisResult, Field
+from app.core.user_cache import get_user_cache
+from app.crud import crud_analysis_result, crud_field, crud_user, crud_photogroup, crud_upload_session, crud_upload_batch
+from app.crud import crud_analysis_result_async, crud_field_async, crud_user_async
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError, Page
+from app.db.base import get_async_db, get_db
+from app.db.models import User, PhotoGroup, AnalysisResult, AnalysisStatusEnum, Field, UploadBatch, UploadSession, UploadSessionStatusEnum
 from app.schemas import analysis_result as ar_schema
 from app.schemas import field as field_schema
 from app.schemas import user as user_schema
 from app.schemas import photogroup as pg_schema
+from app.schemas import upload_batch as upload_batch_schema
+from app.schemas import upload_session as upload_schema
 from app.schemas.token import Token
 from app.worker.tasks import run_analysis
 
-from .dependencies import get_current_user, get_current_admin_user
+from . import encoding
+from .dependencies import get_current_user, get_current_user_async, get_current_admin_user
 
 router = APIRouter()
 analysis_router = APIRouter()
 
 
+# region Pagination
+# List endpoints return one page as a plain JSON list; when more rows follow,
+# the X-Next-Cursor response header holds the `cursor` to pass for the next page.
+def _page_items(response: Response, page: Page) -> list:
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+def _invalid_cursor(e: InvalidCursorError) -> HTTPException:
+    return HTTPException(status_code=422, detail=str(e))
+
+
+# endregion
+
+
+# region Result validators
+# Analysis results only change when a photo group is (re)analysed, so their
+# responses carry strong ETags computed from a one-row lookup (see
+# crud_analysis_result.get_result_validators and Field.results_version), and
+# If-None-Match is answered with 304 before any ORM object is loaded.
+def _result_etag(*parts) -> str:
+    key = "|".join(str(part) for part in (*parts, main_processor.ALGORITHM_VERSION))
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def _result_headers(etag: str, final: bool) -> Dict[str, str]:
+    """Final results are cached by the browser; the others are revalidated on every use."""
+    cache_control = f"private, max-age={settings.RESULT_CACHE_MAX_AGE}, immutable" if final else "private, no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+# endregion
+
+
 # region Authentication
+# bcrypt runs on the password hashing pool (app/core/password_hashing.py), so
+# these endpoints are async: a login waiting for its hash holds no request thread.
+async def _hash_password(password: str) -> str:
+    try:
+        return await get_password_hasher().hash(password)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
+
+
+async def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await get_password_hasher().verify(plain_password, hashed_password)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
+
+
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": "2"},
+    )
+
+
 @router.post("/token", response_model=Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = crud_user.authenticate_user(
-        db, username=form_data.username, password=form_data.password
-    )
+    user = await crud_user_async.get_user_by_username(db, username=form_data.username)
+    if user and not await _verify_password(form_data.password, user.hashed_password):
+        user = None
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,7 +122,7 @@ def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "ver": user.token_version}, expires_delta=access_token_expires
     )
     return {
         "access_token": access_token,
@@ -56,32 +137,61 @@ def login_for_access_token(
 
 # region User
 @router.post("/users/", response_model=user_schema.User, tags=["Users"])
-def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user_by_username(db, username=user.username)
+async def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(crud_user.get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered",
         )
-    return crud_user.create_user(db=db, user=user)
+    hashed_password = await _hash_password(user.password)
+    return await run_in_threadpool(crud_user.create_user, db, user, hashed_password)
 
 
 @router.get("/users/me", response_model=user_schema.User, tags=["Users"])
-def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
+def read_users_me(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    # The reset token is not in the user cache, so read the row itself
+    return crud_user.get_user(db, current_user.id)
 
 @router.get("/users/", response_model=List[user_schema.User], tags=["Users"])
 def read_users(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
     """
-    Retrieve all users. Admin only.
+    Retrieve all users, by id, one page at a time. Admin only.
     """
-    users = crud_user.get_users(db, skip=skip, limit=limit)
-    return users
+    try:
+        page = crud_user.get_users(db, cursor=cursor, limit=limit)
+    except InvalidCursorError as e:
+        raise _invalid_cursor(e)
+    return _page_items(response, page)
+
+@router.put("/users/{user_id}/role", response_model=user_schema.User, tags=["Users"])
+def update_user_role(
+    user_id: int,
+    role_update: user_schema.UserRoleUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Change a user's role. Admin only.
+    """
+    db_user = crud_user.get_user(db, user_id=user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return crud_user.update_user_role(db, user=db_user, role=role_update.role)
+
+
+@router.get("/users/cache-metrics", response_model=dict, tags=["Users"])
+def read_user_cache_metrics(current_user: User = Depends(get_current_admin_user)):
+    """
+    Hit rate and size of this API process's authenticated-user cache. Admin only.
+    """
+    return get_user_cache().metrics()
 
 @router.post("/password-recovery/{username}", response_model=dict, tags=["Users"])
 def recover_password(username: str, db: Session = Depends(get_db)):
@@ -102,7 +212,7 @@ def recover_password(username: str, db: Session = Depends(get_db)):
 
 
 @router.post("/reset-password/", response_model=dict, tags=["Users"])
-def reset_password(
+async def reset_password(
     token: str = Body(...),
     new_password: str = Body(...),
     db: Session = Depends(get_db),
@@ -110,12 +220,13 @@ def reset_password(
     """
     Reset password.
     """
-    user = crud_user.get_user_by_password_reset_token(db, token=token)
+    user = await run_in_threadpool(crud_user.get_user_by_password_reset_token, db, token)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token"
         )
-    crud_user.reset_password(db, user=user, new_password=new_password)
+    hashed_password = await _hash_password(new_password)
+    await run_in_threadpool(crud_user.reset_password, db, user, hashed_password)
     return {"message": "Password updated successfully"}
 
 
@@ -133,40 +244,69 @@ def create_field(
 
 
 @router.get("/fields/", response_model=List[field_schema.Field], tags=["Fields"])
-def read_fields(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def read_fields(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    fields = crud_field.get_fields_by_owner(
-        db, owner_id=current_user.id, skip=skip, limit=limit
-    )
-    return fields
+    try:
+        page = await crud_field_async.get_fields_by_owner(
+            db, owner_id=current_user.id, cursor=cursor, limit=limit
+        )
+    except InvalidCursorError as e:
+        raise _invalid_cursor(e)
+    return _page_items(response, page)
 
 
 @router.get("/fields/{field_id}", response_model=field_schema.Field, tags=["Fields"])
-def read_field(
+async def read_field(
     field_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    db_field = crud_field.get_field(db, field_id=field_id)
+    db_field = await crud_field_async.get_field(db, field_id=field_id)
     if db_field is None:
         raise HTTPException(status_code=404, detail="Field not found")
     if db_field.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     return db_field
 
-@router.get("/fields/{field_id}/results", response_model=List[pg_schema.PhotoGroup], tags=["Fields"])
-def read_field_results(
+@router.get(
+    "/fields/{field_id}/results",
+    response_model=List[pg_schema.PhotoGroup],
+    responses={304: {"description": "Not modified"}},
+    tags=["Fields"],
+)
+async def read_field_results(
     field_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    """Retrieve all analysis photo groups for a specific field."""
-    results = crud_field.get_field_results(db, field_id=field_id, owner_id=current_user.id)
-    return results
+    """
+    Retrieve the analysis photo groups of a specific field, newest capture
+    first, one page at a time. The ETag follows the field's results_version,
+    so a poll of an unchanged field is answered with 304 from one lookup.
+    """
+    results_version = await crud_field_async.get_field_results_version(db, field_id, current_user.id)
+    if results_version is None:
+        return []
+    headers = _result_headers(_result_etag("field-results", field_id, results_version), final=False)
+    if _not_modified(request, headers["ETag"], None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    try:
+        page = await crud_field_async.get_field_results(
+            db, field_id=field_id, owner_id=current_user.id, cursor=cursor, limit=limit
+        )
+    except InvalidCursorError as e:
+        raise _invalid_cursor(e)
+    response.headers.update(headers)
+    return _page_items(response, page)
 
 
 @router.put("/fields/{field_id}", response_model=field_schema.Field, tags=["Fields"])
@@ -195,7 +335,14 @@ def delete_field(
         raise HTTPException(status_code=404, detail="Field not found")
     if db_field.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    return crud_field.delete_field(db, field_id=field_id)
+    photo_paths = [
+        getattr(photo_group, f"{name}_path")
+        for photo_group in db_field.photo_groups
+        for name in uploads.PHOTO_NAMES
+    ]
+    deleted_field = crud_field.delete_field(db, field_id=field_id)
+    storage.release_blobs(db, photo_paths)
+    return deleted_field
 
 
 # endregion
@@ -203,7 +350,7 @@ def delete_field(
 
 # region Photo Upload
 @router.post("/photogroups/upload", response_model=pg_schema.PhotoGroup, tags=["Photo Groups"])
-def upload_photo_group(
+async def upload_photo_group(
     drone_photo: UploadFile = File(...),
     side_photo_05m: UploadFile = File(...),
     side_photo_3m_horizontal: UploadFile = File(...),
@@ -220,74 +367,254 @@ def upload_photo_group(
     - side_photo_05m: Side view at 0.5m height
     - side_photo_3m_horizontal: Side view at 3m height (horizontal orientation)
     - side_photo_3m_vertical: Side view at 3m height (vertical orientation)
+
+    The four files are streamed to disk concurrently in fixed-size chunks, with
+    their SHA-256 and size computed on the fly, so memory use per upload does
+    not depend on the file sizes. Blocking work runs in the threadpool.
     """
     # Verify that the field belongs to the current user
-    db_field = crud_field.get_field(db, field_id=field_id)
+    db_field = await run_in_threadpool(crud_field.get_field, db, field_id=field_id)
     if not db_field:
         raise HTTPException(status_code=404, detail="Field not found")
     if db_field.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    # Save uploaded files
-    import os
-    from datetime import datetime
-    from uuid import uuid4
-    
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filenames to prevent conflicts
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid4())[:8]
-    
-    # Save drone photo
-    drone_filename = f"drone_{timestamp}_{unique_id}_{drone_photo.filename}"
-    drone_path = os.path.join(upload_dir, drone_filename)
-    with open(drone_path, "wb") as buffer:
-        buffer.write(drone_photo.file.read())
-    
-    # Save 0.5m side photo
-    side_05m_filename = f"side_05m_{timestamp}_{unique_id}_{side_photo_05m.filename}"
-    side_05m_path = os.path.join(upload_dir, side_05m_filename)
-    with open(side_05m_path, "wb") as buffer:
-        buffer.write(side_photo_05m.file.read())
-    
-    # Save 3m horizontal side photo
-    side_3m_horizontal_filename = f"side_3m_horizontal_{timestamp}_{unique_id}_{side_photo_3m_horizontal.filename}"
-    side_3m_horizontal_path = os.path.join(upload_dir, side_3m_horizontal_filename)
-    with open(side_3m_horizontal_path, "wb") as buffer:
-        buffer.write(side_photo_3m_horizontal.file.read())
-    
-    # Save 3m vertical side photo
-    side_3m_vertical_filename = f"side_3m_vertical_{timestamp}_{unique_id}_{side_photo_3m_vertical.filename}"
-    side_3m_vertical_path = os.path.join(upload_dir, side_3m_vertical_filename)
-    with open(side_3m_vertical_path, "wb") as buffer:
-        buffer.write(side_photo_3m_vertical.file.read())
+    # Stage the uploads under unique temporary names; they move into the blob store once hashed
+    photos = {
+        "drone_photo": drone_photo,
+        "side_photo_05m": side_photo_05m,
+        "side_photo_3m_horizontal": side_photo_3m_horizontal,
+        "side_photo_3m_vertical": side_photo_3m_vertical,
+    }
+    results = await asyncio.gather(
+        *(run_in_threadpool(uploads.save_stream, upload.file, uploads.new_staging_path()) for upload in photos.values()),
+        return_exceptions=True,
+    )
+    staged = dict(zip(photos, results))
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for result in results:
+            if isinstance(result, uploads.StoredFile):
+                os.remove(result.path)
+        raise errors[0]
+
+    try:
+        photo_metadata = await run_in_threadpool(_probe_photos, {name: stored.path for name, stored in staged.items()})
+    except HTTPException:
+        for stored in staged.values():
+            os.remove(stored.path)
+        raise
     
-    # Create PhotoGroup record
     photo_group_data = pg_schema.PhotoGroupCreate(
         field_id=field_id,
         capture_date=capture_date,
         rice_variety=rice_variety
     )
+    return await run_in_threadpool(_create_photo_group_and_enqueue, db, photo_group_data, staged, photo_metadata)
+
+
+def _probe_photos(paths: Dict[str, str]) -> Dict[str, dict]:
+    """
+    Read the headers of each photo (no pixel decoding) and reject files the
+    analysis could not use with a 422 listing every bad photo.
+    """
+    photo_metadata = {}
+    problems = []
+    for name, path in paths.items():
+        try:
+            photo_metadata[name] = image_probe.probe_image(path)
+        except image_probe.ImageProbeError as e:
+            problems.append(f"{name}: {e}")
+    if problems:
+        raise HTTPException(status_code=422, detail={"message": "Invalid photos", "problems": problems})
+    return photo_metadata
+
+
+def _create_photo_group_and_enqueue(db: Session, photo_group_data: pg_schema.PhotoGroupCreate, staged: Dict[str, uploads.StoredFile], photo_metadata: Dict[str, dict]) -> PhotoGroup:
+    """
+    Move four hashed, staged photos into the blob store (identical content is
+    stored once and reference counted), create the PhotoGroup record with the
+    probed photo metadata and trigger the async analysis task.
+    """
+    # Blob extensions follow the probed format, not the client's file names
+    filenames = [name + image_probe.stored_extension(photo_metadata[name]) for name in staged]
+    keys = dict(zip(staged, storage.store_blobs(db, list(staged.values()), filenames)))
+    try:
+        db_photo_group = crud_photogroup.create_photo_group(
+            db=db,
+            photo_group=photo_group_data,
+            drone_photo_path=keys["drone_photo"],
+            side_photo_05m_path=keys["side_photo_05m"],
+            side_photo_3m_horizontal_path=keys["side_photo_3m_horizontal"],
+            side_photo_3m_vertical_path=keys["side_photo_3m_vertical"],
+            photo_checksums={
+                name: {"sha256": staged_file.sha256, "size": staged_file.size}
+                for name, staged_file in staged.items()
+            },
+            photo_metadata=photo_metadata,
+        )
+    except Exception:
+        db.rollback()
+        storage.release_blobs(db, keys.values())
+        raise
     
-    db_photo_group = crud_photo_group.create_photo_group(
-        db=db,
-        photo_group=photo_group_data,
-        drone_photo_path=drone_path,
-        side_photo_05m_path=side_05m_path,
-        side_photo_3m_horizontal_path=side_3m_horizontal_path,
-        side_photo_3m_vertical_path=side_3m_vertical_path
-    )
-    
-    # Trigger async analysis task
-    task = run_analysis.delay(db_photo_group.id)
+    try:
+        task = run_analysis.delay(db_photo_group.id)
+    except Exception:
+        # Without its task the group would stay PENDING forever
+        db.delete(db_photo_group)
+        db.commit()
+        storage.release_blobs(db, keys.values())
+        raise
     db_photo_group.celery_task_id = task.id
     db.commit()
-    
+    db.refresh(db_photo_group)
     return db_photo_group
 
 
+@router.post("/photogroups/bulk-upload", response_model=upload_batch_schema.UploadBatch, status_code=status.HTTP_201_CREATED, tags=["Photo Groups"])
+async def bulk_upload_photo_groups(
+    archive: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Upload a survey campaign as one zip or tar(.gz) archive.
+
+    The archive must contain `manifest.json` or `manifest.csv` at its root,
+    listing one entry per photo group with `field_id`, `capture_date`,
+    optional `rice_variety`, and the archive paths of `drone_photo`,
+    `side_photo_05m`, `side_photo_3m_horizontal` and `side_photo_3m_vertical`.
+    Placing the manifest first lets unlisted files be skipped.
+
+    The archive is streamed to disk and its members are read one at a time.
+    Every PhotoGroup row is inserted in one transaction. The analysis tasks
+    are then enqueued together. Track progress with
+    `/photogroups/batches/{batch_id}`.
+    """
+    archive_file = await run_in_threadpool(
+        uploads.save_stream, archive.file, uploads.new_staging_path(), settings.BULK_UPLOAD_MAX_BYTES
+    )
+    try:
+        db_batch = await run_in_threadpool(_ingest_archive, db, archive_file.path, current_user)
+    finally:
+        os.remove(archive_file.path)
+    return await run_in_threadpool(_upload_batch_status, db, db_batch)
+
+
+def _ingest_archive(db: Session, archive_path: str, current_user: User) -> UploadBatch:
+    manifest: Optional[List[upload_batch_schema.BulkManifestEntry]] = None
+    wanted: Optional[set] = None
+    staged: Dict[str, uploads.StoredFile] = {}
+    try:
+        # Stage archive members (hashing as they stream) until the archive is exhausted
+        try:
+            for name, member in uploads.iter_archive_files(archive_path):
+                if name in upload_batch_schema.MANIFEST_NAMES and manifest is None:
+                    manifest = upload_batch_schema.parse_manifest(name, member.read(upload_batch_schema.MAX_MANIFEST_BYTES + 1))
+                    wanted = {getattr(entry, photo) for entry in manifest for photo in uploads.PHOTO_NAMES}
+                elif wanted is None or name in wanted:
+                    staged[name] = uploads.save_stream(member, uploads.new_staging_path(), settings.UPLOAD_MAX_FILE_BYTES)
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid archive: {e}")
+
+        if manifest is None:
+            raise HTTPException(status_code=422, detail=f"Archive has no {' or '.join(upload_batch_schema.MANIFEST_NAMES)} at its root")
+        if not 0 < len(manifest) <= settings.BULK_UPLOAD_MAX_GROUPS:
+            raise HTTPException(status_code=422, detail=f"Manifest must list between 1 and {settings.BULK_UPLOAD_MAX_GROUPS} photo groups")
+        field_ids = {entry.field_id for entry in manifest}
+        owned_field_ids = crud_field.get_owned_field_ids(db, owner_id=current_user.id, field_ids=field_ids)
+        problems = [f"field {field_id} not found" for field_id in sorted(field_ids - owned_field_ids)]
+        problems += [f"missing file {name}" for name in sorted(wanted - set(staged))]
+        archive_metadata = {}
+        for name in sorted(wanted & set(staged)):
+            try:
+                archive_metadata[name] = image_probe.probe_image(staged[name].path)
+            except image_probe.ImageProbeError as e:
+                problems.append(f"{name}: {e}")
+        if problems:
+            raise HTTPException(status_code=422, detail={"message": "Invalid manifest", "problems": problems})
+
+        # One reference per photo of every group, acquired in one transaction
+        photo_refs = [(entry, photo, staged[getattr(entry, photo)]) for entry in manifest for photo in uploads.PHOTO_NAMES]
+        keys = storage.store_blobs(
+            db,
+            [staged_file for _, _, staged_file in photo_refs],
+            [photo + image_probe.stored_extension(archive_metadata[getattr(entry, photo)]) for entry, photo, _ in photo_refs],
+        )
+    finally:
+        # Referenced files were consumed by the blob store; drop unlisted ones
+        for staged_file in staged.values():
+            if os.path.exists(staged_file.path):
+                os.remove(staged_file.path)
+
+    photo_groups = [
+        {
+            "field_id": entry.field_id,
+            "capture_date": entry.capture_date,
+            "rice_variety": entry.rice_variety,
+            "photo_checksums": {},
+            "photo_metadata": {},
+            # Task ids are assigned up front so they are committed with the rows
+            "celery_task_id": str(uuid4()),
+        }
+        for entry in manifest
+    ]
+    for index, ((entry, photo, staged_file), key) in enumerate(zip(photo_refs, keys)):
+        row = photo_groups[index // len(uploads.PHOTO_NAMES)]
+        row[f"{photo}_path"] = key
+        row["photo_checksums"][photo] = {"sha256": staged_file.sha256, "size": staged_file.size}
+        row["photo_metadata"][photo] = archive_metadata[getattr(entry, photo)]
+    try:
+        db_batch = crud_upload_batch.create_upload_batch(db, owner_id=current_user.id, photo_groups=photo_groups)
+    except Exception:
+        db.rollback()
+        storage.release_blobs(db, keys)
+        raise
+
+    db_photo_groups = crud_upload_batch.get_batch_photo_groups(db, db_batch.id)
+    try:
+        celery_group(
+            run_analysis.si(photo_group.id).set(task_id=photo_group.celery_task_id)
+            for photo_group in db_photo_groups
+        ).apply_async()
+    except Exception:
+        # Without their tasks the groups would stay PENDING forever
+        db.rollback()
+        crud_upload_batch.delete_upload_batch(db, db_batch.id)
+        storage.release_blobs(db, keys)
+        raise
+    return db_batch
+
+
+def _upload_batch_status(db: Session, db_batch: UploadBatch) -> upload_batch_schema.UploadBatch:
+    return upload_batch_schema.UploadBatch(
+        id=db_batch.id,
+        group_count=db_batch.group_count,
+        created_at=db_batch.created_at,
+        status_counts=crud_upload_batch.get_batch_status_counts(db, db_batch.id),
+        photo_groups=crud_upload_batch.get_batch_photo_groups(db, db_batch.id),
+    )
+
+
+@router.get("/photogroups/batches/{batch_id}", response_model=upload_batch_schema.UploadBatch, tags=["Photo Groups"])
+def get_upload_batch(
+    batch_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Get the analysis progress of a bulk upload: counts per analysis status and
+    the status of each photo group.
+    """
+    db_batch = crud_upload_batch.get_upload_batch(db, batch_id)
+    if not db_batch:
+        raise HTTPException(status_code=404, detail="Upload batch not found")
+    if db_batch.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return _upload_batch_status(db, db_batch)
+
+
 @router.get("/photogroups/status/{task_id}", response_model=dict, tags=["Photo Groups"])
 def get_analysis_status(task_id: str):
     """
@@ -305,113 +632,509 @@ def get_analysis_status(task_id: str):
 # endregion
 
 
+# region Resumable Upload
+def _get_owned_upload_session(db: Session, session_id: str, current_user: User) -> UploadSession:
+    db_session = crud_upload_session.get_upload_session(db, session_id)
+    if not db_session:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    if db_session.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return db_session
+
+
+def _upload_session_status(db: Session, db_session: UploadSession) -> upload_schema.UploadSession:
+    received = crud_upload_session.get_received_chunks(db, db_session.id)
+    files = {
+        photo: upload_schema.UploadFileStatus(
+            filename=declaration["filename"],
+            size=declaration["size"],
+            chunk_count=math.ceil(declaration["size"] / db_session.chunk_size),
+            received_chunks=sorted(received.get(photo, {})),
+            received_bytes=sum(received.get(photo, {}).values()),
+        )
+        for photo, declaration in db_session.files.items()
+    }
+    return upload_schema.UploadSession(
+        id=db_session.id,
+        field_id=db_session.field_id,
+        capture_date=db_session.capture_date,
+        rice_variety=db_session.rice_variety,
+        chunk_size=db_session.chunk_size,
+        status=db_session.status,
+        photo_group_id=db_session.photo_group_id,
+        expires_at=db_session.expires_at,
+        files=files,
+    )
+
+
+@router.post("/uploads/sessions", response_model=upload_schema.UploadSession, status_code=status.HTTP_201_CREATED, tags=["Photo Groups"])
+def create_upload_session(
+    upload_session: upload_schema.UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Start a resumable upload of the four photos of a photo group.
+
+    Each photo is split into `chunk_size` byte chunks (the last one may be
+    shorter) which are PUT individually, in any order and with retries, to
+    `/uploads/sessions/{id}/files/{photo}/chunks/{index}`. After a dropped
+    connection, GET the session to see which chunks were received and send
+    only the missing ones, then POST `/finalize`. Sessions expire
+    UPLOAD_SESSION_TTL_HOURS after their last received chunk.
+    """
+    db_field = crud_field.get_field(db, field_id=upload_session.field_id)
+    if not db_field:
+        raise HTTPException(status_code=404, detail="Field not found")
+    if db_field.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    oversized = [photo for photo, declaration in upload_session.files.items() if declaration.size > settings.UPLOAD_MAX_FILE_BYTES]
+    if oversized:
+        raise HTTPException(status_code=413, detail=f"Files larger than {settings.UPLOAD_MAX_FILE_BYTES} bytes: {', '.join(oversized)}")
+
+    db_session = crud_upload_session.create_upload_session(
+        db,
+        upload_session=upload_session,
+        owner_id=current_user.id,
+        chunk_size=upload_session.chunk_size or settings.UPLOAD_SESSION_CHUNK_BYTES,
+        ttl_hours=settings.UPLOAD_SESSION_TTL_HOURS,
+    )
+    uploads.create_session_files(db_session.id, {photo: declaration.size for photo, declaration in upload_session.files.items()})
+    return _upload_session_status(db, db_session)
+
+
+@router.get("/uploads/sessions/{session_id}", response_model=upload_schema.UploadSession, tags=["Photo Groups"])
+def get_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Get the progress of an upload session, including the chunks received so far.
+    """
+    return _upload_session_status(db, _get_owned_upload_session(db, session_id, current_user))
+
+
+@router.put("/uploads/sessions/{session_id}/files/{photo}/chunks/{chunk_index}", response_model=upload_schema.UploadChunkReceipt, tags=["Photo Groups"])
+async def upload_chunk(
+    session_id: str,
+    photo: str,
+    chunk_index: int,
+    request: Request,
+    offset: int = Header(..., alias="Upload-Offset"),
+    checksum: str = Header(..., alias="Upload-Checksum"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Store one chunk of a photo. The request body is the raw chunk bytes;
+    `Upload-Offset` is its byte offset (chunk_index * chunk_size) and
+    `Upload-Checksum` its SHA-256 in hex. A chunk whose checksum does not match
+    is rejected with 422 and must be resent. Re-sending a stored chunk is safe.
+    """
+    db_session = await run_in_threadpool(_get_owned_upload_session, db, session_id, current_user)
+    if db_session.status != UploadSessionStatusEnum.ACTIVE:
+        raise HTTPException(status_code=409, detail=f"Upload session is {db_session.status.value}")
+    declaration = db_session.files.get(photo)
+    if declaration is None:
+        raise HTTPException(status_code=404, detail=f"Unknown photo: {photo}")
+
+    chunk_count = math.ceil(declaration["size"] / db_session.chunk_size)
+    if not 0 <= chunk_index < chunk_count:
+        raise HTTPException(status_code=422, detail=f"chunk_index must be between 0 and {chunk_count - 1}")
+    if offset != chunk_index * db_session.chunk_size:
+        raise HTTPException(status_code=422, detail=f"Upload-Offset must be {chunk_index * db_session.chunk_size} for chunk {chunk_index}")
+    expected_size = min(db_session.chunk_size, declaration["size"] - offset)
+
+    # Bounded by chunk_size, so buffering the body is fine
+    data = bytearray()
+    async for part in request.stream():
+        data.extend(part)
+        if len(data) > expected_size:
+            break
+    if len(data) != expected_size:
+        raise HTTPException(status_code=422, detail=f"Chunk {chunk_index} must be {expected_size} bytes")
+
+    try:
+        sha256 = await run_in_threadpool(uploads.write_chunk, session_id, photo, offset, bytes(data), checksum)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    await run_in_threadpool(
+        crud_upload_session.save_chunk,
+        db, db_session, photo, chunk_index, expected_size, sha256, settings.UPLOAD_SESSION_TTL_HOURS,
+    )
+    return upload_schema.UploadChunkReceipt(photo=photo, chunk_index=chunk_index, size=expected_size, sha256=sha256)
+
+
+@router.post("/uploads/sessions/{session_id}/finalize", response_model=pg_schema.PhotoGroup, tags=["Photo Groups"])
+def finalize_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Assemble a fully received session into a photo group and start its analysis,
+    like `/photogroups/upload`. Calling it again after success returns the same
+    photo group. If it fails after the photos were moved out of the session
+    (storage, database or broker errors), the session is discarded: a retry
+    gets 404 and the photos must be uploaded in a new session.
+    """
+    db_session = _get_owned_upload_session(db, session_id, current_user)
+    if db_session.status == UploadSessionStatusEnum.COMPLETED:
+        return crud_photogroup.get_photo_group(db, db_session.photo_group_id)
+
+    received = crud_upload_session.get_received_chunks(db, session_id)
+    missing = {
+        photo: [
+            index for index in range(math.ceil(declaration["size"] / db_session.chunk_size))
+            if index not in received.get(photo, {})
+        ]
+        for photo, declaration in db_session.files.items()
+    }
+    missing = {photo: indexes for photo, indexes in missing.items() if indexes}
+    if missing:
+        raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "missing_chunks": missing})
+    if not crud_upload_session.claim_upload_session(db, session_id):
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+
+    try:
+        verified = {
+            photo: uploads.verify_session_file(session_id, photo, declaration.get("sha256"))
+            for photo, declaration in db_session.files.items()
+        }
+    except ValueError as e:
+        crud_upload_session.release_upload_session(db, session_id)
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        photo_metadata = _probe_photos({photo: stored.path for photo, stored in verified.items()})
+    except HTTPException:
+        crud_upload_session.release_upload_session(db, session_id)
+        raise
+
+    photo_group_data = pg_schema.PhotoGroupCreate(
+        field_id=db_session.field_id,
+        capture_date=db_session.capture_date,
+        rice_variety=db_session.rice_variety,
+    )
+    try:
+        db_photo_group = _create_photo_group_and_enqueue(db, photo_group_data, verified, photo_metadata)
+        crud_upload_session.complete_upload_session(db, session_id, db_photo_group.id, settings.UPLOAD_SESSION_TTL_HOURS)
+    except Exception:
+        # Never leave the session FINALIZING. While the part files are intact the
+        # client can retry; once the blob store consumed them, the session is
+        # discarded and a retry gets 404, i.e. the photos must be uploaded again.
+        db.rollback()
+        if all(os.path.exists(stored.path) for stored in verified.values()):
+            crud_upload_session.release_upload_session(db, session_id)
+        else:
+            uploads.remove_session_files(session_id)
+            crud_upload_session.delete_upload_session(db, session_id)
+        raise
+    uploads.remove_session_files(session_id)
+    return db_photo_group
+
+
+@router.delete("/uploads/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Photo Groups"])
+def abort_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Abort an upload session and discard the chunks received so far.
+    """
+    db_session = _get_owned_upload_session(db, session_id, current_user)
+    if db_session.status == UploadSessionStatusEnum.FINALIZING:
+        raise HTTPException(status_code=409, detail="Upload session is being finalized")
+    uploads.remove_session_files(session_id)
+    crud_upload_session.delete_upload_session(db, session_id)
+# endregion
+
+
+# region Photo Renditions
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against the rendition's validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since.tzinfo is not None and last_modified.replace(microsecond=0) <= since
+    return False
+
+
+@router.get(
+    "/photogroups/{photo_group_id}/photos/{photo}/{rendition}",
+    response_class=Response,
+    responses={200: {"content": {"image/webp": {}, "image/jpeg": {}}}, 304: {"description": "Not modified"}},
+    tags=["Photo Groups"],
+)
+def get_photo_rendition(
+    photo_group_id: int,
+    photo: str,
+    rendition: str,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Thumbnail (`thumb`) or web preview (`medium`) of one photo of a group, as
+    WebP when the client accepts it and JPEG otherwise (or as `format`).
+
+    Renditions are immutable once generated, so responses carry a strong ETag
+    and Last-Modified, and conditional requests get 304 Not Modified. When
+    STORAGE_ACCEL_REDIRECT_PREFIX is set, this endpoint only authorizes the
+    request and nginx sends the file itself (X-Accel-Redirect).
+    """
+    if photo not in uploads.PHOTO_NAMES or rendition not in derivatives.rendition_sizes():
+        raise HTTPException(status_code=404, detail="Unknown photo or rendition")
+    db_photo_group = crud_photogroup.get_photo_group(db, photo_group_id)
+    if db_photo_group is None:
+        raise HTTPException(status_code=404, detail="Photo group not found")
+    if crud_field.get_field(db, field_id=db_photo_group.field_id).owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    rendition_info = ((db_photo_group.photo_derivatives or {}).get(photo) or {}).get(rendition)
+    if rendition_info is None:
+        raise HTTPException(status_code=404, detail="Rendition not generated yet")
+
+    if format is None:
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+    key = rendition_info["formats"][format]["key"]
+    media_type = derivatives.DERIVATIVE_FORMATS[format][2]
+    # The key names the source content hash, rendition size and format, so it identifies the bytes
+    etag = f'"{os.path.basename(os.path.dirname(key))}-{os.path.basename(key)}"'
+    last_modified = db_photo_group.derivatives_generated_at
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.DERIVATIVE_CACHE_MAX_AGE}",
+        "Vary": "Accept, Authorization",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # For S3 this also fetches the rendition into the local cache nginx serves from
+    path = storage.get_storage().local_path(key)
+    if settings.STORAGE_ACCEL_REDIRECT_PREFIX:
+        headers["X-Accel-Redirect"] = settings.STORAGE_ACCEL_REDIRECT_PREFIX + key
+        return Response(headers=headers, media_type=media_type)
+    return FileResponse(path, media_type=media_type, headers=headers)
+# endregion
+
+
 # region Analysis
+async def _indicator_values_for_field(db: AsyncSession, field_id: int, indicator: str, start_date: Optional[date], end_date: Optional[date]):
+    try:
+        return await crud_analysis_result_async.get_indicator_values_for_field(
+            db=db, field_id=field_id, indicator=indicator, start_date=start_date, end_date=end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 @analysis_router.get(
     "/results/{result_id}",
     response_model=ar_schema.AnalysisResult,
+    responses={304: {"description": "Not modified"}},
     tags=["Analysis"],
 )
-def get_analysis_result(
+async def get_analysis_result(
     result_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """
     Retrieve a single analysis result by its ID.
+
+    The strong ETag covers the result id, analysis time, photo group state
+    and algorithm version; a matching If-None-Match gets 304 from one
+    indexed lookup. Final results (completed, not provisional, renditions
+    generated) may be cached for RESULT_CACHE_MAX_AGE.
     """
-    result = crud_analysis_result.get_analysis_result(
-        db=db, result_id=result_id, owner_id=current_user.id
+    validators = await crud_analysis_result_async.get_result_validators(db, result_id, current_user.id)
+    if validators is None:
+        raise HTTPException(status_code=404, detail="Analysis result not found")
+    analysis_time, is_provisional, analysis_status, derivatives_generated_at = validators
+    final = analysis_status == AnalysisStatusEnum.COMPLETED and not is_provisional and derivatives_generated_at is not None
+    headers = _result_headers(_result_etag("result", result_id, *validators), final)
+    if _not_modified(request, headers["ETag"], None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    result = await crud_analysis_result_async.get_analysis_result(
+        db=db, result_id=result_id, owner_id=current_user.id, load="joined"
     )
     if not result:
         raise HTTPException(status_code=404, detail="Analysis result not found")
+    response.headers.update(headers)
     return result
 
 
 @analysis_router.get(
     "/inter-field-comparison/",
     response_model=List[ar_schema.AnalysisResult],
+    responses=encoding.COLUMNAR_RESPONSES,
     tags=["Analysis"],
 )
-def get_inter_field_comparison(
+async def get_inter_field_comparison(
     period_date: date,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """
-    Retrieve analysis results for all fields for a given period (10 days).
+    Retrieve analysis results for all fields for a given period (10 days),
+    by capture date then field, one page at a time. For per-field summaries,
+    use /inter-field-comparison/summary/. Also served as columnar msgpack
+    (Accept: application/msgpack), see encoding.columns.
     """
     start_date = period_date - timedelta(days=5)
     end_date = period_date + timedelta(days=4)
-    results = crud_analysis_result.get_analysis_results_for_period(
-        db=db, owner_id=current_user.id, start_date=start_date, end_date=end_date
+    try:
+        page = await crud_analysis_result_async.get_analysis_results_for_period(
+            db=db, owner_id=current_user.id, start_date=start_date, end_date=end_date,
+            cursor=cursor, limit=limit, load="selectin"
+        )
+    except InvalidCursorError as e:
+        raise _invalid_cursor(e)
+    results = encoding.dump_models(ar_schema.AnalysisResult, _page_items(response, page))
+    return await encoding.negotiated_response(
+        request, lambda: results, lambda: encoding.columns(results), headers=response.headers
+    )
+
+
+@analysis_router.get(
+    "/inter-field-comparison/summary/",
+    response_model=List[ar_schema.FieldPeriodStat],
+    responses=encoding.COLUMNAR_RESPONSES,
+    tags=["Analysis"],
+)
+async def get_inter_field_comparison_summary(
+    period_date: date,
+    request: Request,
+    response: Response,
+    indicator: str = "avg_plant_height",  # 默认指标为株高
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    """
+    Mean, min, max and count of an indicator for each field over the dekad
+    containing `period_date`, by field, one page at a time. Read from the
+    per-field dekad rollup, so the cost does not grow with the history.
+    Also served as columnar msgpack (Accept: application/msgpack).
+    """
+    period_start, period_end = crud_analysis_result.dekad_bounds(period_date)
+    try:
+        page = await crud_analysis_result_async.get_field_period_stats(
+            db=db, owner_id=current_user.id, period_start=period_start, indicator=indicator,
+            cursor=cursor, limit=limit
+        )
+    except InvalidCursorError as e:
+        raise _invalid_cursor(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    stats = [
+        ar_schema.FieldPeriodStat(
+            field_id=stat.field_id,
+            field_name=stat.field.name,
+            indicator=stat.indicator,
+            period_start=period_start,
+            period_end=period_end,
+            count=stat.value_count,
+            mean=stat.value_sum / stat.value_count,
+            min=stat.value_min,
+            max=stat.value_max,
+        )
+        for stat in _page_items(response, page)
+    ]
+    summaries = encoding.dump_models(ar_schema.FieldPeriodStat, stats)
+    return await encoding.negotiated_response(
+        request, lambda: summaries, lambda: encoding.columns(summaries), headers=response.headers
     )
-    return results
 
 
 @analysis_router.get(
     "/growth-heatmap/{field_id}",
     response_model=dict,
+    responses=encoding.COLUMNAR_RESPONSES,
     tags=["Analysis"],
 )
-def get_growth_heatmap(
+async def get_growth_heatmap(
     field_id: int,
+    request: Request,
     indicator: str = "avg_plant_height",  # 默认指标为株高
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    resolution: Optional[int] = Query(None, ge=1, le=settings.HEATMAP_MAX_GRID_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """
-    Generate growth heatmap data for a specific field with spatial coordinates.
-    This endpoint simulates spatial data for the heatmap based on analysis results.
+    Growth heatmap of a field: one frame of rows x cols values per analysed
+    capture, from the per-cell grids of the drone photos for coverage,
+    canopy_color_index and exg (other indicators, and results analysed before
+    grids were stored, are spread uniformly). With `resolution`, every frame
+    is interpolated (IDW) or averaged onto `resolution` x `resolution` cells.
+
+    With Accept: application/msgpack, the frames are sent as `capture_dates`,
+    `spatial` and `values`: the (frame, row, col) array in hundredths, see
+    encoding.fixed_point.
     """
     # Verify field ownership
-    db_field = crud_field.get_field(db, field_id=field_id)
+    db_field = await crud_field_async.get_field(db, field_id=field_id)
     if not db_field:
         raise HTTPException(status_code=404, detail="Field not found")
     if db_field.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Fetch analysis results for the field
-    results = crud_analysis_result.get_analysis_results_for_field(
-        db=db, field_id=field_id, start_date=start_date, end_date=end_date
-    )
-    
-    # Generate heatmap data
-    heatmap_data = []
-    for result in results:
-        # Get photo group to access capture date and location info
-        photo_group = db.query(PhotoGroup).filter(PhotoGroup.id == result.photo_group_id).first()
-        if photo_group:
-            # Simulate spatial coordinates (in a real implementation, these would come from GPS data)
-            # For demonstration purposes, we'll generate random coordinates with some clustering
-            import random
-            # Create multiple data points per analysis result to simulate spatial distribution
-            for i in range(20):  # Generate 20 points per time point
-                x = random.uniform(0, 100)  # Simulated X coordinate (0-100 meters)
-                y = random.uniform(0, 100)  # Simulated Y coordinate (0-100 meters)
-                
-                # Get the value for the selected indicator
-                value = getattr(result, indicator, 0) or 0  # Default to 0 if the attribute is None
-                
-                # Add slight random variation to the value for realistic distribution
-                if value:
-                    value = max(0, value + random.uniform(-value*0.1, value*0.1))
-                
-                heatmap_data.append([
-                    x,  # x-coordinate
-                    y,  # y-coordinate
-                    value if value is not None else 0,  # indicator value
-                    photo_group.capture_date.isoformat()  # date for time dimension
-                ])
-    
-    return {
+    if indicator not in heatmap.HEATMAP_INDICATORS:
+        raise HTTPException(status_code=422, detail=f"Unknown indicator {indicator}; use one of {', '.join(heatmap.HEATMAP_INDICATORS)}")
+
+    # Built heatmaps are reused until a photo group or result of the field is written
+    signature = db_field.results_version
+    cache_key = (field_id, indicator, start_date, end_date, resolution)
+    field_heatmap = heatmap.get_heatmap_cache().get(cache_key, signature)
+    if field_heatmap is None:
+        rows = await crud_analysis_result_async.get_cell_grids_for_field(
+            db, field_id, indicator if indicator in crud_analysis_result.INDICATOR_NAMES else None, start_date, end_date
+        )
+        # Decoding and resampling is CPU work; keep it off the event loop
+        field_heatmap = await run_in_threadpool(heatmap.build_heatmap, rows, indicator, resolution)
+        heatmap.get_heatmap_cache().put(cache_key, signature, field_heatmap)
+
+    rows_count, cols_count = field_heatmap.values.shape[1:]
+    description = {
         "field_id": field_id,
         "indicator": indicator,
-        "heatmap_data": heatmap_data,
+        "rows": rows_count,
+        "cols": cols_count,
         "start_date": start_date.isoformat() if start_date else None,
         "end_date": end_date.isoformat() if end_date else None
     }
+    return await encoding.negotiated_response(
+        request,
+        lambda: {**description, "frames": field_heatmap.frames()},
+        lambda: {
+            **description,
+            "capture_dates": [capture_date.isoformat() for capture_date in field_heatmap.dates],
+            "spatial": field_heatmap.spatial,
+            "values": encoding.fixed_point(field_heatmap.values, 2),
+        },
+    )
 
 
 @analysis_router.get(
@@ -419,103 +1142,69 @@ def get_growth_heatmap(
     response_model=dict,
     tags=["Analysis"],
 )
-def get_regional_differences(
+async def get_regional_differences(
     field_id: int,
+    request: Request,
     indicator: str = "avg_plant_height",  # 默认指标为株高
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     """
     Analyze regional differences within a specific field based on spatial coordinates.
-    This endpoint calculates statistics for different regions of the field.
+    This endpoint calculates statistics for different regions of the field, overall
+    and per dekad of capture dates (days 1-10, 11-20 and 21 to month end).
     """
     # Verify field ownership
-    db_field = crud_field.get_field(db, field_id=field_id)
+    db_field = await crud_field_async.get_field(db, field_id=field_id)
     if not db_field:
         raise HTTPException(status_code=404, detail="Field not found")
     if db_field.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    # Fetch analysis results for the field
-    results = crud_analysis_result.get_analysis_results_for_field(
-        db=db, field_id=field_id, start_date=start_date, end_date=end_date
-    )
+    # Fetch (capture date, indicator value) pairs for the field in one query
+    results = await _indicator_values_for_field(db, field_id, indicator, start_date, end_date)
     
-    # Simulate regional analysis by virtually dividing the field into 4 quadrants
-    regions = {
-        "northeast": {"values": [], "count": 0},
-        "northwest": {"values": [], "count": 0},
-        "southeast": {"values": [], "count": 0},
-        "southwest": {"values": [], "count": 0}
-    }
-    
-    for result in results:
-        # Get the value for the selected indicator
-        value = getattr(result, indicator, 0) or 0  # Default to 0 if the attribute is None
-        
-        if value:  # Only process if there's a valid value
-            # Randomly assign data points to regions for demonstration
-            import random
-            region_keys = list(regions.keys())
-            selected_region = random.choice(region_keys)
-            
-            regions[selected_region]["values"].append(value)
-            regions[selected_region]["count"] += 1
+    # Zero and missing values are left out, as a chart cannot plot them
+    results = [(capture_date, value) for capture_date, value in results if value]
+    values = np.fromiter((value for _, value in results), dtype=np.float64, count=len(results))
     
-    # Calculate statistics for each region
-    regional_stats = {}
-    for region_name, data in regions.items():
-        if data["count"] > 0:
-            values = data["values"]
-            regional_stats[region_name] = {
-                "average": round(sum(values) / len(values), 2),
-                "min": round(min(values), 2),
-                "max": round(max(values), 2),
-                "std_dev": round((sum((x - sum(values) / len(values)) ** 2 for x in values) / len(values)) ** 0.5, 2) if len(values) > 1 else 0,
-                "count": data["count"]
-            }
-        else:
-            regional_stats[region_name] = {
-                "average": 0,
-                "min": 0,
-                "max": 0,
-                "std_dev": 0,
-                "count": 0
-            }
+    # Simulate regional analysis by virtually dividing the field into 4 quadrants:
+    # each value is randomly assigned to one of them for demonstration
+    regions = ["northeast", "northwest", "southeast", "southwest"]
+    region_labels = np.random.default_rng().integers(len(regions), size=values.size)
     
-    # Calculate overall field statistics
-    all_values = []
-    for data in regions.values():
-        all_values.extend(data["values"])
+    # Date buckets: the dekad of each capture date, computed once per distinct date
+    bounds = {capture_date: crud_analysis_result.dekad_bounds(capture_date) for capture_date in {capture_date for capture_date, _ in results}}
+    dekads = sorted(set(bounds.values()))
+    dekad_positions = {dekad: position for position, dekad in enumerate(dekads)}
+    dekad_labels = np.fromiter((dekad_positions[bounds[capture_date]] for capture_date, _ in results), dtype=np.int64, count=len(results))
     
-    overall_stats = {}
-    if all_values:
-        overall_stats = {
-            "average": round(sum(all_values) / len(all_values), 2),
-            "min": round(min(all_values), 2),
-            "max": round(max(all_values), 2),
-            "std_dev": round((sum((x - sum(all_values) / len(all_values)) ** 2 for x in all_values) / len(all_values)) ** 0.5, 2) if len(all_values) > 1 else 0,
-            "count": len(all_values)
-        }
-    else:
-        overall_stats = {
-            "average": 0,
-            "min": 0,
-            "max": 0,
-            "std_dev": 0,
-            "count": 0
-        }
+    # Statistics for each region and for the whole field, with quartiles,
+    # over the whole period and per dekad
+    regional_stats = field_statistics.describe_groups(values, region_labels, regions)
+    overall_stats = field_statistics.describe(values)
+    dekad_regional_stats = field_statistics.describe_nested(values, dekad_labels, dekads, region_labels, regions)
+    dekad_overall_stats = field_statistics.describe_groups(values, dekad_labels, dekads)
     
-    return {
+    return await encoding.negotiated_response(request, lambda: {
         "field_id": field_id,
         "indicator": indicator,
         "regional_stats": regional_stats,
         "overall_stats": overall_stats,
+        "dekad_stats": [
+            {
+                "start_date": dekad_start.isoformat(),
+                "end_date": dekad_end.isoformat(),
+                "regional_stats": dekad_regional_stats[(dekad_start, dekad_end)],
+                "overall_stats": dekad_overall_stats[(dekad_start, dekad_end)],
+            }
+            for dekad_start, dekad_end in dekads
+        ],
         "start_date": start_date.isoformat() if start_date else None,
         "end_date": end_date.isoformat() if end_date else None
-    }
+    })
 
 
 # endregion
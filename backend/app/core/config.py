@@ -22,17 +22,85 @@ class Settings(BaseSettings):
             )
         return values
 
+    # Connection pools. The API process has a sync pool (handlers in the threadpool, 40 threads)
+    # and an async pool (async read endpoints); every Celery process has its own sync pool.
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Replace connections older than this (idle server timeouts)
+    ASYNC_DATABASE_URL: Optional[str] = None  # Default: DATABASE_URL with asyncpg (or aiosqlite)
+    ASYNC_DB_POOL_SIZE: int = 20
+    ASYNC_DB_MAX_OVERFLOW: int = 10
+
     # Environment variables for security and tokens
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Cache of authenticated users (see app/core/user_cache.py)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_ENTRIES: int = 10000  # Per process, least recently used evicted first
+    USER_CACHE_TTL_SECONDS: int = 60  # Per-process tier; bounds staleness when invalidations cannot be broadcast
+    USER_CACHE_REDIS_URL: Optional[str] = None  # e.g. redis://redis:6379/1 for a tier shared by all API processes
+    USER_CACHE_SHARED_TTL_SECONDS: int = 300
+
+    # Password hashing (bcrypt) off the request path, see app/core/password_hashing.py
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # Worker processes; default half the cores. 0 hashes in the request threadpool
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Hash/verify jobs queued or running per API process; more get 503
+    PASSWORD_HASH_NICE: int = 0  # Niceness added to the workers (e.g. 5) to favour other requests over logins on few cores
+
     # Gemini API Key
     GEMINI_API_KEY: str
+    GEMINI_TIMEOUT_SECONDS: int = 120  # Upper bound for one Gemini analysis, measured from its start
+
+    # Image analysis
+    DRONE_VIEW_GRID_SIZE: int = 5  # Grid cells per side for the uniformity index (5-200)
+    DRONE_VIEW_TILED_MIN_MEGAPIXELS: int = 100  # TIFFs at least this large are streamed in tiles
+    PREVIEW_REDUCTION: int = 4  # Decode reduction (1/2/4/8) for the provisional preview phase
+    STEP_CACHE_ENABLED: bool = True  # Reuse step outputs for identical images (content-hash cache)
+    STEP_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # LRU eviction keeps cached payloads under this size
+
+    # Growth heatmaps from the per-cell drone grids, see app/analysis/heatmap.py
+    HEATMAP_MAX_GRID_SIZE: int = 100  # Cells per side served; larger grids are averaged down
+    HEATMAP_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Per API process; least recently used heatmaps evicted first
+
+    # Conditional requests on analysis results (ETag / If-None-Match)
+    RESULT_CACHE_MAX_AGE: int = 30 * 86400  # Cache-Control max-age of final results (completed, renditions generated), in seconds
+
+    # Encoding of analysis responses, see app/api/v1/encoding.py
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # Smaller bodies are sent uncompressed
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4  # 0-11; higher levels cost far more CPU per response for little gain
+
+    # Resumable uploads
+    UPLOAD_SESSION_CHUNK_BYTES: int = 4 * 1024 * 1024  # Default chunk size offered to clients
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # Sessions expire this long after their last received chunk
+    UPLOAD_SESSION_FINALIZE_GRACE_HOURS: int = 6  # Cleanup spares sessions being finalized this much longer past expiry
+    UPLOAD_MAX_FILE_BYTES: int = 1024 * 1024 * 1024  # Largest photo a session may declare (or an archive may contain)
+    BULK_UPLOAD_MAX_GROUPS: int = 500  # Photo groups accepted in one bulk archive
+    BULK_UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024 * 1024  # Largest bulk archive
+
+    # Photo storage (content-addressed blobs referenced by the *_photo_path columns)
+    STORAGE_BACKEND: str = "local"  # "local" or "s3"
+    STORAGE_LOCAL_ROOT: str = "uploads"  # Blob root of the local backend
+    STORAGE_CACHE_DIR: str = "uploads/cache"  # Local copies of S3 blobs read by the analysis
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://minio:9000 for MinIO or other S3-compatible stores
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    STORAGE_ACCEL_REDIRECT_PREFIX: Optional[str] = None  # e.g. /protected-media/: nginx serves photo files (X-Accel-Redirect)
+
+    # Web renditions of uploaded photos (generated by a worker stage)
+    DERIVATIVE_THUMB_SIZE: int = 320  # Longest side of thumbnails, in pixels
+    DERIVATIVE_MEDIUM_SIZE: int = 1600  # Longest side of the medium preview, in pixels
+    DERIVATIVE_CACHE_MAX_AGE: int = 86400  # Cache-Control max-age of served renditions, in seconds
 
     # Environment variables for Celery
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    CELERY_CPU_QUEUE: str = "analysis_cpu"  # OpenCV stages (prefork pool)
+    CELERY_IO_QUEUE: str = "analysis_io"  # Gemini calls, orchestration and merge (thread pool)
+    OPENCV_NUM_THREADS: Optional[int] = None  # Default: cores divided by the worker's pool size
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,125 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.security import pwd_context
+
+# bcrypt is deliberately slow (~0.25 s of CPU per hash or check). Run inline,
+# a burst of logins fills the request threadpool and competes with every other
+# request for the CPU. Instead, hashing runs on a small pool of worker
+# processes (no GIL shared with the API, at most PASSWORD_HASH_WORKERS cores),
+# and at most PASSWORD_HASH_MAX_PENDING jobs per API process may wait for it;
+# past that, requests are turned away (503) instead of queueing without bound.
+
+
+class PasswordHashingBusy(Exception):
+    """Too many password hashing jobs are already waiting; retry later."""
+
+
+def _init_worker(nice: int):
+    if nice:
+        os.nice(nice)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def default_workers() -> int:
+    """Half the cores (at least one), leaving the rest to request handling."""
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+class PasswordHasher:
+    """
+    Async password hashing with an admission limit. `workers=0` runs the jobs
+    in the request threadpool instead of a process pool (the pre-pool
+    behaviour, kept for platforms without process pools and for benchmarks).
+    """
+
+    def __init__(self, workers: int, max_pending: int, nice: int = 0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.nice = nice
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs threads (uvicorn, the threadpool) can deadlock
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.nice,),
+                )
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, function, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHashingBusy()
+            self._pending += 1
+        try:
+            if self.workers == 0:
+                return await run_in_threadpool(function, *args)
+            executor = self._get_executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed by the OOM killer); start a fresh pool and retry once
+                print("Password hashing pool broken, restarting it")
+                self._reset_executor(executor)
+                return await asyncio.get_running_loop().run_in_executor(self._get_executor(), function, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def warm_up(self):
+        """Start the worker processes now rather than on the first login."""
+        if self.workers:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_init_worker, 0)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+@lru_cache(maxsize=None)
+def get_password_hasher() -> PasswordHasher:
+    workers = settings.PASSWORD_HASH_WORKERS
+    return PasswordHasher(
+        workers=default_workers() if workers is None else workers,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        nice=settings.PASSWORD_HASH_NICE,
+    )
@@ -0,0 +1,269 @@
+import os
+import re
+import shutil
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from app.core import uploads
+from app.core.config import settings
+from app.crud import crud_blob
+
+# Keys of content-addressed blobs; anything else in a *_photo_path column is a
+# legacy file path written before the storage layer existed
+BLOB_KEY_PREFIX = "blobs/"
+# Web renditions (thumbnails, previews) of a blob live under a prefix derived from its hash
+DERIVATIVE_KEY_PREFIX = "derivatives/"
+
+_EXTENSION_PATTERN = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+def blob_key(sha256: str, filename: Optional[str] = None) -> str:
+    """
+    Storage key of a blob: `blobs/ab/cd/abcd...<ext>`. Two levels of hash
+    sharding keep every directory small (65,536 leaf directories); the original
+    extension is kept so MIME type detection by name still works.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if not _EXTENSION_PATTERN.match(extension):
+        extension = ""
+    return f"{BLOB_KEY_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+
+def is_blob_key(stored_path: str) -> bool:
+    return stored_path.startswith(BLOB_KEY_PREFIX)
+
+
+def blob_sha256(key: str) -> str:
+    return os.path.splitext(os.path.basename(key))[0]
+
+
+def derivative_prefix(sha256: str) -> str:
+    return f"{DERIVATIVE_KEY_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}/"
+
+
+def derivative_key(sha256: str, rendition: str, max_side: int, extension: str) -> str:
+    """Key of one rendition of a blob; the size is part of the name, so changing it never serves stale files."""
+    return f"{derivative_prefix(sha256)}{rendition}-{max_side}{extension}"
+
+
+class StorageBackend(ABC):
+    """Where photo blobs live. Blobs are immutable: a key always names the same bytes."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether a blob is stored under `key`."""
+
+    @abstractmethod
+    def put_file(self, source_path: str, key: str):
+        """Store the file at `source_path` under `key`; the source file is consumed."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Delete the blob under `key`, if any."""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        """Delete every object whose key starts with `prefix` (a directory-like key ending in '/')."""
+
+    @abstractmethod
+    def cache_path(self, key: str) -> str:
+        """Local filesystem path the blob is (or will be) readable at; does no I/O."""
+
+    @abstractmethod
+    def local_path(self, key: str) -> str:
+        """Local filesystem path of the blob, fetching it first if needed."""
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def cache_path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def local_path(self, key: str) -> str:
+        return self.cache_path(key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.cache_path(key))
+
+    def put_file(self, source_path: str, key: str):
+        destination = self.cache_path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Same filesystem as the upload staging area, so this is an atomic rename
+        os.replace(source_path, destination)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.cache_path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix: str):
+        shutil.rmtree(self.cache_path(prefix.rstrip("/")), ignore_errors=True)
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible object storage (AWS S3, MinIO, ...). Analysis steps need file
+    paths, so blobs are downloaded once into `cache_dir`; since blobs are
+    immutable the cached copies never go stale and the directory can be purged
+    at any time.
+    """
+
+    def __init__(self, bucket: str, cache_dir: str, endpoint_url: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 region_name: Optional[str] = None):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self._client_error = ClientError
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region_name,
+        )
+
+    def cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, *key.split("/"))
+
+    def local_path(self, key: str) -> str:
+        path = self.cache_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial_path = f"{path}.{uuid4().hex}.part"
+            try:
+                self.client.download_file(self.bucket, key, partial_path)
+                os.replace(partial_path, path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+        return path
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put_file(self, source_path: str, key: str):
+        self.client.upload_file(source_path, self.bucket, key)
+        os.remove(source_path)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        try:
+            os.remove(self.cache_path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix: str):
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+        shutil.rmtree(self.cache_path(prefix.rstrip("/")), ignore_errors=True)
+
+
+def create_storage(backend: str) -> StorageBackend:
+    if backend == "local":
+        return LocalStorage(settings.STORAGE_LOCAL_ROOT)
+    if backend == "s3":
+        if not settings.S3_BUCKET:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND is 's3'")
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            cache_dir=settings.STORAGE_CACHE_DIR,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            region_name=settings.S3_REGION,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+@lru_cache(maxsize=None)
+def get_storage() -> StorageBackend:
+    return create_storage(settings.STORAGE_BACKEND)
+
+
+# region Photo paths
+def local_photo_path(stored_path: str) -> str:
+    """Readable local path for a *_photo_path column value (blob key or legacy path)."""
+    return get_storage().local_path(stored_path) if is_blob_key(stored_path) else stored_path
+
+
+def cached_photo_path(stored_path: str) -> str:
+    """The path `local_photo_path` returns, computed without fetching anything."""
+    return get_storage().cache_path(stored_path) if is_blob_key(stored_path) else stored_path
+# endregion
+
+
+# region Reference counting
+def store_blobs(db: Session, staged: Sequence[uploads.StoredFile], filenames: Sequence[Optional[str]]) -> List[str]:
+    """
+    Add one reference per staged file to the blob with its content, storing each
+    content that is new (duplicates are discarded). All references are acquired
+    in a single transaction; the staged files are consumed. Returns the blob
+    keys to save in *_photo_path columns, in input order.
+
+    References are committed before the bytes are stored, so a concurrent
+    release of the last reference can never delete a blob that is being reused.
+    """
+    requests: Dict[str, Tuple[str, int, int]] = {}
+    for stored, filename in zip(staged, filenames):
+        key, size, references = requests.get(stored.sha256, (blob_key(stored.sha256, filename), stored.size, 0))
+        requests[stored.sha256] = (key, size, references + 1)
+    keys = crud_blob.acquire_blobs(db, requests)
+    blob_keys = [keys[stored.sha256] for stored in staged]
+    try:
+        backend = get_storage()
+        written = set()
+        for stored, key in zip(staged, blob_keys):
+            if key in written or backend.exists(key):
+                if os.path.exists(stored.path):
+                    os.remove(stored.path)
+            else:
+                backend.put_file(stored.path, key)
+                written.add(key)
+    except Exception:
+        release_blobs(db, blob_keys)
+        for stored in staged:
+            if os.path.exists(stored.path):
+                os.remove(stored.path)
+        raise
+    return blob_keys
+
+
+def store_blob(db: Session, source_path: str, sha256: str, size: int, filename: Optional[str] = None) -> str:
+    """`store_blobs` for a single file."""
+    return store_blobs(db, [uploads.StoredFile(path=source_path, sha256=sha256, size=size)], [filename])[0]
+
+
+def release_blobs(db: Session, stored_paths: Iterable[str]):
+    """Drop one reference per blob key (legacy paths are ignored); unreferenced blobs are deleted."""
+    for stored_path in stored_paths:
+        if not is_blob_key(stored_path):
+            continue
+        blob = crud_blob.release_blob(db, blob_sha256(stored_path))
+        if blob is not None:
+            # The row stays locked until the delete commits, so nobody re-acquires it meanwhile
+            try:
+                get_storage().delete(blob.key)
+                get_storage().delete_prefix(derivative_prefix(blob.sha256))
+            except Exception:
+                db.rollback()
+                raise
+            crud_blob.delete_blob(db, blob)
+# endregion
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import posixpath
+import shutil
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+from uuid import uuid4
+
+UPLOAD_DIR = "uploads"
+# Incoming files are written here before being moved into the blob store
+UPLOAD_STAGING_DIR = os.path.join(UPLOAD_DIR, "staging")
+# Partially received files of resumable upload sessions, one directory per session
+UPLOAD_SESSION_DIR = os.path.join(UPLOAD_DIR, "sessions")
+
+# Photo slots of a photo group; each maps to the `<name>_path` column
+PHOTO_NAMES = ("drone_photo", "side_photo_05m", "side_photo_3m_horizontal", "side_photo_3m_vertical")
+
+# Uploads are copied to disk in chunks of this size, so memory per upload stays constant
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass
+class StoredFile:
+    path: str
+    sha256: str
+    size: int
+
+
+def new_staging_path() -> str:
+    """Unique temporary path for an incoming file, on the same filesystem as the local blob store."""
+    return os.path.join(UPLOAD_STAGING_DIR, uuid4().hex)
+
+
+def save_stream(source: BinaryIO, destination: str, max_bytes: Optional[int] = None) -> StoredFile:
+    """
+    Copy `source` to `destination` in fixed-size chunks, hashing as it goes.
+    Blocking; call it from a worker thread. A partial file is removed on error,
+    including ValueError when `source` is longer than `max_bytes`.
+    """
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(destination, "wb") as buffer:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                buffer.write(chunk)
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"File exceeds {max_bytes} bytes")
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    return StoredFile(path=destination, sha256=digest.hexdigest(), size=size)
+
+
+def hash_file(path: str) -> StoredFile:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as stored:
+        for chunk in iter(lambda: stored.read(UPLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return StoredFile(path=path, sha256=digest.hexdigest(), size=size)
+
+
+# region Archives
+def archive_member_name(name: str) -> Optional[str]:
+    """Normalized relative name of an archive member, or None for names to ignore."""
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if name in (".", "") or name.startswith("../") or name == ".." or name.startswith("__MACOSX/"):
+        return None
+    return name
+
+
+def iter_archive_files(archive_path: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yield (name, file object) for each regular file of a zip or tar archive
+    (tar may be gzip/bzip2/xz compressed), in archive order. Members are
+    decompressed as they are read and never extracted under their own names;
+    each file object is only valid until the next one is yielded.
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                name = archive_member_name(info.filename)
+                if info.is_dir() or name is None:
+                    continue
+                with archive.open(info) as member:
+                    yield name, member
+        return
+
+    try:
+        # Stream mode reads the archive front to back, without seeking or an index
+        with tarfile.open(archive_path, mode="r|*") as archive:
+            for info in archive:
+                name = archive_member_name(info.name)
+                if not info.isfile() or name is None:
+                    continue
+                member = archive.extractfile(info)
+                yield name, member
+    except tarfile.ReadError as e:
+        raise ValueError(f"Not a zip or tar archive: {e}")
+# endregion
+
+
+# region Resumable upload sessions
+def session_file_path(session_id: str, photo: str) -> str:
+    return os.path.join(UPLOAD_SESSION_DIR, session_id, f"{photo}.part")
+
+
+def create_session_files(session_id: str, sizes: Dict[str, int]):
+    """Create each photo's part file at its declared size (sparse), so chunks can land in any order."""
+    os.makedirs(os.path.join(UPLOAD_SESSION_DIR, session_id), exist_ok=True)
+    for photo, size in sizes.items():
+        with open(session_file_path(session_id, photo), "wb") as part:
+            part.truncate(size)
+
+
+def write_chunk(session_id: str, photo: str, offset: int, data: bytes, expected_sha256: str) -> str:
+    """
+    Verify `data` against the client's checksum, then write it at `offset` in the
+    photo's part file. Returns the chunk's SHA-256; raises ValueError on mismatch
+    without touching the file. Blocking; call it from a worker thread.
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    if sha256 != expected_sha256.lower():
+        raise ValueError(f"Chunk checksum mismatch: expected {expected_sha256}, got {sha256}")
+    with open(session_file_path(session_id, photo), "r+b") as part:
+        part.seek(offset)
+        part.write(data)
+    return sha256
+
+
+def verify_session_file(session_id: str, photo: str, expected_sha256: Optional[str] = None) -> StoredFile:
+    """Hash a fully received part file; ValueError if it does not match the SHA-256 declared for it."""
+    stored = hash_file(session_file_path(session_id, photo))
+    if expected_sha256 and stored.sha256 != expected_sha256.lower():
+        raise ValueError(f"{photo} checksum mismatch: expected {expected_sha256}, got {stored.sha256}")
+    return stored
+
+
+def remove_session_files(session_id: str):
+    shutil.rmtree(os.path.join(UPLOAD_SESSION_DIR, session_id), ignore_errors=True)
+# endregion
@@ -0,0 +1,231 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.db.models import User
+
+# Resolved users of authenticated requests, so the auth dependency does not
+# query the database on every request. Entries are matched on username and
+# token version: a password reset bumps users.token_version, which makes both
+# the old tokens and the cached entry stale at once.
+#
+# Two tiers: a bounded LRU in each process (TTL USER_CACHE_TTL_SECONDS) and,
+# when USER_CACHE_REDIS_URL is set, a Redis tier shared by all API processes.
+# Invalidation deletes the user from both and is broadcast over Redis pub/sub
+# so the other processes drop their local copy; without Redis (or while it is
+# unreachable) other processes may serve the old entry until its TTL expires.
+
+# Columns kept in the cache; never secrets (the password hash or a pending reset
+# token), which would otherwise be copied to Redis and every process
+_CACHED_COLUMNS = ("id", "username", "role", "created_at", "token_version")
+_DATETIME_COLUMNS = ("created_at",)
+_KEY_PREFIX = "user_cache:"
+_INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+
+def user_snapshot(user: User) -> Dict[str, Any]:
+    return {column: getattr(user, column) for column in _CACHED_COLUMNS}
+
+
+def user_from_snapshot(snapshot: Dict[str, Any]) -> User:
+    """A detached User with the cached columns (others are None); its relationships are not loaded."""
+    return User(**snapshot)
+
+
+def _encode(snapshot: Dict[str, Any]) -> str:
+    return json.dumps({
+        column: value.isoformat() if isinstance(value, datetime) else value
+        for column, value in snapshot.items()
+    })
+
+
+def _decode(payload) -> Dict[str, Any]:
+    snapshot = json.loads(payload)
+    for column in _DATETIME_COLUMNS:
+        if snapshot.get(column):
+            snapshot[column] = datetime.fromisoformat(snapshot[column])
+    return snapshot
+
+
+class UserCache:
+    """
+    Thread-safe (the sync auth dependency runs in the threadpool). `redis_client`
+    is any client with the redis-py get/set/delete/publish/pubsub API.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, redis_client=None, shared_ttl_seconds: int = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.shared_ttl_seconds = shared_ttl_seconds
+        # username -> (token version, snapshot, expiry on the monotonic clock)
+        self._entries: "OrderedDict[str, Tuple[int, Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("local_hits", "shared_hits", "misses", "invalidations", "evictions", "shared_errors"), 0
+        )
+        self._listener = None
+        # Bumped by every invalidation; see `put`
+        self.generation = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    # region Lookups
+    def get_local(self, username: str, token_version: int) -> Optional[Dict[str, Any]]:
+        """The cached snapshot from this process's tier, or None (a miss is not counted)."""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            version, snapshot, expires_at = entry
+            if expires_at <= time.monotonic() or version != token_version:
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            self._counters["local_hits"] += 1
+            return snapshot
+
+    def get_shared(self, username: str, token_version: int) -> Optional[Dict[str, Any]]:
+        """The snapshot from the Redis tier (copied into the local tier), or None; counts the miss."""
+        if self.redis is not None:
+            try:
+                payload = self.redis.get(_KEY_PREFIX + username)
+            except Exception as e:
+                self._shared_error("read", e)
+                payload = None
+            if payload is not None:
+                snapshot = _decode(payload)
+                if snapshot.get("token_version") == token_version:
+                    self._count("shared_hits")
+                    self._put_local(snapshot)
+                    return snapshot
+        self._count("misses")
+        return None
+
+    def get(self, username: str, token_version: int) -> Optional[Dict[str, Any]]:
+        return self.get_local(username, token_version) or self.get_shared(username, token_version)
+    # endregion
+
+    # region Updates
+    def _put_local(self, snapshot: Dict[str, Any], read_generation: Optional[int] = None) -> bool:
+        with self._lock:
+            if read_generation is not None and read_generation != self.generation:
+                return False
+            self._entries[snapshot["username"]] = (
+                snapshot["token_version"], snapshot, time.monotonic() + self.ttl_seconds
+            )
+            self._entries.move_to_end(snapshot["username"])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return True
+
+    def put(self, snapshot: Dict[str, Any], read_generation: Optional[int] = None):
+        """
+        Cache a snapshot read from the database. Pass the `generation` seen
+        before that read: if the user was invalidated meanwhile, the snapshot
+        may predate the change and is not cached.
+        """
+        if self._put_local(snapshot, read_generation) and self.redis is not None:
+            try:
+                self.redis.set(_KEY_PREFIX + snapshot["username"], _encode(snapshot), ex=self.shared_ttl_seconds)
+            except Exception as e:
+                self._shared_error("write", e)
+
+    def _drop_local(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+            self.generation += 1
+
+    def invalidate(self, username: str):
+        """Forget the user in every tier and every process; call after changing the user row."""
+        self._drop_local(username)
+        self._count("invalidations")
+        if self.redis is not None:
+            try:
+                self.redis.delete(_KEY_PREFIX + username)
+                self.redis.publish(_INVALIDATION_CHANNEL, username)
+            except Exception as e:
+                self._shared_error("invalidation", e)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    # endregion
+
+    # region Cross-process invalidation
+    def start_listener(self):
+        """Drop local entries other processes invalidate (a daemon thread on a Redis subscription)."""
+        if self.redis is None or self._listener is not None:
+            return
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{_INVALIDATION_CHANNEL: self._on_invalidation})
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error)
+
+    def _on_invalidation(self, message):
+        username = message["data"]
+        self._drop_local(username.decode() if isinstance(username, bytes) else username)
+
+    def _on_listener_error(self, e, pubsub, thread):
+        # The subscription reconnects on the next poll; local entries expire by TTL meanwhile
+        self._shared_error("subscription", e)
+        time.sleep(1.0)
+
+    def stop_listener(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+    # endregion
+
+    def _shared_error(self, operation: str, e: Exception):
+        # The shared tier is an optimization: on errors, fall back to the database
+        self._count("shared_errors")
+        print(f"User cache: Redis {operation} failed: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["local_hits"] + counters["shared_hits"] + counters["misses"]
+        hits = counters["local_hits"] + counters["shared_hits"]
+        return {
+            **counters,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "local_entries": size,
+            "max_entries": self.max_entries,
+            "shared_tier": self.redis is not None,
+        }
+
+
+def create_user_cache() -> UserCache:
+    redis_client = None
+    if settings.USER_CACHE_REDIS_URL:
+        import redis
+
+        redis_client = redis.Redis.from_url(
+            settings.USER_CACHE_REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+    cache = UserCache(
+        max_entries=settings.USER_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+        redis_client=redis_client,
+        shared_ttl_seconds=settings.USER_CACHE_SHARED_TTL_SECONDS,
+    )
+    try:
+        cache.start_listener()
+    except Exception as e:
+        cache._shared_error("subscription", e)
+    return cache
+
+
+@lru_cache(maxsize=None)
+def get_user_cache() -> UserCache:
+    return create_user_cache()
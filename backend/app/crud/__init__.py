@@ -1,7 +1,14 @@
-from . import crud_analysis_result, crud_field, crud_user, crud_photogroup
+from . import crud_analysis_result, crud_field, crud_user, crud_photogroup, crud_step_cache, crud_stage_result, crud_upload_session, crud_blob, crud_upload_batch
+# Async variants of the read functions; not star-exported, their names match the sync ones
+from . import crud_analysis_result_async, crud_field_async, crud_user_async
 
 # Export the functions for use
 from .crud_analysis_result import *
 from .crud_field import *
 from .crud_user import *
-from .crud_photogroup import *
\ No newline at end of file
+from .crud_photogroup import *
+from .crud_step_cache import *
+from .crud_stage_result import *
+from .crud_upload_session import *
+from .crud_blob import *
+from .crud_upload_batch import *
\ No newline at end of file
@@ -1,13 +1,44 @@
-from sqlalchemy.orm import Session, joinedload
+import calendar
+from sqlalchemy import Float, insert, literal
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.sql import func
 from app.db import models
 from app.schemas import analysis_result as ar_schema
-from datetime import date
-from typing import List, Optional
+from .loading import LoadProfile, load_options
+from .pagination import DEFAULT_PAGE_SIZE, Listing, Page, build_page, keyset
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
 
-def get_analysis_result(db: Session, result_id: int, owner_id: int) -> models.AnalysisResult | None:
+# Numeric indicators a chart or heatmap can plot
+INDICATOR_NAMES = tuple(
+    column.key for column in models.AnalysisResult.__table__.columns if isinstance(column.type, Float)
+)
+
+def indicator_column(indicator: str):
+    """The AnalysisResult column of a numeric indicator; raises ValueError for anything else."""
+    if indicator not in INDICATOR_NAMES:
+        raise ValueError(f"Unknown indicator {indicator}; use one of {', '.join(INDICATOR_NAMES)}")
+    return getattr(models.AnalysisResult, indicator)
+
+# Matches the covering (capture_date, field_id, id) index on photo_groups
+PERIOD_RESULTS_LISTING = Listing(
+    "period_results", (models.PhotoGroup.capture_date, models.PhotoGroup.field_id, models.PhotoGroup.id), (date, int, int)
+)
+
+# Within one dekad and indicator, matches the (period_start, indicator, field_id) index
+FIELD_PERIOD_STATS_LISTING = Listing("field_period_stats", (models.FieldPeriodStat.field_id,), (int,))
+
+def dekad_bounds(day: date) -> Tuple[date, date]:
+    """First and last day of the dekad (days 1-10, 11-20 or 21 to month end) containing `day`."""
+    start = day.replace(day=min(day.day - (day.day - 1) % 10, 21))
+    if start.day == 21:
+        return start, start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    return start, start + timedelta(days=9)
+
+def get_analysis_result(db: Session, result_id: int, owner_id: int, load: LoadProfile = "joined") -> models.AnalysisResult | None:
     return (
         db.query(models.AnalysisResult)
-        .options(joinedload(models.AnalysisResult.photo_group))
+        .options(*load_options(models.AnalysisResult.photo_group, load))
         .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
         .join(models.Field, models.PhotoGroup.field_id == models.Field.id)
         .filter(models.Field.owner_id == owner_id)
@@ -21,25 +52,53 @@ def create_analysis_result(db: Session, photo_group_id: int, result_data: dict)
         **result_data
     )
     db.add(db_result)
+    _refresh_photo_group_period_stats(db, photo_group_id)
     db.commit()
     db.refresh(db_result)
     return db_result
 
-def get_analysis_results_for_period(db: Session, owner_id: int, start_date: date, end_date: date) -> List[models.AnalysisResult]:
-    return (
+def upsert_analysis_result(db: Session, photo_group_id: int, result_data: dict, is_provisional: bool = False) -> models.AnalysisResult:
+    """
+    Create or overwrite the result of a photo group.
+
+    Used by the two-phase pipeline: the preview phase writes provisional values,
+    and the full-resolution phase (or a retry) overwrites them in place.
+    """
+    db_result = (
+        db.query(models.AnalysisResult)
+        .filter(models.AnalysisResult.photo_group_id == photo_group_id)
+        .first()
+    )
+    if db_result is None:
+        db_result = models.AnalysisResult(photo_group_id=photo_group_id)
+        db.add(db_result)
+    for key, value in result_data.items():
+        setattr(db_result, key, value)
+    db_result.is_provisional = is_provisional
+    db_result.analysis_time = func.now()
+    _refresh_photo_group_period_stats(db, photo_group_id)
+    db.commit()
+    db.refresh(db_result)
+    return db_result
+
+def get_analysis_results_for_period(db: Session, owner_id: int, start_date: date, end_date: date, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, load: LoadProfile = "selectin") -> Page[models.AnalysisResult]:
+    """One page of the owner's results captured in the period, by capture date then field. Raises InvalidCursorError."""
+    query = (
         db.query(models.AnalysisResult)
+        .options(*load_options(models.AnalysisResult.photo_group, load))
         .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
         .join(models.Field, models.PhotoGroup.field_id == models.Field.id)
         .filter(models.Field.owner_id == owner_id)
         .filter(models.PhotoGroup.capture_date >= start_date)
         .filter(models.PhotoGroup.capture_date <= end_date)
-        .all()
     )
+    return build_page(keyset(query, PERIOD_RESULTS_LISTING, cursor, limit).all(), PERIOD_RESULTS_LISTING, limit)
 
 
-def get_analysis_results_for_field(db: Session, field_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[models.AnalysisResult]:
+def get_analysis_results_for_field(db: Session, field_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None, load: LoadProfile = "selectin") -> List[models.AnalysisResult]:
     query = (
         db.query(models.AnalysisResult)
+        .options(*load_options(models.AnalysisResult.photo_group, load))
         .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
         .filter(models.PhotoGroup.field_id == field_id)
     )
@@ -51,3 +110,168 @@ def get_analysis_results_for_field(db: Session, field_id: int, start_date: Optio
         query = query.filter(models.PhotoGroup.capture_date <= end_date)
     
     return query.all()
+
+def get_indicator_values_for_field(db: Session, field_id: int, indicator: str, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[Tuple[date, Optional[float]]]:
+    """(capture date, indicator value) of every result of the field: two columns, no ORM objects."""
+    query = (
+        db.query(models.PhotoGroup.capture_date, indicator_column(indicator))
+        .join(models.AnalysisResult, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .filter(models.PhotoGroup.field_id == field_id)
+    )
+    
+    if start_date:
+        query = query.filter(models.PhotoGroup.capture_date >= start_date)
+    
+    if end_date:
+        query = query.filter(models.PhotoGroup.capture_date <= end_date)
+    
+    return [tuple(row) for row in query.all()]
+
+def get_cell_grids_for_field(db: Session, field_id: int, indicator: Optional[str], start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[Tuple[date, Optional[float], Optional[str]]]:
+    """
+    (capture date, indicator value, encoded cell grid) of every result of the
+    field, by capture date. With `indicator` None the value is always None.
+    """
+    value = indicator_column(indicator) if indicator is not None else literal(None, Float)
+    query = (
+        db.query(models.PhotoGroup.capture_date, value, models.AnalysisResult.cell_grid)
+        .join(models.AnalysisResult, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .filter(models.PhotoGroup.field_id == field_id)
+    )
+
+    if start_date:
+        query = query.filter(models.PhotoGroup.capture_date >= start_date)
+
+    if end_date:
+        query = query.filter(models.PhotoGroup.capture_date <= end_date)
+
+    return [tuple(row) for row in query.order_by(models.PhotoGroup.capture_date, models.PhotoGroup.id).all()]
+
+# What a served result (with its photo group) can change with after it is written
+RESULT_VALIDATOR_COLUMNS = (
+    models.AnalysisResult.analysis_time,
+    models.AnalysisResult.is_provisional,
+    models.PhotoGroup.analysis_status,
+    models.PhotoGroup.derivatives_generated_at,
+)
+
+def get_result_validators(db: Session, result_id: int, owner_id: int) -> Optional[Tuple[Optional[datetime], bool, models.AnalysisStatusEnum, Optional[datetime]]]:
+    """
+    RESULT_VALIDATOR_COLUMNS of an owned result, None if missing or not the
+    owner's: one row by primary key, without loading ORM objects.
+    """
+    row = (
+        db.query(*RESULT_VALIDATOR_COLUMNS)
+        .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .join(models.Field, models.PhotoGroup.field_id == models.Field.id)
+        .filter(models.Field.owner_id == owner_id)
+        .filter(models.AnalysisResult.id == result_id)
+        .first()
+    )
+    return tuple(row) if row else None
+
+
+# Per-field dekad rollup: field_period_stats keeps count/sum/min/max of every
+# numeric indicator per field and dekad, so comparisons and dashboards read a
+# handful of rows per period instead of every result. Writers of results
+# refresh the affected dekad in their own transaction;
+# rebuild_field_period_stats recomputes it from scratch (e.g. after importing
+# results with plain SQL).
+
+def _lock_fields(db: Session, field_ids: Iterable[int]):
+    # Writers of the same field recompute its rollup one after the other, each
+    # seeing the results the previous one committed (a no-op on SQLite, which
+    # serializes writers anyway)
+    db.query(models.Field.id).filter(models.Field.id.in_(list(field_ids))).with_for_update().all()
+
+def _rollup_rows(db: Session, *filters) -> List[dict]:
+    """field_period_stats rows of the results matching `filters`: aggregated per day in SQL, merged per dekad here."""
+    aggregates = [
+        aggregate(indicator_column(indicator))
+        for indicator in INDICATOR_NAMES
+        for aggregate in (func.count, func.sum, func.min, func.max)
+    ]
+    query = (
+        db.query(models.PhotoGroup.field_id, models.PhotoGroup.capture_date, *aggregates)
+        .join(models.AnalysisResult, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .filter(*filters)
+        .group_by(models.PhotoGroup.field_id, models.PhotoGroup.capture_date)
+    )
+    rows = {}
+    for field_id, capture_date, *values in query:
+        period_start = dekad_bounds(capture_date)[0]
+        for position, indicator in enumerate(INDICATOR_NAMES):
+            count, total, minimum, maximum = values[4 * position:4 * position + 4]
+            if not count:
+                continue
+            row = rows.get((field_id, period_start, indicator))
+            if row is None:
+                rows[(field_id, period_start, indicator)] = {
+                    "field_id": field_id, "period_start": period_start, "indicator": indicator,
+                    "value_count": count, "value_sum": total, "value_min": minimum, "value_max": maximum,
+                }
+            else:
+                row["value_count"] += count
+                row["value_sum"] += total
+                row["value_min"] = min(row["value_min"], minimum)
+                row["value_max"] = max(row["value_max"], maximum)
+    return list(rows.values())
+
+def refresh_field_period_stats(db: Session, field_id: int, day: date) -> None:
+    """
+    Recompute the rollup of the field's dekad containing `day` from its results.
+    Does not commit: call it in the transaction that changed the results.
+    """
+    period_start, period_end = dekad_bounds(day)
+    db.flush()
+    _lock_fields(db, [field_id])
+    db.query(models.FieldPeriodStat).filter(
+        models.FieldPeriodStat.field_id == field_id,
+        models.FieldPeriodStat.period_start == period_start,
+    ).delete(synchronize_session=False)
+    rows = _rollup_rows(
+        db,
+        models.PhotoGroup.field_id == field_id,
+        models.PhotoGroup.capture_date >= period_start,
+        models.PhotoGroup.capture_date <= period_end,
+    )
+    if rows:
+        db.execute(insert(models.FieldPeriodStat), rows)
+
+def _refresh_photo_group_period_stats(db: Session, photo_group_id: int) -> None:
+    field_id, capture_date = (
+        db.query(models.PhotoGroup.field_id, models.PhotoGroup.capture_date)
+        .filter(models.PhotoGroup.id == photo_group_id)
+        .one()
+    )
+    refresh_field_period_stats(db, field_id, capture_date)
+
+def rebuild_field_period_stats(db: Session, field_ids: Iterable[int]) -> int:
+    """Recompute the whole rollup of the fields and commit; returns the number of rows written."""
+    field_ids = list(field_ids)
+    _lock_fields(db, field_ids)
+    db.query(models.FieldPeriodStat).filter(
+        models.FieldPeriodStat.field_id.in_(field_ids)
+    ).delete(synchronize_session=False)
+    rows = _rollup_rows(db, models.PhotoGroup.field_id.in_(field_ids))
+    if rows:
+        db.execute(insert(models.FieldPeriodStat), rows)
+    db.commit()
+    return len(rows)
+
+def get_field_period_stats(db: Session, owner_id: int, period_start: date, indicator: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[models.FieldPeriodStat]:
+    """
+    One page of the rollup of the owner's fields for a dekad and indicator, by
+    field, with each row's field loaded. Raises ValueError for an unknown
+    indicator (InvalidCursorError for a bad cursor).
+    """
+    indicator_column(indicator)
+    query = (
+        db.query(models.FieldPeriodStat)
+        .join(models.FieldPeriodStat.field)
+        .options(contains_eager(models.FieldPeriodStat.field))
+        .filter(models.Field.owner_id == owner_id)
+        .filter(models.FieldPeriodStat.period_start == period_start)
+        .filter(models.FieldPeriodStat.indicator == indicator)
+    )
+    return build_page(keyset(query, FIELD_PERIOD_STATS_LISTING, cursor, limit).all(), FIELD_PERIOD_STATS_LISTING, limit)
@@ -0,0 +1,110 @@
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+
+from app.db import models
+from .crud_analysis_result import FIELD_PERIOD_STATS_LISTING, PERIOD_RESULTS_LISTING, RESULT_VALIDATOR_COLUMNS, indicator_column
+from .loading import LoadProfile, load_options
+from .pagination import DEFAULT_PAGE_SIZE, Page, build_page, keyset
+
+# Async counterparts of the crud_analysis_result reads. Async sessions cannot
+# lazy-load, so the photo group is either loaded eagerly or not at all
+# (load="none" makes touching it raise).
+
+async def get_analysis_result(db: AsyncSession, result_id: int, owner_id: int, load: LoadProfile = "joined") -> Optional[models.AnalysisResult]:
+    result = await db.scalars(
+        select(models.AnalysisResult)
+        .options(*load_options(models.AnalysisResult.photo_group, load))
+        .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .join(models.Field, models.PhotoGroup.field_id == models.Field.id)
+        .filter(models.Field.owner_id == owner_id)
+        .filter(models.AnalysisResult.id == result_id)
+    )
+    return result.first()
+
+async def get_analysis_results_for_period(db: AsyncSession, owner_id: int, start_date: date, end_date: date, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, load: LoadProfile = "selectin") -> Page[models.AnalysisResult]:
+    query = (
+        select(models.AnalysisResult)
+        .options(*load_options(models.AnalysisResult.photo_group, load))
+        .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .join(models.Field, models.PhotoGroup.field_id == models.Field.id)
+        .filter(models.Field.owner_id == owner_id)
+        .filter(models.PhotoGroup.capture_date >= start_date)
+        .filter(models.PhotoGroup.capture_date <= end_date)
+    )
+    result = await db.execute(keyset(query, PERIOD_RESULTS_LISTING, cursor, limit))
+    return build_page(result.all(), PERIOD_RESULTS_LISTING, limit)
+
+async def get_analysis_results_for_field(db: AsyncSession, field_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None, load: LoadProfile = "selectin") -> List[models.AnalysisResult]:
+    query = (
+        select(models.AnalysisResult)
+        .options(*load_options(models.AnalysisResult.photo_group, load))
+        .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .filter(models.PhotoGroup.field_id == field_id)
+    )
+
+    if start_date:
+        query = query.filter(models.PhotoGroup.capture_date >= start_date)
+
+    if end_date:
+        query = query.filter(models.PhotoGroup.capture_date <= end_date)
+
+    return list(await db.scalars(query))
+
+async def get_indicator_values_for_field(db: AsyncSession, field_id: int, indicator: str, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[Tuple[date, Optional[float]]]:
+    """(capture date, indicator value) of every result of the field: two columns, no ORM objects."""
+    query = (
+        select(models.PhotoGroup.capture_date, indicator_column(indicator))
+        .join(models.AnalysisResult, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .filter(models.PhotoGroup.field_id == field_id)
+    )
+
+    if start_date:
+        query = query.filter(models.PhotoGroup.capture_date >= start_date)
+
+    if end_date:
+        query = query.filter(models.PhotoGroup.capture_date <= end_date)
+
+    return [tuple(row) for row in await db.execute(query)]
+
+async def get_cell_grids_for_field(db: AsyncSession, field_id: int, indicator: Optional[str], start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[Tuple[date, Optional[float], Optional[str]]]:
+    value = indicator_column(indicator) if indicator is not None else literal(None, Float)
+    query = (
+        select(models.PhotoGroup.capture_date, value, models.AnalysisResult.cell_grid)
+        .join(models.AnalysisResult, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .filter(models.PhotoGroup.field_id == field_id)
+    )
+
+    if start_date:
+        query = query.filter(models.PhotoGroup.capture_date >= start_date)
+
+    if end_date:
+        query = query.filter(models.PhotoGroup.capture_date <= end_date)
+
+    return [tuple(row) for row in await db.execute(query.order_by(models.PhotoGroup.capture_date, models.PhotoGroup.id))]
+
+async def get_result_validators(db: AsyncSession, result_id: int, owner_id: int) -> Optional[Tuple[Optional[datetime], bool, models.AnalysisStatusEnum, Optional[datetime]]]:
+    row = (await db.execute(
+        select(*RESULT_VALIDATOR_COLUMNS)
+        .join(models.PhotoGroup, models.AnalysisResult.photo_group_id == models.PhotoGroup.id)
+        .join(models.Field, models.PhotoGroup.field_id == models.Field.id)
+        .filter(models.Field.owner_id == owner_id)
+        .filter(models.AnalysisResult.id == result_id)
+    )).first()
+    return tuple(row) if row else None
+
+async def get_field_period_stats(db: AsyncSession, owner_id: int, period_start: date, indicator: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[models.FieldPeriodStat]:
+    indicator_column(indicator)
+    query = (
+        select(models.FieldPeriodStat)
+        .join(models.FieldPeriodStat.field)
+        .options(contains_eager(models.FieldPeriodStat.field))
+        .filter(models.Field.owner_id == owner_id)
+        .filter(models.FieldPeriodStat.period_start == period_start)
+        .filter(models.FieldPeriodStat.indicator == indicator)
+    )
+    result = await db.execute(keyset(query, FIELD_PERIOD_STATS_LISTING, cursor, limit))
+    return build_page(result.all(), FIELD_PERIOD_STATS_LISTING, limit)
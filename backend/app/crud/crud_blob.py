@@ -0,0 +1,53 @@
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+def acquire_blobs(db: Session, requests: Dict[str, Tuple[str, int, int]]) -> Dict[str, str]:
+    """
+    Add references to blobs in one transaction. `requests` maps each SHA-256 to
+    (key, size, number of references); missing rows are created. Returns the
+    key of every blob (an existing blob keeps the key it was first stored under).
+    """
+    while True:
+        existing = {
+            blob.sha256: blob
+            for blob in db.query(models.StoredBlob)
+            .filter(models.StoredBlob.sha256.in_(list(requests)))
+            .with_for_update()
+        }
+        keys = {}
+        for sha256, (key, size, references) in requests.items():
+            blob = existing.get(sha256)
+            if blob is not None:
+                blob.ref_count += references
+                keys[sha256] = blob.key
+            else:
+                db.add(models.StoredBlob(sha256=sha256, key=key, size=size, ref_count=references))
+                keys[sha256] = key
+        try:
+            db.commit()
+            return keys
+        except IntegrityError:
+            # Another upload of the same content created a row first; add our references to it
+            db.rollback()
+
+def release_blob(db: Session, sha256: str) -> Optional[models.StoredBlob]:
+    """
+    Drop one reference. If it was the last one, the locked row is returned
+    without committing: the caller deletes the stored bytes, then `delete_blob`.
+    """
+    blob = db.query(models.StoredBlob).filter(models.StoredBlob.sha256 == sha256).with_for_update().first()
+    if blob is None:
+        return None
+    blob.ref_count -= 1
+    if blob.ref_count > 0:
+        db.commit()
+        return None
+    return blob
+
+def delete_blob(db: Session, blob: models.StoredBlob) -> None:
+    db.delete(blob)
+    db.commit()
@@ -1,27 +1,43 @@
-from typing import List
-from sqlalchemy.orm import Session, joinedload
+from typing import Iterable, List, Optional, Set
+from sqlalchemy.orm import Session
 from datetime import datetime, date
 
 from app.db import models
 from app.schemas import field as field_schema
+from .loading import LoadProfile, load_options
+from .pagination import DEFAULT_PAGE_SIZE, Listing, Page, build_page, keyset
+
+FIELDS_LISTING = Listing("fields", (models.Field.id,), (int,))
+# Newest capture first, as the field's history is shown
+FIELD_RESULTS_LISTING = Listing("field_results", (models.PhotoGroup.capture_date, models.PhotoGroup.id), (date, int), descending=True)
 
 def get_field(db: Session, field_id: int):
     return db.query(models.Field).filter(models.Field.id == field_id).first()
 
-def get_fields_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100) -> List[models.Field]:
-    return db.query(models.Field).filter(models.Field.owner_id == owner_id).offset(skip).limit(limit).all()
+def get_field_results_version(db: Session, field_id: int, owner_id: int) -> Optional[int]:
+    """results_version of an owned field (None if missing or not the owner's): one primary key lookup, no ORM object."""
+    return (
+        db.query(models.Field.results_version)
+        .filter(models.Field.id == field_id, models.Field.owner_id == owner_id)
+        .scalar()
+    )
 
-def get_field_results(db: Session, field_id: int, owner_id: int) -> List[models.PhotoGroup]:
+def get_fields_by_owner(db: Session, owner_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[models.Field]:
+    """One page of the owner's fields by id. Raises InvalidCursorError."""
+    query = db.query(models.Field).filter(models.Field.owner_id == owner_id)
+    return build_page(keyset(query, FIELDS_LISTING, cursor, limit).all(), FIELDS_LISTING, limit)
+
+def get_field_results(db: Session, field_id: int, owner_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, load: LoadProfile = "joined") -> Page[models.PhotoGroup]:
+    """One page of the field's photo groups, newest capture first. Raises InvalidCursorError."""
     field = get_field(db, field_id)
     if not field or field.owner_id != owner_id:
-        return []
-    return (
+        return Page(items=[], next_cursor=None)
+    query = (
         db.query(models.PhotoGroup)
-        .options(joinedload(models.PhotoGroup.analysis_result))
+        .options(*load_options(models.PhotoGroup.analysis_result, load))
         .filter(models.PhotoGroup.field_id == field_id)
-        .order_by(models.PhotoGroup.capture_date.desc())
-        .all()
     )
+    return build_page(keyset(query, FIELD_RESULTS_LISTING, cursor, limit).all(), FIELD_RESULTS_LISTING, limit)
 
 def create_field_for_user(db: Session, field: field_schema.FieldCreate, owner_id: int) -> models.Field:
     field_data = field.dict()
@@ -50,4 +66,13 @@ def delete_field(db: Session, field_id: int) -> models.Field:
     if db_field:
         db.delete(db_field)
         db.commit()
-    return db_field
\ No newline at end of file
+    return db_field
+
+def get_owned_field_ids(db: Session, owner_id: int, field_ids: Iterable[int]) -> Set[int]:
+    """The subset of `field_ids` that exist and belong to `owner_id` (one query)."""
+    rows = (
+        db.query(models.Field.id)
+        .filter(models.Field.owner_id == owner_id, models.Field.id.in_(list(field_ids)))
+        .all()
+    )
+    return {field_id for (field_id,) in rows}
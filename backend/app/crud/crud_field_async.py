@@ -0,0 +1,37 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import models
+from .crud_field import FIELD_RESULTS_LISTING, FIELDS_LISTING
+from .loading import LoadProfile, load_options
+from .pagination import DEFAULT_PAGE_SIZE, Page, build_page, keyset
+
+# Async counterparts of the crud_field reads, for the async endpoints
+
+async def get_field(db: AsyncSession, field_id: int) -> Optional[models.Field]:
+    return await db.get(models.Field, field_id)
+
+async def get_field_results_version(db: AsyncSession, field_id: int, owner_id: int) -> Optional[int]:
+    return await db.scalar(
+        select(models.Field.results_version)
+        .filter(models.Field.id == field_id, models.Field.owner_id == owner_id)
+    )
+
+async def get_fields_by_owner(db: AsyncSession, owner_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[models.Field]:
+    query = select(models.Field).filter(models.Field.owner_id == owner_id)
+    result = await db.execute(keyset(query, FIELDS_LISTING, cursor, limit))
+    return build_page(result.all(), FIELDS_LISTING, limit)
+
+async def get_field_results(db: AsyncSession, field_id: int, owner_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, load: LoadProfile = "joined") -> Page[models.PhotoGroup]:
+    field = await get_field(db, field_id)
+    if not field or field.owner_id != owner_id:
+        return Page(items=[], next_cursor=None)
+    query = (
+        select(models.PhotoGroup)
+        .options(*load_options(models.PhotoGroup.analysis_result, load))
+        .filter(models.PhotoGroup.field_id == field_id)
+    )
+    result = await db.execute(keyset(query, FIELD_RESULTS_LISTING, cursor, limit))
+    return build_page(result.unique().all(), FIELD_RESULTS_LISTING, limit)
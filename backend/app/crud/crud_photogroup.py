@@ -1,8 +1,10 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 from app.db import models
 from app.schemas import photogroup as photogroup_schema
 
-def create_photo_group(db: Session, photo_group: photogroup_schema.PhotoGroupCreate, drone_photo_path: str, side_photo_05m_path: str, side_photo_3m_horizontal_path: str, side_photo_3m_vertical_path: str) -> models.PhotoGroup:
+def create_photo_group(db: Session, photo_group: photogroup_schema.PhotoGroupCreate, drone_photo_path: str, side_photo_05m_path: str, side_photo_3m_horizontal_path: str, side_photo_3m_vertical_path: str, photo_checksums: Optional[dict] = None, photo_metadata: Optional[dict] = None) -> models.PhotoGroup:
     db_photogroup = models.PhotoGroup(
         field_id=photo_group.field_id,
         capture_date=photo_group.capture_date,
@@ -10,7 +12,9 @@ def create_photo_group(db: Session, photo_group: photogroup_schema.PhotoGroupCre
         drone_photo_path=drone_photo_path,
         side_photo_05m_path=side_photo_05m_path,
         side_photo_3m_horizontal_path=side_photo_3m_horizontal_path,
-        side_photo_3m_vertical_path=side_photo_3m_vertical_path
+        side_photo_3m_vertical_path=side_photo_3m_vertical_path,
+        photo_checksums=photo_checksums,
+        photo_metadata=photo_metadata
     )
     db.add(db_photogroup)
     db.commit()
@@ -24,3 +28,6 @@ def update_task_id(db: Session, photo_group_id: int, task_id: str) -> models.Pho
         db.commit()
         db.refresh(db_photogroup)
     return db_photogroup
+
+def get_photo_group(db: Session, photo_group_id: int) -> Optional[models.PhotoGroup]:
+    return db.query(models.PhotoGroup).filter(models.PhotoGroup.id == photo_group_id).first()
@@ -0,0 +1,36 @@
+import json
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+def get_stage_result(db: Session, photo_group_id: int, stage: str) -> Optional[dict]:
+    entry = (
+        db.query(models.AnalysisStageResult)
+        .filter(models.AnalysisStageResult.photo_group_id == photo_group_id)
+        .filter(models.AnalysisStageResult.stage == stage)
+        .first()
+    )
+    return json.loads(entry.result_json) if entry else None
+
+def get_stage_results(db: Session, photo_group_id: int) -> Dict[str, dict]:
+    entries = (
+        db.query(models.AnalysisStageResult)
+        .filter(models.AnalysisStageResult.photo_group_id == photo_group_id)
+        .all()
+    )
+    return {entry.stage: json.loads(entry.result_json) for entry in entries}
+
+def save_stage_result(db: Session, photo_group_id: int, stage: str, result: dict) -> None:
+    """Checkpoint a completed stage. A concurrent duplicate run of the same stage keeps the first result."""
+    db.add(models.AnalysisStageResult(
+        photo_group_id=photo_group_id,
+        stage=stage,
+        result_json=json.dumps(result, default=float),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
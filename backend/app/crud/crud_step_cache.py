@@ -0,0 +1,54 @@
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+def get_cache_entry(db: Session, cache_key: str) -> Optional[models.StepResultCache]:
+    entry = db.query(models.StepResultCache).filter(models.StepResultCache.cache_key == cache_key).first()
+    if entry:
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_accessed_at = func.now()
+        db.commit()
+    return entry
+
+def add_cache_entry(db: Session, cache_key: str, step: str, result_json: str) -> bool:
+    """Store a step result. Returns False if another worker stored the same key first."""
+    entry = models.StepResultCache(
+        cache_key=cache_key,
+        step=step,
+        result_json=result_json,
+        size_bytes=len(result_json.encode("utf-8")),
+    )
+    db.add(entry)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+def evict_cache_entries(db: Session, max_bytes: int) -> int:
+    """Delete least recently used entries until the stored payload fits in `max_bytes`."""
+    total_bytes = db.query(func.coalesce(func.sum(models.StepResultCache.size_bytes), 0)).scalar()
+    excess = total_bytes - max_bytes
+    if excess <= 0:
+        return 0
+
+    evict_ids = []
+    candidates = (
+        db.query(models.StepResultCache.id, models.StepResultCache.size_bytes)
+        .order_by(models.StepResultCache.last_accessed_at.asc(), models.StepResultCache.id.asc())
+        .yield_per(500)
+    )
+    for entry_id, size_bytes in candidates:
+        evict_ids.append(entry_id)
+        excess -= size_bytes
+        if excess <= 0:
+            break
+
+    db.query(models.StepResultCache).filter(models.StepResultCache.id.in_(evict_ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(evict_ids)
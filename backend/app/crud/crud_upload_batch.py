@@ -0,0 +1,43 @@
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+def create_upload_batch(db: Session, owner_id: int, photo_groups: List[dict]) -> models.UploadBatch:
+    """Insert a batch and all of its PhotoGroup rows (column dicts) in a single transaction."""
+    db_batch = models.UploadBatch(id=uuid4().hex, owner_id=owner_id, group_count=len(photo_groups))
+    db.add(db_batch)
+    db.add_all(models.PhotoGroup(batch_id=db_batch.id, **photo_group) for photo_group in photo_groups)
+    db.commit()
+    db.refresh(db_batch)
+    return db_batch
+
+def delete_upload_batch(db: Session, batch_id: str) -> None:
+    """Delete a batch and its photo groups (through the session, so field results versions are bumped)."""
+    for photo_group in get_batch_photo_groups(db, batch_id):
+        db.delete(photo_group)
+    db.query(models.UploadBatch).filter(models.UploadBatch.id == batch_id).delete(synchronize_session=False)
+    db.commit()
+
+def get_upload_batch(db: Session, batch_id: str) -> Optional[models.UploadBatch]:
+    return db.query(models.UploadBatch).filter(models.UploadBatch.id == batch_id).first()
+
+def get_batch_photo_groups(db: Session, batch_id: str) -> List[models.PhotoGroup]:
+    return (
+        db.query(models.PhotoGroup)
+        .filter(models.PhotoGroup.batch_id == batch_id)
+        .order_by(models.PhotoGroup.id)
+        .all()
+    )
+
+def get_batch_status_counts(db: Session, batch_id: str) -> Dict[str, int]:
+    rows = (
+        db.query(models.PhotoGroup.analysis_status, func.count(models.PhotoGroup.id))
+        .filter(models.PhotoGroup.batch_id == batch_id)
+        .group_by(models.PhotoGroup.analysis_status)
+        .all()
+    )
+    return {analysis_status.value: count for analysis_status, count in rows}
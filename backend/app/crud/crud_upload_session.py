@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.schemas import upload_session as upload_schema
+
+def _expiry(ttl_hours: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=ttl_hours)
+
+def create_upload_session(db: Session, upload_session: upload_schema.UploadSessionCreate, owner_id: int, chunk_size: int, ttl_hours: int) -> models.UploadSession:
+    db_session = models.UploadSession(
+        id=uuid4().hex,
+        owner_id=owner_id,
+        field_id=upload_session.field_id,
+        capture_date=upload_session.capture_date,
+        rice_variety=upload_session.rice_variety,
+        files={photo: declaration.model_dump() for photo, declaration in upload_session.files.items()},
+        chunk_size=chunk_size,
+        expires_at=_expiry(ttl_hours),
+    )
+    db.add(db_session)
+    db.commit()
+    db.refresh(db_session)
+    return db_session
+
+def get_upload_session(db: Session, session_id: str) -> Optional[models.UploadSession]:
+    """The session with this id, or None if it does not exist or has expired."""
+    return (
+        db.query(models.UploadSession)
+        .filter(models.UploadSession.id == session_id)
+        .filter(models.UploadSession.expires_at > datetime.now(timezone.utc))
+        .first()
+    )
+
+def get_received_chunks(db: Session, session_id: str) -> Dict[str, Dict[int, int]]:
+    """{photo: {chunk_index: size}} for every chunk stored so far."""
+    rows = (
+        db.query(models.UploadChunk.photo, models.UploadChunk.chunk_index, models.UploadChunk.size)
+        .filter(models.UploadChunk.session_id == session_id)
+        .all()
+    )
+    received: Dict[str, Dict[int, int]] = {}
+    for photo, chunk_index, size in rows:
+        received.setdefault(photo, {})[chunk_index] = size
+    return received
+
+def save_chunk(db: Session, db_session: models.UploadSession, photo: str, chunk_index: int, size: int, sha256: str, ttl_hours: int) -> None:
+    """Record a stored chunk (re-sent chunks overwrite) and push the session expiry back."""
+    db_session.expires_at = _expiry(ttl_hours)
+    db.add(models.UploadChunk(session_id=db_session.id, photo=photo, chunk_index=chunk_index, size=size, sha256=sha256))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        db.query(models.UploadChunk).filter(
+            models.UploadChunk.session_id == db_session.id,
+            models.UploadChunk.photo == photo,
+            models.UploadChunk.chunk_index == chunk_index,
+        ).update({"size": size, "sha256": sha256}, synchronize_session=False)
+        db_session.expires_at = _expiry(ttl_hours)
+        db.commit()
+
+def claim_upload_session(db: Session, session_id: str) -> bool:
+    """Atomically move an ACTIVE session to FINALIZING; False if another request got there first."""
+    claimed = (
+        db.query(models.UploadSession)
+        .filter(models.UploadSession.id == session_id)
+        .filter(models.UploadSession.status == models.UploadSessionStatusEnum.ACTIVE)
+        .update({"status": models.UploadSessionStatusEnum.FINALIZING}, synchronize_session=False)
+    )
+    db.commit()
+    return claimed == 1
+
+def release_upload_session(db: Session, session_id: str) -> None:
+    """Return a session whose finalize failed to ACTIVE so the client can fix it and retry."""
+    db.query(models.UploadSession).filter(models.UploadSession.id == session_id).update(
+        {"status": models.UploadSessionStatusEnum.ACTIVE}, synchronize_session=False
+    )
+    db.commit()
+
+def complete_upload_session(db: Session, session_id: str, photo_group_id: int, ttl_hours: int) -> None:
+    db.query(models.UploadSession).filter(models.UploadSession.id == session_id).update(
+        {
+            "status": models.UploadSessionStatusEnum.COMPLETED,
+            "photo_group_id": photo_group_id,
+            "expires_at": _expiry(ttl_hours),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+def get_expired_upload_session_ids(db: Session, finalizing_grace_hours: int = 0, limit: int = 500) -> List[str]:
+    """
+    Expired sessions. FINALIZING ones only count once they have been expired for
+    `finalizing_grace_hours` as well, so a finalize still in progress never has its
+    rows and files deleted underneath it (only one whose process died).
+    """
+    now = datetime.now(timezone.utc)
+    rows = (
+        db.query(models.UploadSession.id)
+        .filter(models.UploadSession.expires_at <= now)
+        .filter(or_(
+            models.UploadSession.status != models.UploadSessionStatusEnum.FINALIZING,
+            models.UploadSession.expires_at <= now - timedelta(hours=finalizing_grace_hours),
+        ))
+        .limit(limit)
+        .all()
+    )
+    return [session_id for (session_id,) in rows]
+
+def delete_upload_session(db: Session, session_id: str) -> None:
+    db.query(models.UploadChunk).filter(models.UploadChunk.session_id == session_id).delete(synchronize_session=False)
+    db.query(models.UploadSession).filter(models.UploadSession.id == session_id).delete(synchronize_session=False)
+    db.commit()
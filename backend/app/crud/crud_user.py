@@ -1,15 +1,23 @@
+from typing import Optional
 from sqlalchemy.orm import Session
-from app.core.security import get_password_hash, verify_password
+from app.core.user_cache import get_user_cache
 from app.db.models import User
 from app.schemas.user import UserCreate
 import secrets
 from datetime import datetime, timedelta
+from .pagination import DEFAULT_PAGE_SIZE, Listing, Page, build_page, keyset
+
+USERS_LISTING = Listing("users", (User.id,), (int,))
+
+def get_user(db: Session, user_id: int):
+    return db.query(User).filter(User.id == user_id).first()
 
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+# Password hashes are computed by the caller, on the password hashing pool
+
+def create_user(db: Session, user: UserCreate, hashed_password: str):
     db_user = User(
         username=user.username,
         hashed_password=hashed_password,
@@ -20,14 +28,6 @@ def create_user(db: Session, user: UserCreate):
     db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, username: str, password: str) -> User | None:
-    user = get_user_by_username(db, username)
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
-        return None
-    return user
-
 def create_password_reset_token(db: Session, user: User) -> User:
     token = secrets.token_urlsafe(32)
     expiry = datetime.utcnow() + timedelta(hours=1)
@@ -46,14 +46,26 @@ def get_user_by_password_reset_token(db: Session, token: str) -> User | None:
         return None
     return user
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[User]:
+    """One page of users by id. Raises InvalidCursorError."""
+    return build_page(keyset(db.query(User), USERS_LISTING, cursor, limit).all(), USERS_LISTING, limit)
 
-def reset_password(db: Session, user: User, new_password: str) -> User:
-    user.hashed_password = get_password_hash(new_password)
+def reset_password(db: Session, user: User, hashed_password: str) -> User:
+    user.hashed_password = hashed_password
     user.reset_password_token = None
     user.reset_password_token_expiry = None
+    # Revokes every token issued with the old password
+    user.token_version = (user.token_version or 0) + 1
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    get_user_cache().invalidate(user.username)
+    return user
+
+def update_user_role(db: Session, user: User, role: str) -> User:
+    user.role = role
     db.add(user)
     db.commit()
     db.refresh(user)
+    get_user_cache().invalidate(user.username)
     return user
\ No newline at end of file
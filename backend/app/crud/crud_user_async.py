@@ -0,0 +1,12 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import User
+
+# Async counterparts of the crud_user reads, for the async authentication dependency
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    result = await db.scalars(select(User).filter(User.username == username))
+    return result.first()
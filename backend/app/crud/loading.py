@@ -0,0 +1,20 @@
+from typing import Literal, Tuple
+
+from sqlalchemy.orm import Load, QueryableAttribute, joinedload, raiseload, selectinload
+
+# How a query loads a relationship of the rows it returns:
+#   "joined"   - in the same query (LEFT OUTER JOIN); one round trip
+#   "selectin" - one extra SELECT ... WHERE id IN (...) for all rows at once;
+#                avoids repeating wide parent columns on every joined row
+#   "none"     - not loaded; touching it raises instead of issuing one query per row
+LoadProfile = Literal["joined", "selectin", "none"]
+
+
+def load_options(relationship: QueryableAttribute, profile: LoadProfile) -> Tuple[Load, ...]:
+    if profile == "joined":
+        return (joinedload(relationship),)
+    if profile == "selectin":
+        return (selectinload(relationship),)
+    if profile == "none":
+        return (raiseload(relationship),)
+    raise ValueError(f"Unknown load profile: {profile}")
@@ -0,0 +1,87 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+# Keyset pagination: a page is "the next `limit` rows after this sort key", so
+# fetching page N costs the same as page 1 (no OFFSET scanning), and rows
+# inserted meanwhile never shift or duplicate items across pages. The sort key
+# always ends with a unique column, which makes the order total and stable.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+T = TypeVar("T")
+Q = TypeVar("Q")
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or was issued by another listing."""
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(listing: str, key: Sequence[Any]) -> str:
+    """Opaque cursor for the rows after `key` in `listing`."""
+    values = [value.isoformat() if isinstance(value, date) else value for value in key]
+    payload = json.dumps([listing, values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(listing: str, cursor: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """The sort key in `cursor`, converted to `types`. Raises InvalidCursorError."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_listing, values = json.loads(payload)
+        if cursor_listing != listing or len(values) != len(types):
+            raise InvalidCursorError("Cursor does not belong to this listing")
+        return tuple(
+            date.fromisoformat(value) if value_type is date else value_type(value)
+            for value_type, value in zip(types, values)
+        )
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+
+
+@dataclass(frozen=True)
+class Listing:
+    """A paginated listing: its name (cursors of one listing are rejected by others) and sort key."""
+    name: str
+    columns: Tuple[ColumnElement, ...]
+    types: Tuple[type, ...]
+    descending: bool = False
+
+
+def keyset(query: Q, listing: Listing, cursor: Optional[str], limit: int) -> Q:
+    """
+    Add the sort key columns, the "after the cursor" filter, ORDER BY and
+    LIMIT limit + 1 to a Query or select(). Raises InvalidCursorError.
+    """
+    query = query.add_columns(*listing.columns)
+    if cursor:
+        # A row-value comparison, which an index on the key columns can seek on
+        key = tuple_(*decode_cursor(listing.name, cursor, listing.types))
+        query = query.filter(tuple_(*listing.columns) < key if listing.descending else tuple_(*listing.columns) > key)
+    order = [column.desc() for column in listing.columns] if listing.descending else list(listing.columns)
+    return query.order_by(*order).limit(limit + 1)
+
+
+def build_page(rows: Sequence[Sequence[Any]], listing: Listing, limit: int) -> Page:
+    """
+    Page from the rows of a `keyset` query, (item, *sort key) each: the extra
+    row only tells whether there is a next page.
+    """
+    items = [row[0] for row in rows[:limit]]
+    next_cursor = encode_cursor(listing.name, tuple(rows[limit - 1][1:])) if len(rows) > limit else None
+    return Page(items=items, next_cursor=next_cursor)
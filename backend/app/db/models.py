@@ -1,7 +1,7 @@
 # backend/app/db/models.py
-from sqlalchemy import (Column, Integer, String, Float, DateTime, Date, Text,
-                        ForeignKey, Enum as SQLAlchemyEnum)
-from sqlalchemy.orm import relationship
+from sqlalchemy import (Column, Integer, String, Float, DateTime, Date, Text, Boolean,
+                        ForeignKey, Index, UniqueConstraint, JSON, Enum as SQLAlchemyEnum, event, select, update)
+from sqlalchemy.orm import Session, deferred, relationship
 from sqlalchemy.sql import func
 import enum
 
@@ -13,6 +13,11 @@ class AnalysisStatusEnum(enum.Enum):
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
 
+class UploadSessionStatusEnum(enum.Enum):
+    ACTIVE = "ACTIVE"
+    FINALIZING = "FINALIZING"
+    COMPLETED = "COMPLETED"
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -22,6 +27,7 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     reset_password_token = Column(String(255), nullable=True, index=True)
     reset_password_token_expiry = Column(DateTime(timezone=True), nullable=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0") # 重置密码时递增，此前签发的令牌随之失效
     
     fields = relationship("Field", back_populates="owner")
 
@@ -32,14 +38,22 @@ class Field(Base):
     location = Column(String(255))
     area = Column(Float) # 面积（亩）
     planting_date = Column(Date)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    results_version = Column(Integer, nullable=False, default=0, server_default="0") # 田块照片组或分析结果每次写入时递增，用作结果列表的 ETag
 
     owner = relationship("User", back_populates="fields")
     photo_groups = relationship("PhotoGroup", back_populates="field", cascade="all, delete-orphan")
+    period_stats = relationship("FieldPeriodStat", back_populates="field", cascade="all, delete-orphan")
 
 class PhotoGroup(Base):
     __tablename__ = "photo_groups"
+    __table_args__ = (
+        # 单田块时间序列(结果列表、热力图、指标趋势)
+        Index("ix_photo_groups_field_id_capture_date", "field_id", "capture_date"),
+        # 时段查询(跨田块对比、区域统计)只读索引即可得到 field_id 与 id
+        Index("ix_photo_groups_capture_date_field_id_id", "capture_date", "field_id", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     field_id = Column(Integer, ForeignKey("fields.id"), nullable=False)
     capture_date = Column(Date, nullable=False)
@@ -48,12 +62,18 @@ class PhotoGroup(Base):
     side_photo_05m_path = Column(String(512), nullable=False)
     side_photo_3m_horizontal_path = Column(String(512), nullable=False)
     side_photo_3m_vertical_path = Column(String(512), nullable=False)
+    photo_checksums = Column(JSON, nullable=True) # 上传时计算的各照片 SHA-256 与字节数
+    photo_metadata = Column(JSON, nullable=True) # 上传时读取的各照片头信息(格式、尺寸、EXIF 方向、拍摄时间、GPS)
+    photo_derivatives = Column(JSON, nullable=True) # 各照片的缩略图/中图(WebP、JPEG)存储键、尺寸与字节数
+    derivatives_generated_at = Column(DateTime(timezone=True), nullable=True) # 缩略图生成时间
+    batch_id = Column(String(32), ForeignKey("upload_batches.id", ondelete="SET NULL"), nullable=True, index=True) # 批量上传批次
     analysis_status = Column(SQLAlchemyEnum(AnalysisStatusEnum), default=AnalysisStatusEnum.PENDING)
     celery_task_id = Column(String(255), index=True)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
 
     field = relationship("Field", back_populates="photo_groups")
     analysis_result = relationship("AnalysisResult", back_populates="photo_group", uselist=False, cascade="all, delete-orphan")
+    stage_results = relationship("AnalysisStageResult", back_populates="photo_group", cascade="all, delete-orphan")
 
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
@@ -77,7 +97,138 @@ class AnalysisResult(Base):
     gemini_suggestions = Column(Text, nullable=True) # 农事建议
     pest_risk = Column(String(100), nullable=True) # 病虫害风险
     leaf_color_health = Column(String(100), nullable=True) # 叶色健康状况
+    seedlings_per_mu = Column(Float, nullable=True) # Gemini估算亩基本苗数
+    estimated_row_spacing_cm = Column(Float, nullable=True) # 估算行距 (cm)
+    estimated_plant_spacing_cm = Column(Float, nullable=True) # 估算株距 (cm)
+
+    # 无人机照片分块网格(覆盖度、ExG、G/R)，base64 编码的 float32 .npy 数组，见 app/analysis/cell_grid.py；
+    # 体积较大，默认不随结果加载
+    cell_grid = deferred(Column(Text, nullable=True))
+
+    # 预览阶段（降采样图像）写入的临时结果为True，全分辨率分析完成后为False
+    is_provisional = Column(Boolean, nullable=False, default=False, server_default="false")
 
     analysis_time = Column(DateTime(timezone=True), server_default=func.now())
 
     photo_group = relationship("PhotoGroup", back_populates="analysis_result")
+
+
+class FieldPeriodStat(Base):
+    """田块每旬（每月1-10、11-20、21日-月末）各指标的汇总，随分析结果写入同步更新"""
+    __tablename__ = "field_period_stats"
+    __table_args__ = (
+        # 跨田块对比：某旬某指标下各田块的汇总
+        Index("ix_field_period_stats_period_start_indicator_field_id", "period_start", "indicator", "field_id"),
+    )
+    field_id = Column(Integer, ForeignKey("fields.id", ondelete="CASCADE"), primary_key=True)
+    period_start = Column(Date, primary_key=True) # 旬的第一天
+    indicator = Column(String(50), primary_key=True) # AnalysisResult 的数值指标列名
+    value_count = Column(Integer, nullable=False) # 该旬内该指标非空的结果数
+    value_sum = Column(Float, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now()) # 最近一次重新汇总的时间
+
+    field = relationship("Field", back_populates="period_stats")
+
+
+class AnalysisStageResult(Base):
+    """分析流水线各阶段的检查点结果，重试时只重跑失败的阶段"""
+    __tablename__ = "analysis_stage_results"
+    __table_args__ = (UniqueConstraint("photo_group_id", "stage", name="uq_stage_result_group_stage"),)
+    id = Column(Integer, primary_key=True, index=True)
+    photo_group_id = Column(Integer, ForeignKey("photo_groups.id"), nullable=False, index=True)
+    stage = Column(String(50), nullable=False)
+    result_json = Column(Text, nullable=False)
+    completed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    photo_group = relationship("PhotoGroup", back_populates="stage_results")
+
+class StepResultCache(Base):
+    """分析步骤结果缓存，键为图像内容哈希 + 算法/提示词版本"""
+    __tablename__ = "step_result_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False) # SHA-256 十六进制
+    step = Column(String(50), nullable=False)
+    result_json = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class UploadSession(Base):
+    """可续传的分块上传会话，四张照片全部收齐后再创建 PhotoGroup"""
+    __tablename__ = "upload_sessions"
+    id = Column(String(32), primary_key=True) # uuid4 十六进制
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    field_id = Column(Integer, ForeignKey("fields.id", ondelete="CASCADE"), nullable=False)
+    capture_date = Column(Date, nullable=False)
+    rice_variety = Column(String(100))
+    files = Column(JSON, nullable=False) # 各照片声明的文件名、字节数与可选 SHA-256
+    chunk_size = Column(Integer, nullable=False) # 分块字节数（最后一块可更小）
+    status = Column(SQLAlchemyEnum(UploadSessionStatusEnum), default=UploadSessionStatusEnum.ACTIVE, nullable=False)
+    photo_group_id = Column(Integer, ForeignKey("photo_groups.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True) # 每收到一块顺延
+
+    chunks = relationship("UploadChunk", back_populates="session", cascade="all, delete-orphan")
+
+class UploadChunk(Base):
+    """上传会话中已校验并写入的分块"""
+    __tablename__ = "upload_chunks"
+    __table_args__ = (UniqueConstraint("session_id", "photo", "chunk_index", name="uq_upload_chunk"),)
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    photo = Column(String(50), nullable=False) # drone_photo / side_photo_05m / ...
+    chunk_index = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    session = relationship("UploadSession", back_populates="chunks")
+
+class StoredBlob(Base):
+    """内容寻址存储中的照片文件，按 SHA-256 去重并记录引用计数"""
+    __tablename__ = "stored_blobs"
+    sha256 = Column(String(64), primary_key=True)
+    key = Column(String(255), nullable=False) # 存储键，如 blobs/ab/cd/<sha256>.jpg
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0) # 引用该文件的 *_photo_path 数量
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class UploadBatch(Base):
+    """一次批量（压缩包）上传创建的照片组批次，用于跟踪整体分析进度"""
+    __tablename__ = "upload_batches"
+    id = Column(String(32), primary_key=True) # uuid4 十六进制
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    group_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    photo_groups = relationship("PhotoGroup")
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_field_results_versions(session, flush_context, instances):
+    """
+    Increment Field.results_version of every field whose photo groups or
+    analysis results are added, changed or deleted by this flush, in the same
+    transaction, so readers validate a field's results with one primary key
+    lookup. Registered on Session, it also covers the async sessions.
+    """
+    field_ids, photo_group_ids = set(), set()
+    changed = [instance for instance in session.dirty if session.is_modified(instance)]
+    for instance in (*session.new, *changed, *session.deleted):
+        if isinstance(instance, PhotoGroup) and instance.field_id is not None:
+            field_ids.add(instance.field_id)
+        elif isinstance(instance, AnalysisResult) and instance.photo_group_id is not None:
+            photo_group_ids.add(instance.photo_group_id)
+    if photo_group_ids:
+        field_ids.update(session.execute(
+            select(PhotoGroup.field_id).where(PhotoGroup.id.in_(photo_group_ids))
+        ).scalars())
+    if field_ids:
+        session.execute(
+            update(Field).where(Field.id.in_(field_ids)).values(results_version=Field.results_version + 1),
+            execution_options={"synchronize_session": False},
+        )
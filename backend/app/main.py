@@ -1,16 +1,24 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.api.v1 import endpoints
-from app.db import base
+from app.core.password_hashing import get_password_hasher
+
+# The schema is managed by Alembic migrations (backend/alembic), not created on import:
+# run `alembic upgrade head` from backend/ before starting the app
 
-# This line creates the database tables based on the models
-# For schema updates, we use create_all with checkfirst=True
-# In a production environment, you would typically use a migration tool like Alembic
-base.Base.metadata.create_all(bind=base.engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the bcrypt workers before the first login rather than during it
+    get_password_hasher().warm_up()
+    yield
+    get_password_hasher().shutdown()
 
 app = FastAPI(
     title="江苏泰兴水稻长势智能分析平台",
     description="API for the Rice Growth Intelligent Analysis Platform.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 @app.get("/", tags=["Root"])
@@ -0,0 +1,4 @@
+from . import analysis_result, photogroup
+
+# PhotoGroup nests AnalysisResultInDB, which is defined after it; resolve the forward reference
+photogroup.PhotoGroup.model_rebuild(_types_namespace={"AnalysisResultInDB": analysis_result.AnalysisResultInDB})
@@ -1,11 +1,9 @@
 from __future__ import annotations
-from typing import Optional, TYPE_CHECKING
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, computed_field
 from datetime import date
 
-# 为了避免循环导入，我们只在类型检查时导入
-if TYPE_CHECKING:
-    from .photogroup import PhotoGroup
+from .photogroup import PhotoGroupInDBBase
 
 class AnalysisResultBase(BaseModel):
     coverage: Optional[float] = None
@@ -31,12 +29,39 @@ class AnalysisResultBase(BaseModel):
 class AnalysisResultCreate(AnalysisResultBase):
     pass
 
-class AnalysisResult(AnalysisResultBase):
+# Result as nested in a PhotoGroup response (without its photo group, which would loop back)
+class AnalysisResultInDB(AnalysisResultBase):
     id: int
     photo_group_id: int
-    # 使用字符串类型声明避免循环导入
-    photo_group: Optional['PhotoGroup'] = None
+    # 预览阶段的临时结果，全分辨率分析完成后会被覆盖
+    is_provisional: bool = False
+
+    @computed_field
+    @property
+    def provisional_fields(self) -> List[str]:
+        """Indicators whose current value comes from the reduced-resolution preview."""
+        if not self.is_provisional:
+            return []
+        return [name for name in AnalysisResultBase.model_fields if getattr(self, name) is not None]
+
+    class Config:
+        from_attributes = True
+
+class AnalysisResult(AnalysisResultInDB):
+    photo_group: Optional[PhotoGroupInDBBase] = None
 
     class Config:
         from_attributes = True
 
+
+# One indicator of one field summarized over a dekad (days 1-10, 11-20 or 21 to month end)
+class FieldPeriodStat(BaseModel):
+    field_id: int
+    field_name: str
+    indicator: str
+    period_start: date
+    period_end: date
+    count: int
+    mean: float
+    min: float
+    max: float
@@ -6,7 +6,7 @@ from app.db.models import AnalysisStatusEnum
 
 # 为了避免循环导入，我们只在类型检查时导入
 if TYPE_CHECKING:
-    from .analysis_result import AnalysisResult
+    from .analysis_result import AnalysisResultInDB
 
 class PhotoGroupBase(BaseModel):
     capture_date: date
@@ -24,13 +24,15 @@ class PhotoGroupInDBBase(PhotoGroupBase):
     side_photo_3m_vertical_path: str
     analysis_status: AnalysisStatusEnum
     celery_task_id: Optional[str] = None
+    photo_metadata: Optional[dict] = None
+    photo_derivatives: Optional[dict] = None
 
     class Config:
         from_attributes = True
 
 class PhotoGroup(PhotoGroupInDBBase):
     # 使用字符串类型声明避免循环导入
-    analysis_result: Optional['AnalysisResult'] = None
+    analysis_result: Optional['AnalysisResultInDB'] = None
 
     class Config:
         from_attributes = True
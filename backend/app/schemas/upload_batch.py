@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from typing import Dict, List, Optional
+from datetime import date, datetime
+from pydantic import BaseModel, TypeAdapter, field_validator
+
+from app.core.uploads import archive_member_name
+from app.db.models import AnalysisStatusEnum
+
+# Accepted manifest names at the archive root
+MANIFEST_NAMES = ("manifest.json", "manifest.csv")
+MAX_MANIFEST_BYTES = 1024 * 1024
+
+# One photo group of a bulk upload; photo fields name files inside the archive
+class BulkManifestEntry(BaseModel):
+    field_id: int
+    capture_date: date
+    rice_variety: Optional[str] = None
+    drone_photo: str
+    side_photo_05m: str
+    side_photo_3m_horizontal: str
+    side_photo_3m_vertical: str
+
+    @field_validator("drone_photo", "side_photo_05m", "side_photo_3m_horizontal", "side_photo_3m_vertical")
+    def normalize_archive_path(cls, v):
+        name = archive_member_name(v)
+        if name is None:
+            raise ValueError(f"Invalid archive path: {v}")
+        return name
+
+def parse_manifest(name: str, content: bytes) -> List[BulkManifestEntry]:
+    """
+    Parse manifest.json (a list of entries, or {"photo_groups": [...]}) or
+    manifest.csv (a header row with the entry field names). Raises ValueError.
+    """
+    if len(content) > MAX_MANIFEST_BYTES:
+        raise ValueError(f"Manifest exceeds {MAX_MANIFEST_BYTES} bytes")
+    if name.endswith(".json"):
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("photo_groups")
+    else:
+        data = [
+            {key: value for key, value in row.items() if value not in (None, "")}
+            for row in csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+        ]
+    if not isinstance(data, list):
+        raise ValueError("Manifest must contain a list of photo groups")
+    return TypeAdapter(List[BulkManifestEntry]).validate_python(data)
+
+class BatchPhotoGroup(BaseModel):
+    id: int
+    field_id: int
+    capture_date: date
+    analysis_status: AnalysisStatusEnum
+    celery_task_id: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class UploadBatch(BaseModel):
+    id: str
+    group_count: int
+    created_at: Optional[datetime] = None
+    status_counts: Dict[str, int]
+    photo_groups: List[BatchPhotoGroup]
@@ -0,0 +1,54 @@
+from typing import Dict, List, Optional
+from datetime import date, datetime
+from pydantic import BaseModel, Field, field_validator
+
+from app.core.uploads import PHOTO_NAMES
+from app.db.models import UploadSessionStatusEnum
+
+# Bounds on the chunk size a client may ask for
+MIN_CHUNK_BYTES = 256 * 1024
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Declared when the session is created; `sha256` is checked again on finalize
+class UploadFileDeclaration(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$")
+
+class UploadSessionCreate(BaseModel):
+    field_id: int
+    capture_date: date
+    rice_variety: Optional[str] = None
+    chunk_size: Optional[int] = Field(None, ge=MIN_CHUNK_BYTES, le=MAX_CHUNK_BYTES)
+    files: Dict[str, UploadFileDeclaration]
+
+    @field_validator("files")
+    def validate_files(cls, v):
+        if set(v) != set(PHOTO_NAMES):
+            raise ValueError(f"files must declare exactly: {', '.join(PHOTO_NAMES)}")
+        return v
+
+# Progress of one photo; clients resume by sending the chunks not yet received
+class UploadFileStatus(BaseModel):
+    filename: str
+    size: int
+    chunk_count: int
+    received_chunks: List[int]
+    received_bytes: int
+
+class UploadSession(BaseModel):
+    id: str
+    field_id: int
+    capture_date: date
+    rice_variety: Optional[str] = None
+    chunk_size: int
+    status: UploadSessionStatusEnum
+    photo_group_id: Optional[int] = None
+    expires_at: datetime
+    files: Dict[str, UploadFileStatus]
+
+class UploadChunkReceipt(BaseModel):
+    photo: str
+    chunk_index: int
+    size: int
+    sha256: str
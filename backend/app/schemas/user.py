@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 # Shared properties
@@ -11,6 +11,10 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+# Role change by an admin
+class UserRoleUpdate(BaseModel):
+    role: Literal["user", "admin"]
+
 # Properties to return to client
 class User(UserBase):
     id: int
@@ -0,0 +1,110 @@
+"""
+Move photos stored under their legacy upload paths (uploads/drone_<timestamp>_<id>_<name>)
+into the content-addressed blob store configured by STORAGE_BACKEND.
+
+For every photo group whose *_photo_path columns still hold file paths, each
+file is hashed, stored as a blob (identical files are stored once and
+reference counted) and the column is rewritten to the blob key. Each photo
+group is committed separately, so the tool can be interrupted and re-run.
+
+Usage (from backend/, with the backend .env variables set):
+    python -m app.scripts.migrate_photo_storage [--dry-run] [--delete-originals] [--batch-size 200]
+"""
+import argparse
+import os
+import shutil
+
+from sqlalchemy import or_
+
+from app.core import storage, uploads
+from app.db import base, models
+
+
+def _legacy_filter():
+    return or_(*(
+        ~getattr(models.PhotoGroup, f"{name}_path").startswith(storage.BLOB_KEY_PREFIX)
+        for name in uploads.PHOTO_NAMES
+    ))
+
+
+def _stage_copy(path: str) -> str:
+    """Copy (hard link when possible) a legacy file into the staging area; store_blob consumes the copy."""
+    staging_path = uploads.new_staging_path()
+    os.makedirs(os.path.dirname(staging_path), exist_ok=True)
+    try:
+        os.link(path, staging_path)
+    except OSError:
+        shutil.copy2(path, staging_path)
+    return staging_path
+
+
+def migrate(dry_run: bool = False, delete_originals: bool = False, batch_size: int = 200) -> dict:
+    db = next(base.get_db())
+    stats = {"photo_groups": 0, "files": 0, "missing": 0, "bytes": 0, "deleted_originals": 0}
+    migrated_paths = set()
+    try:
+        last_id = 0
+        while True:
+            photo_groups = (
+                db.query(models.PhotoGroup)
+                .filter(_legacy_filter(), models.PhotoGroup.id > last_id)
+                .order_by(models.PhotoGroup.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not photo_groups:
+                break
+            for photo_group in photo_groups:
+                last_id = photo_group.id
+                checksums = dict(photo_group.photo_checksums or {})
+                keys = {}
+                for name in uploads.PHOTO_NAMES:
+                    path = getattr(photo_group, f"{name}_path")
+                    if storage.is_blob_key(path):
+                        continue
+                    if not os.path.exists(path):
+                        print(f"PhotoGroup {photo_group.id}: {name} missing at {path}, left unchanged")
+                        stats["missing"] += 1
+                        continue
+                    stored = uploads.hash_file(path)
+                    stats["files"] += 1
+                    stats["bytes"] += stored.size
+                    if dry_run:
+                        continue
+                    keys[name] = storage.store_blob(db, _stage_copy(path), stored.sha256, stored.size, path)
+                    checksums[name] = {"sha256": stored.sha256, "size": stored.size}
+                    migrated_paths.add(path)
+
+                if keys:
+                    for name, key in keys.items():
+                        setattr(photo_group, f"{name}_path", key)
+                    photo_group.photo_checksums = checksums
+                    db.commit()
+                    stats["photo_groups"] += 1
+            print(f"Processed photo groups up to id {last_id}: {stats}")
+
+        if delete_originals and not dry_run:
+            for path in migrated_paths:
+                still_referenced = db.query(models.PhotoGroup.id).filter(or_(*(
+                    getattr(models.PhotoGroup, f"{name}_path") == path for name in uploads.PHOTO_NAMES
+                ))).first()
+                if still_referenced is None and os.path.exists(path):
+                    os.remove(path)
+                    stats["deleted_originals"] += 1
+    finally:
+        db.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be migrated")
+    parser.add_argument("--delete-originals", action="store_true", help="remove legacy files once no photo group references them")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    stats = migrate(dry_run=args.dry_run, delete_originals=args.delete_originals, batch_size=args.batch_size)
+    print(f"Done ({'dry run' if args.dry_run else storage.get_storage().__class__.__name__}): {stats}")
+
+
+if __name__ == "__main__":
+    main()
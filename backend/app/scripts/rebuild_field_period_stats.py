@@ -0,0 +1,48 @@
+"""
+Recompute the per-field dekad rollup (field_period_stats) from the analysis
+results. Results written through crud_analysis_result keep it up to date;
+run this once after migration 0005 and after loading results by other means.
+Each batch of fields is committed separately, so the tool can be interrupted
+and re-run.
+
+Usage (from backend/, with the backend .env variables set):
+    python -m app.scripts.rebuild_field_period_stats [--field-id 12] [--batch-size 100]
+"""
+import argparse
+
+from app.crud import crud_analysis_result
+from app.db import base, models
+
+
+def rebuild(field_id: int = None, batch_size: int = 100) -> dict:
+    db = next(base.get_db())
+    stats = {"fields": 0, "rows": 0}
+    try:
+        last_id = 0
+        while True:
+            query = db.query(models.Field.id).filter(models.Field.id > last_id)
+            if field_id is not None:
+                query = query.filter(models.Field.id == field_id)
+            field_ids = [row.id for row in query.order_by(models.Field.id).limit(batch_size)]
+            if not field_ids:
+                break
+            stats["rows"] += crud_analysis_result.rebuild_field_period_stats(db, field_ids)
+            stats["fields"] += len(field_ids)
+            last_id = field_ids[-1]
+            print(f"Rebuilt the rollup of {stats['fields']} fields ({stats['rows']} rows)")
+    finally:
+        db.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--field-id", type=int, help="only rebuild this field")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    stats = rebuild(field_id=args.field_id, batch_size=args.batch_size)
+    print(f"Done: {stats['fields']} fields, {stats['rows']} rollup rows")
+
+
+if __name__ == "__main__":
+    main()
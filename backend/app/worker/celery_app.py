@@ -1,4 +1,10 @@
+import os
+from typing import Optional
+
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
+from kombu import Queue
+
 from app.core.config import settings
 
 celery_app = Celery(
@@ -7,3 +13,57 @@ celery_app = Celery(
     backend=settings.CELERY_RESULT_BACKEND,
     include=["app.worker.tasks"],
 )
+
+# OpenCV stages go to a prefork pool sized to the cores; the Gemini call and the
+# light orchestration/merge tasks go to a high-concurrency thread pool.
+celery_app.conf.update(
+    task_queues=(
+        Queue(settings.CELERY_CPU_QUEUE),
+        Queue(settings.CELERY_IO_QUEUE),
+    ),
+    task_default_queue=settings.CELERY_IO_QUEUE,
+    task_routes={
+        "tasks.run_preview_stage": {"queue": settings.CELERY_CPU_QUEUE},
+        "tasks.run_cv_stages": {"queue": settings.CELERY_CPU_QUEUE},
+        "tasks.generate_derivatives": {"queue": settings.CELERY_CPU_QUEUE},
+        "tasks.run_gemini_stage": {"queue": settings.CELERY_IO_QUEUE},
+        "tasks.run_analysis": {"queue": settings.CELERY_IO_QUEUE},
+        "tasks.merge_analysis": {"queue": settings.CELERY_IO_QUEUE},
+        "tasks.cleanup_upload_sessions": {"queue": settings.CELERY_IO_QUEUE},
+    },
+    beat_schedule={
+        "cleanup-upload-sessions": {
+            "task": "tasks.cleanup_upload_sessions",
+            "schedule": 3600.0,
+        },
+    },
+)
+
+# Threads OpenCV may use in each pool process, decided once the pool size is known
+_opencv_threads: Optional[int] = None
+
+
+@worker_init.connect
+def plan_opencv_threads(sender, **kwargs):
+    """
+    Split the cores between pool processes so `concurrency` processes running
+    OpenCV in parallel don't oversubscribe the CPU. Thread/gevent pools run no
+    heavy OpenCV work and get a single thread.
+    """
+    global _opencv_threads
+    if settings.OPENCV_NUM_THREADS is not None:
+        _opencv_threads = settings.OPENCV_NUM_THREADS
+    elif "prefork" in sender.pool_cls.__module__:
+        _opencv_threads = max(1, (os.cpu_count() or 1) // max(1, sender.concurrency))
+    else:
+        _opencv_threads = 1
+    _apply_opencv_threads()
+
+
+@worker_process_init.connect
+def _apply_opencv_threads(**kwargs):
+    # Runs in each forked pool process; OpenCV's thread pool must be configured after fork
+    if _opencv_threads is not None:
+        import cv2
+        cv2.setNumThreads(_opencv_threads)
+        print(f"OpenCV using {_opencv_threads} thread(s) in pid {os.getpid()}")
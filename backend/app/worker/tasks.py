@@ -1,11 +1,96 @@
+from celery import Task, chord, group
+
 from app.worker.celery_app import celery_app
-from app.analysis.main_processor import process_photo_group
+from app.analysis import main_processor
+from app.core import uploads
+from app.core.config import settings
+from app.crud import crud_upload_session
+from app.db import base
+
+
+class AnalysisStageTask(Task):
+    """Base class for analysis stages: marks the photo group FAILED once a stage gives up."""
 
-@celery_app.task(name="tasks.run_analysis", autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 300})
-def run_analysis(photo_group_id: int):
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        photo_group_id = args[0] if args else kwargs.get("photo_group_id")
+        if photo_group_id is not None:
+            main_processor.mark_analysis_failed(photo_group_id)
+
+
+@celery_app.task(name="tasks.run_analysis", bind=True)
+def run_analysis(self, photo_group_id: int):
     """
     Celery task to run the full image analysis pipeline for a photo group.
-    This task will automatically retry on failure.
+
+    The pipeline is a DAG of independent subtasks: the preview, the OpenCV
+    stages (batched by photo, see main_processor.CV_SUBTASKS) and the Gemini
+    call run in parallel and are joined by a chord whose callback merges the
+    checkpointed stage results. Each subtask retries on its own, so a Gemini
+    timeout never reruns the OpenCV work. This task replaces
+    itself with the chord, so its id reports the state of the whole DAG.
+    Thumbnails and previews are rendered by a separate, unjoined task.
+    """
+    if not main_processor.start_analysis(photo_group_id):
+        return {"status": "not_found", "photo_group_id": photo_group_id}
+
+    # Web renditions are independent of the analysis; their failure never fails it
+    generate_derivatives.delay(photo_group_id)
+
+    stages = group(
+        run_preview_stage.si(photo_group_id),
+        *(run_cv_stages.si(photo_group_id, list(stages)) for stages in main_processor.CV_SUBTASKS),
+        run_gemini_stage.si(photo_group_id),
+    )
+    return self.replace(chord(stages, merge_analysis.si(photo_group_id)))
+
+
+@celery_app.task(name="tasks.run_preview_stage")
+def run_preview_stage(photo_group_id: int):
+    main_processor.run_preview_stage(photo_group_id)
+    return {"stage": "preview", "photo_group_id": photo_group_id}
+
+
+@celery_app.task(name="tasks.run_cv_stages", base=AnalysisStageTask, autoretry_for=(Exception,), dont_autoretry_for=(ValueError,), retry_kwargs={'max_retries': 3, 'countdown': 300})
+def run_cv_stages(photo_group_id: int, stages: list):
+    main_processor.run_cv_stages(photo_group_id, stages)
+    return {"stages": stages, "photo_group_id": photo_group_id}
+
+
+@celery_app.task(name="tasks.run_gemini_stage", base=AnalysisStageTask, bind=True, max_retries=3)
+def run_gemini_stage(self, photo_group_id: int):
+    """
+    Gemini stage. Failed calls are retried with exponential backoff; on the last
+    attempt the fallback values are accepted so the merge can still complete.
     """
-    process_photo_group(photo_group_id)
+    last_attempt = self.request.retries >= self.max_retries
+    try:
+        main_processor.run_analysis_stage(photo_group_id, "gemini", allow_fallback=last_attempt)
+    except RuntimeError as exc:
+        raise self.retry(exc=exc, countdown=30 * 2 ** self.request.retries)
+    return {"stage": "gemini", "photo_group_id": photo_group_id}
+
+
+@celery_app.task(name="tasks.merge_analysis", base=AnalysisStageTask)
+def merge_analysis(photo_group_id: int):
+    main_processor.merge_analysis_stages(photo_group_id)
     return {"status": "complete", "photo_group_id": photo_group_id}
+
+
+@celery_app.task(name="tasks.generate_derivatives", autoretry_for=(Exception,), dont_autoretry_for=(ValueError,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+def generate_derivatives(photo_group_id: int):
+    main_processor.generate_derivatives(photo_group_id)
+    return {"stage": "derivatives", "photo_group_id": photo_group_id}
+
+
+@celery_app.task(name="tasks.cleanup_upload_sessions")
+def cleanup_upload_sessions():
+    """Periodic task (celery beat): delete expired upload sessions and their partial files."""
+    db = next(base.get_db())
+    try:
+        session_ids = crud_upload_session.get_expired_upload_session_ids(db, settings.UPLOAD_SESSION_FINALIZE_GRACE_HOURS)
+        for session_id in session_ids:
+            uploads.remove_session_files(session_id)
+            crud_upload_session.delete_upload_session(db, session_id)
+    finally:
+        db.close()
+    return {"removed_sessions": len(session_ids)}
@@ -0,0 +1,109 @@
+"""
+Benchmark analyze_drone_view metrics: legacy full-frame implementation vs the
+strip accumulator in app.analysis.steps_analyze.
+
+Each case runs in a fresh child process so that peak RSS (ru_maxrss) reflects
+only that case. The reported "extra" RSS is the peak minus the RSS measured
+right after the synthetic input image was allocated.
+
+Usage (from backend/, with the backend .env variables set since app settings are loaded):
+    python -m benchmarks.bench_drone_view [--grid 5 --grid 50 --grid 200]
+"""
+import argparse
+import multiprocessing as mp
+import resource
+import time
+
+import cv2
+import numpy as np
+
+SIZES = {
+    "4K (3840x2160)": (2160, 3840),
+    "20 MP (5472x3648)": (3648, 5472),
+    "40 MP (7952x5304)": (5304, 7952),
+}
+
+
+def legacy_drone_view(image: np.ndarray, grid_rows: int, grid_cols: int) -> dict:
+    """Copy of the pre-rewrite implementation (uint8 ExG, Python grid loop)."""
+    b, g, r = cv2.split(image)
+    ExG = 2 * g - r - b
+    _, mask = cv2.threshold(ExG, 50, 255, cv2.THRESH_BINARY)
+    total_pixels = image.shape[0] * image.shape[1]
+    coverage_percentage = cv2.countNonZero(mask) / total_pixels * 100
+    green_channel = image[:, :, 1].astype(np.float32) + 1e-6
+    red_channel = image[:, :, 2].astype(np.float32) + 1e-6
+    gr_ratio = np.mean(green_channel / red_channel)
+    rows, cols = mask.shape
+    cell_height = rows // grid_rows
+    cell_width = cols // grid_cols
+    coverage_values = []
+    for i in range(grid_rows):
+        for j in range(grid_cols):
+            cell_mask = mask[i * cell_height:(i + 1) * cell_height, j * cell_width:(j + 1) * cell_width]
+            cell_total = cell_mask.shape[0] * cell_mask.shape[1]
+            coverage_values.append(cv2.countNonZero(cell_mask) / cell_total * 100 if cell_total > 0 else 0)
+    coverage_values = np.array(coverage_values)
+    mean_coverage = np.mean(coverage_values)
+    uniformity_index = np.std(coverage_values) / mean_coverage * 100 if mean_coverage > 0 else 0
+    return {
+        "coverage": round(coverage_percentage, 2),
+        "canopy_color_index": round(float(gr_ratio), 2),
+        "uniformity_index": round(float(uniformity_index), 2),
+    }
+
+
+def vectorized_drone_view(image: np.ndarray, grid_rows: int, grid_cols: int) -> dict:
+    from app.analysis.steps_analyze import drone_view_metrics
+    return drone_view_metrics(image, grid_rows, grid_cols).result()
+
+
+IMPLEMENTATIONS = {"legacy": legacy_drone_view, "vectorized": vectorized_drone_view}
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_case(impl_name, shape, grid, repeats, queue):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(*shape, 3), dtype=np.uint8)
+    # Warm up imports so they don't count towards the measured peak
+    IMPLEMENTATIONS[impl_name](image[:64, :64], 2, 2)
+    baseline = _rss_mb()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        IMPLEMENTATIONS[impl_name](image, grid, grid)
+        timings.append(time.perf_counter() - started)
+    queue.put((min(timings) * 1000, _rss_mb() - baseline))
+
+
+def run_case(impl_name, shape, grid, repeats):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_case, args=(impl_name, shape, grid, repeats, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=int, action="append", help="grid size per side (repeatable)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    grids = args.grid or [5, 50, 200]
+
+    print(f"{'input':<20} {'grid':>5} {'impl':<11} {'latency ms':>11} {'extra RSS MB':>13}")
+    for label, shape in SIZES.items():
+        for grid in grids:
+            for impl_name in IMPLEMENTATIONS:
+                latency, extra_rss = run_case(impl_name, shape, grid, args.repeats)
+                print(f"{label:<20} {grid:>5} {impl_name:<11} {latency:>11.1f} {extra_rss:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
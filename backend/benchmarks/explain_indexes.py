@@ -0,0 +1,175 @@
+"""
+Check with EXPLAIN that the time-series reads are served by the indexes of
+migrations 0003 and 0005 instead of full table scans. The schema is built by running
+the Alembic migrations (not create_all), so this also checks that the
+migrations produce the indexes the models declare.
+
+By default a throwaway SQLite database is used (EXPLAIN QUERY PLAN, after
+ANALYZE). Pass --database-url with an empty scratch PostgreSQL database to
+check the production planner; tables are created there and left in place.
+Exits with status 1 if a query scans a guarded table or uses none of the
+expected indexes.
+
+Usage (from backend/, with the backend .env variables set since app settings are loaded):
+    python -m benchmarks.explain_indexes [--database-url postgresql://...] [--owners 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import Session
+
+from app.crud import crud_analysis_result, crud_field
+from app.db import models
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIELDS_PER_OWNER = 10
+DAYS = 60
+START = date(2026, 5, 1)
+PERIOD = (START + timedelta(days=20), START + timedelta(days=29))
+
+INDEX_PERIOD = {"ix_fields_owner_id", "ix_photo_groups_field_id_capture_date", "ix_photo_groups_capture_date_field_id_id"}
+INDEX_FIELD = {"ix_photo_groups_field_id_capture_date"}
+INDEX_OWNER = {"ix_fields_owner_id"}
+INDEX_ROLLUP = {"ix_field_period_stats_period_start_indicator_field_id"}
+# Primary key lookups: "INTEGER PRIMARY KEY" in SQLite plans, <table>_pkey in PostgreSQL
+INDEX_PRIMARY_KEY = {"INTEGER PRIMARY KEY", "_pkey"}
+
+
+def migrate(database_url: str):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+    command.upgrade(config, "head")
+
+
+def seed(engine, owners: int) -> dict:
+    with engine.begin() as connection:
+        connection.execute(insert(models.User), [
+            {"id": i + 1, "username": f"explain-{i}", "hashed_password": "x"} for i in range(owners)
+        ])
+        connection.execute(insert(models.Field), [
+            {"id": i + 1, "name": f"field {i}", "owner_id": i // FIELDS_PER_OWNER + 1}
+            for i in range(owners * FIELDS_PER_OWNER)
+        ])
+        photo_groups, results = [], []
+        for field_id in range(1, owners * FIELDS_PER_OWNER + 1):
+            for day in range(DAYS):
+                group_id = len(photo_groups) + 1
+                photo_groups.append({
+                    "id": group_id,
+                    "field_id": field_id,
+                    "capture_date": START + timedelta(days=day),
+                    "drone_photo_path": "d.jpg",
+                    "side_photo_05m_path": "s.jpg",
+                    "side_photo_3m_horizontal_path": "h.jpg",
+                    "side_photo_3m_vertical_path": "v.jpg",
+                    "analysis_status": models.AnalysisStatusEnum.COMPLETED,
+                })
+                results.append({"id": group_id, "photo_group_id": group_id, "coverage": 40.0 + day % 50})
+        connection.execute(insert(models.PhotoGroup), photo_groups)
+        connection.execute(insert(models.AnalysisResult), results)
+    with Session(engine) as db:
+        crud_analysis_result.rebuild_field_period_stats(db, range(1, owners * FIELDS_PER_OWNER + 1))
+    with engine.begin() as connection:
+        # Fresh statistics, or the planner may prefer scans on what it thinks are empty tables
+        connection.execute(text("ANALYZE"))
+    return {"owner_id": owners // 2, "field_id": owners * FIELDS_PER_OWNER // 2}
+
+
+def captured_statement(engine, run, position: int) -> tuple:
+    """The SQL statement (and its parameters) `run(session)` sends to the database at `position`."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with Session(engine) as db:
+            run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements[position]
+
+
+def explain(engine, statement: str, parameters) -> list:
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in rows]
+        # Small scratch tables may still look cheaper to scan; only a missing index forces a Seq Scan now
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+
+
+def plan_problems(plan: list, dialect: str, indexes: set, guarded_tables: tuple) -> list:
+    problems = []
+    plan_text = "\n".join(plan)
+    if not any(index in plan_text for index in indexes):
+        problems.append(f"none of {sorted(indexes)} used")
+    for line in plan:
+        for table in guarded_tables:
+            if dialect == "sqlite":
+                # SCAN (even USING COVERING INDEX) reads every row; SEARCH seeks into an index
+                full_scan = line.startswith("SCAN") and line.split()[1] == table
+            else:
+                full_scan = f"Seq Scan on {table} " in f"{line.strip()} "
+            if full_scan:
+                problems.append(f"full scan of {table}: {line.strip()}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="Empty scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--owners", type=int, default=20, help=f"Users to seed, each with {FIELDS_PER_OWNER} fields of {DAYS} days")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='explain_indexes_')}/explain.db"
+    migrate(database_url)
+    engine = create_engine(database_url)
+    ids = seed(engine, args.owners)
+    owner_id, field_id = ids["owner_id"], ids["field_id"]
+
+    # (name, expected indexes, tables that must not be scanned, position of the query among those run, reader)
+    checks = [
+        ("fields of an owner", INDEX_OWNER, ("fields",), 0,
+         lambda db: crud_field.get_fields_by_owner(db, owner_id)),
+        ("results of an owner in a period", INDEX_PERIOD, ("fields", "photo_groups"), 0,
+         lambda db: crud_analysis_result.get_analysis_results_for_period(db, owner_id, *PERIOD, load="none")),
+        ("indicator values of a field", INDEX_FIELD, ("photo_groups",), 0,
+         lambda db: crud_analysis_result.get_indicator_values_for_field(db, field_id, "coverage", *PERIOD)),
+        ("rollup of an owner's fields for a dekad", INDEX_ROLLUP, ("field_period_stats",), 0,
+         lambda db: crud_analysis_result.get_field_period_stats(db, owner_id, PERIOD[0], "coverage")),
+        # get_field_results loads the field by primary key first
+        ("photo groups of a field by date", INDEX_FIELD, ("photo_groups",), 1,
+         lambda db: crud_field.get_field_results(db, field_id, owner_id, load="none")),
+        # Conditional requests: the whole cost of a 304
+        ("results version of a field", INDEX_PRIMARY_KEY, ("fields",), 0,
+         lambda db: crud_field.get_field_results_version(db, field_id, owner_id)),
+        ("validators of a result", INDEX_PRIMARY_KEY, ("analysis_results", "photo_groups", "fields"), 0,
+         lambda db: crud_analysis_result.get_result_validators(db, field_id, owner_id)),
+    ]
+
+    failed = False
+    for name, indexes, guarded_tables, position, run in checks:
+        statement, parameters = captured_statement(engine, run, position)
+        plan = explain(engine, statement, parameters)
+        problems = plan_problems(plan, engine.dialect.name, indexes, guarded_tables)
+        failed = failed or bool(problems)
+        print(f"{'FAIL' if problems else 'ok  '} {name}")
+        for line in plan:
+            print(f"       {line}")
+        for problem in problems:
+            print(f"       -> {problem}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Latency of an ordinary authenticated endpoint (GET /api/v1/fields/) while a
+burst of logins arrives at once, with bcrypt run in the request threadpool
+(PASSWORD_HASH_WORKERS=0, how logins were served before the hashing pool)
+and on the password hashing process pool.
+
+Each mode starts its own uvicorn server on a throwaway SQLite database. A
+probe thread requests the endpoint back to back, first alone (idle) and then
+during the login storm; p50/p99/max of the probe are reported for both.
+
+Usage (from backend/, with the backend .env variables set since app settings are loaded):
+    python -m benchmarks.login_storm [--logins 100] [--workers N]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+PASSWORD = "field-worker-password"
+IDLE_SECONDS = 3.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(database_url: str, logins: int):
+    """Schema, one user per login (shared hash: one bcrypt run) and a few fields for the probe user."""
+    os.environ["DATABASE_URL"] = database_url
+    from app.core.security import get_password_hash
+    from app.db import base, models
+
+    base.Base.metadata.create_all(bind=base.engine)
+    hashed_password = get_password_hash(PASSWORD)
+    db = base.SessionLocal()
+    try:
+        users = [models.User(username=f"worker{i}", hashed_password=hashed_password) for i in range(logins)]
+        db.add_all(users)
+        db.flush()
+        db.add_all([models.Field(name=f"field {i}", owner_id=users[0].id) for i in range(20)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))]
+
+
+def request(port: int, method: str, path: str, body: str = None, headers: dict = None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def login(port: int, username: str):
+    return request(
+        port, "POST", "/api/v1/token",
+        body=urlencode({"username": username, "password": PASSWORD}),
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+
+class Probe(threading.Thread):
+    """Requests the probe endpoint back to back, recording each latency under the current phase."""
+
+    def __init__(self, port: int, token: str):
+        super().__init__(daemon=True)
+        self.port = port
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.phase = "idle"
+        self.latencies = {"idle": [], "storm": []}
+        self.errors = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+        while not self.stopped.is_set():
+            phase = self.phase
+            started = time.perf_counter()
+            connection.request("GET", "/api/v1/fields/", headers=self.headers)
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - started
+            if response.status == 200:
+                self.latencies[phase].append(elapsed)
+            else:
+                self.errors += 1
+        connection.close()
+
+
+def run_mode(name: str, env: dict, logins: int) -> dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                request(port, "GET", "/")
+                break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError(f"{name}: server did not start")
+                time.sleep(0.2)
+
+        status, body = login(port, "worker0")
+        if status != 200:
+            raise RuntimeError(f"{name}: probe login failed ({status}): {body[:200]}")
+        probe = Probe(port, json.loads(body)["access_token"])
+        probe.start()
+        time.sleep(IDLE_SECONDS)
+
+        probe.phase = "storm"
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=logins) as executor:
+            statuses = list(executor.map(lambda i: login(port, f"worker{i}")[0], range(logins)))
+        storm_seconds = time.perf_counter() - started
+        probe.stopped.set()
+        probe.join()
+        return {
+            "mode": name,
+            "storm_seconds": storm_seconds,
+            "logins_ok": statuses.count(200),
+            "logins_503": statuses.count(503),
+            "probe_errors": probe.errors,
+            **{
+                f"{phase}_{label}": percentile(values, fraction) * 1000 if values else float("nan")
+                for phase, values in probe.latencies.items()
+                for label, fraction in (("p50", 0.5), ("p99", 0.99), ("max", 1.0))
+            },
+            "storm_requests": len(probe.latencies["storm"]),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100, help="Simultaneous logins in the storm")
+    parser.add_argument("--workers", type=int, help="Hashing pool size (default: the PASSWORD_HASH_WORKERS default)")
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{tempfile.mkdtemp(prefix='login_storm_')}/login_storm.db"
+    seed(database_url, args.logins)
+    base_env = {**os.environ, "DATABASE_URL": database_url, "PASSWORD_HASH_MAX_PENDING": str(args.logins * 2)}
+    pool_env = dict(base_env)
+    if args.workers:
+        pool_env["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    results = [
+        run_mode("threadpool (before)", {**base_env, "PASSWORD_HASH_WORKERS": "0"}, args.logins),
+        run_mode("process pool", pool_env, args.logins),
+    ]
+
+    print(f"{args.logins} simultaneous logins, {os.cpu_count()} CPUs; probe: GET /api/v1/fields/ (ms)")
+    print(f"{'mode':<22}{'idle p50':>10}{'idle p99':>10}{'storm p50':>11}{'storm p99':>11}{'storm max':>11}{'storm s':>9}{'ok':>5}{'503':>5}")
+    for result in results:
+        print(
+            f"{result['mode']:<22}{result['idle_p50']:>10.1f}{result['idle_p99']:>10.1f}"
+            f"{result['storm_p50']:>11.1f}{result['storm_p99']:>11.1f}{result['storm_max']:>11.1f}"
+            f"{result['storm_seconds']:>9.1f}{result['logins_ok']:>5}{result['logins_503']:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Count the SQL queries each read endpoint issues, for a small and a large
+number of photo groups. Every endpoint must run a fixed number of queries
+whatever the result count (no N+1 lazy loads); the script exits with status 1
+if a count grows with the data. Endpoints with ETags are also measured with
+the If-None-Match of their first response, which must get 304.
+
+A throwaway SQLite database is used (DATABASE_URL is overridden), so this
+needs aiosqlite but no running services.
+
+Usage (from backend/, with the backend .env variables set since app settings are loaded):
+    python -m benchmarks.query_counts [--small 3 --large 60]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="query_counts_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/query_counts.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+# Every request then resolves its user from the database, so runs compare like for like
+os.environ["USER_CACHE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.analysis import heatmap
+from app.core.security import create_access_token
+from app.crud import crud_analysis_result
+from app.db import base, models
+from app.main import app
+
+FIELDS = 3
+START = date(2026, 6, 1)
+# Endpoints answering If-None-Match with 304
+CONDITIONAL = ("field results", "analysis result")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        for engine in (base.engine, base.get_async_engine().sync_engine):
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+
+def seed(groups_per_field: int) -> dict:
+    base.Base.metadata.drop_all(bind=base.engine)
+    base.Base.metadata.create_all(bind=base.engine)
+    db = base.SessionLocal()
+    try:
+        user = models.User(username="bench", hashed_password="x")
+        db.add(user)
+        db.flush()
+        fields = [models.Field(name=f"field {i}", owner_id=user.id) for i in range(FIELDS)]
+        db.add_all(fields)
+        db.flush()
+        for field in fields:
+            for i in range(groups_per_field):
+                photo_group = models.PhotoGroup(
+                    field_id=field.id,
+                    capture_date=START + timedelta(days=i % 30),
+                    drone_photo_path="d.jpg",
+                    side_photo_05m_path="s.jpg",
+                    side_photo_3m_horizontal_path="h.jpg",
+                    side_photo_3m_vertical_path="v.jpg",
+                    analysis_status=models.AnalysisStatusEnum.COMPLETED,
+                )
+                photo_group.analysis_result = models.AnalysisResult(coverage=50.0 + i, avg_plant_height=60.0 + i)
+                db.add(photo_group)
+        db.commit()
+        crud_analysis_result.rebuild_field_period_stats(db, [field.id for field in fields])
+        return {"field_id": fields[0].id, "result_id": db.query(models.AnalysisResult.id).first()[0]}
+    finally:
+        db.close()
+
+
+def endpoint_urls(ids: dict) -> dict:
+    field_id, result_id = ids["field_id"], ids["result_id"]
+    return {
+        "fields": "/api/v1/fields/",
+        "field results": f"/api/v1/fields/{field_id}/results",
+        "analysis result": f"/api/v1/analysis/results/{result_id}",
+        "inter-field comparison": f"/api/v1/analysis/inter-field-comparison/?period_date={START + timedelta(days=5)}",
+        "inter-field summary": f"/api/v1/analysis/inter-field-comparison/summary/?period_date={START + timedelta(days=5)}",
+        "growth heatmap": f"/api/v1/analysis/growth-heatmap/{field_id}",
+        "regional differences": f"/api/v1/analysis/regional-differences/{field_id}",
+    }
+
+
+def measure(client: TestClient, counter: QueryCounter, groups_per_field: int) -> dict:
+    urls = endpoint_urls(seed(groups_per_field))
+    # Both runs seed field 1 at the same results_version: build heatmaps afresh
+    heatmap.get_heatmap_cache.cache_clear()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+    counts = {}
+    for name, url in urls.items():
+        counter.count = 0
+        response = client.get(url, headers=headers)
+        response.raise_for_status()
+        counts[name] = counter.count
+        if name in CONDITIONAL:
+            counter.count = 0
+            revalidation = client.get(url, headers={**headers, "If-None-Match": response.headers["ETag"]})
+            if revalidation.status_code != 304:
+                raise SystemExit(f"{name}: expected 304 for a matching If-None-Match, got {revalidation.status_code}")
+            counts[f"{name} (304)"] = counter.count
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--small", type=int, default=3, help="photo groups per field in the small run")
+    parser.add_argument("--large", type=int, default=60, help="photo groups per field in the large run")
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    counter = QueryCounter()
+    small = measure(client, counter, args.small)
+    large = measure(client, counter, args.large)
+
+    print(f"{'endpoint':<24}{args.small:>8} groups{args.large:>8} groups")
+    failed = []
+    for name in small:
+        marker = "" if small[name] == large[name] else "  <-- grows with the data"
+        print(f"{name:<24}{small[name]:>15}{large[name]:>15}{marker}")
+        if marker:
+            failed.append(name)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark the statistics of the regional-differences endpoint: the legacy
+per-element Python loops (O(n^2) standard deviation) vs the NumPy
+implementation in app.analysis.field_statistics, then the whole endpoint
+for one field with --results results (regional statistics overall and per dekad).
+
+The legacy code is only run up to --legacy-max values (its cost grows with
+the square of the count); larger sizes are reported as skipped. A throwaway
+SQLite database is used for the endpoint (DATABASE_URL is overridden).
+
+Usage (from backend/, with the backend .env variables set since app settings are loaded):
+    python -m benchmarks.regional_stats [--results 100000] [--legacy-max 10000]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="regional_stats_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/regional_stats.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.analysis import field_statistics
+from app.core.security import create_access_token
+from app.db import base, models
+from app.main import app
+
+REGIONS = ["northeast", "northwest", "southeast", "southwest"]
+START = date(2026, 5, 1)
+
+
+def legacy_stats(values: list) -> dict:
+    """Copy of the pre-NumPy statistics of get_regional_differences."""
+    regions = {name: {"values": [], "count": 0} for name in REGIONS}
+    for value in values:
+        if value:
+            selected_region = random.choice(list(regions.keys()))
+            regions[selected_region]["values"].append(value)
+            regions[selected_region]["count"] += 1
+    regional_stats = {}
+    for region_name, data in regions.items():
+        values_ = data["values"]
+        if data["count"] > 0:
+            regional_stats[region_name] = {
+                "average": round(sum(values_) / len(values_), 2),
+                "min": round(min(values_), 2),
+                "max": round(max(values_), 2),
+                "std_dev": round((sum((x - sum(values_) / len(values_)) ** 2 for x in values_) / len(values_)) ** 0.5, 2) if len(values_) > 1 else 0,
+                "count": data["count"],
+            }
+    all_values = [value for data in regions.values() for value in data["values"]]
+    overall_stats = {
+        "average": round(sum(all_values) / len(all_values), 2),
+        "min": round(min(all_values), 2),
+        "max": round(max(all_values), 2),
+        "std_dev": round((sum((x - sum(all_values) / len(all_values)) ** 2 for x in all_values) / len(all_values)) ** 0.5, 2) if len(all_values) > 1 else 0,
+        "count": len(all_values),
+    }
+    return {"regional_stats": regional_stats, "overall_stats": overall_stats}
+
+
+def numpy_stats(values: list) -> dict:
+    array = field_statistics.non_zero_values(values)
+    labels = np.random.default_rng().integers(len(REGIONS), size=array.size)
+    return {
+        "regional_stats": field_statistics.describe_groups(array, labels, REGIONS),
+        "overall_stats": field_statistics.describe(array),
+    }
+
+
+def timed(function, *args, **kwargs) -> tuple:
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def seed(results: int) -> int:
+    base.Base.metadata.create_all(bind=base.engine)
+    rng = np.random.default_rng(0)
+    heights = rng.normal(80.0, 12.0, size=results)
+    with base.engine.begin() as connection:
+        connection.execute(insert(models.User), [{"id": 1, "username": "bench", "hashed_password": "x"}])
+        connection.execute(insert(models.Field), [{"id": 1, "name": "field", "owner_id": 1}])
+        connection.execute(insert(models.PhotoGroup), [
+            {
+                "id": i + 1,
+                "field_id": 1,
+                "capture_date": START + timedelta(days=i % 150),
+                "drone_photo_path": "d.jpg",
+                "side_photo_05m_path": "s.jpg",
+                "side_photo_3m_horizontal_path": "h.jpg",
+                "side_photo_3m_vertical_path": "v.jpg",
+                "analysis_status": models.AnalysisStatusEnum.COMPLETED,
+            }
+            for i in range(results)
+        ])
+        connection.execute(insert(models.AnalysisResult), [
+            {"id": i + 1, "photo_group_id": i + 1, "avg_plant_height": float(heights[i])} for i in range(results)
+        ])
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=100_000, help="results of the field in the endpoint run")
+    parser.add_argument("--legacy-max", type=int, default=10_000, help="largest size the legacy code is run on")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    numpy_stats([1.0])  # first-call overhead (imports, allocator) out of the timings
+    print(f"{'values':>8}{'legacy s':>12}{'numpy s':>12}  overall stats agree")
+    for size in sorted({1_000, 10_000, args.results}):
+        values = [float(value) for value in rng.normal(80.0, 12.0, size=size)]
+        numpy_seconds, new = timed(numpy_stats, values)
+        if size <= args.legacy_max:
+            legacy_seconds, old = timed(legacy_stats, values)
+            agree = all(old["overall_stats"][key] == new["overall_stats"][key] for key in old["overall_stats"])
+            print(f"{size:>8}{legacy_seconds:>12.4f}{numpy_seconds:>12.4f}  {agree}")
+        else:
+            print(f"{size:>8}{'skipped':>12}{numpy_seconds:>12.4f}")
+
+    field_id = seed(args.results)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+    url = f"/api/v1/analysis/regional-differences/{field_id}"
+    client.get(url, headers=headers).raise_for_status()
+    durations = []
+    for _ in range(5):
+        seconds, response = timed(client.get, url, headers=headers)
+        response.raise_for_status()
+        durations.append(seconds)
+    body = response.json()
+    overall = body["overall_stats"]
+    print(f"\nGET {url} with {args.results} results: median {statistics.median(durations) * 1000:.0f} ms over 5 requests")
+    print(f"overall: {overall}")
+    dekad_count = sum(dekad["overall_stats"]["count"] for dekad in body["dekad_stats"])
+    print(f"{len(body['dekad_stats'])} dekads, counts add up to the overall count: {dekad_count == overall['count']}")
+
+
+if __name__ == "__main__":
+    main()
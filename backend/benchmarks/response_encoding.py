@@ -0,0 +1,123 @@
+"""
+Benchmark the encodings of large analysis responses (app/api/v1/encoding.py):
+encoding time (serialization plus compression) and bytes on the wire of
+
+- FastAPI's default JSON rendering (jsonable_encoder + json.dumps),
+- orjson, and
+- the columnar msgpack encoding,
+
+each uncompressed, gzip and brotli at the configured levels, for a season of
+growth-heatmap frames and a page of inter-field comparison results.
+
+Usage (from backend/, with the backend .env variables set since app settings are loaded):
+    python -m benchmarks.response_encoding [--frames 36] [--size 100] [--results 1000]
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from app.analysis.heatmap import Heatmap
+from app.api.v1 import encoding
+from app.schemas import analysis_result as ar_schema
+
+START = date(2026, 5, 1)
+CODINGS = (None, "gzip", "br")
+
+
+def season_heatmap(frames: int, size: int) -> Heatmap:
+    """Smooth per-cell coverage with noise, drifting upwards over the season."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size] / size
+    base = 40 + 20 * np.sin(3 * x) * np.cos(2 * y)
+    values = np.stack([base + 1.5 * frame + rng.normal(0, 2, (size, size)) for frame in range(frames)]).astype(np.float32)
+    return Heatmap(dates=[START + timedelta(days=5 * frame) for frame in range(frames)], spatial=[True] * frames, values=values)
+
+
+def heatmap_payloads(field_heatmap: Heatmap) -> dict:
+    description = {"field_id": 1, "indicator": "coverage", "rows": field_heatmap.values.shape[1], "cols": field_heatmap.values.shape[2]}
+    return {
+        "json": lambda: {**description, "frames": field_heatmap.frames()},
+        "columnar": lambda: {
+            **description,
+            "capture_dates": [capture_date.isoformat() for capture_date in field_heatmap.dates],
+            "spatial": field_heatmap.spatial,
+            "values": encoding.fixed_point(field_heatmap.values, 2),
+        },
+    }
+
+
+def comparison_payloads(count: int) -> dict:
+    rng = np.random.default_rng(0)
+    results = [
+        ar_schema.AnalysisResult(
+            id=i + 1,
+            photo_group_id=i + 1,
+            coverage=float(rng.uniform(20, 95)),
+            avg_plant_height=float(rng.normal(80, 12)),
+            height_std_dev=float(rng.uniform(2, 9)),
+            canopy_color_index=float(rng.uniform(0.9, 1.6)),
+            uniformity_index=float(rng.uniform(0.05, 0.4)),
+            lodging_status="none",
+            notes="Gemini analysis completed.",
+            photo_group={
+                "id": i + 1,
+                "field_id": i % 40 + 1,
+                "capture_date": START + timedelta(days=i % 10),
+                "drone_photo_path": f"blobs/{i:064x}.jpg",
+                "side_photo_05m_path": f"blobs/{i + 1:064x}.jpg",
+                "side_photo_3m_horizontal_path": f"blobs/{i + 2:064x}.jpg",
+                "side_photo_3m_vertical_path": f"blobs/{i + 3:064x}.jpg",
+                "analysis_status": "COMPLETED",
+            },
+        )
+        for i in range(count)
+    ]
+    return {
+        "default": lambda: results,
+        "json": lambda: encoding.dump_models(ar_schema.AnalysisResult, results),
+        "columnar": lambda: encoding.columns(encoding.dump_models(ar_schema.AnalysisResult, results)),
+    }
+
+
+def fastapi_default(content) -> bytes:
+    """What a response_model endpoint returning `content` renders (JSONResponse.render)."""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def run(name: str, payloads: dict, repeats: int):
+    encoders = {
+        "FastAPI JSON": lambda: fastapi_default(payloads.get("default", payloads["json"])()),
+        "orjson": lambda: encoding.encode_json(payloads["json"]()),
+        "msgpack columnar": lambda: encoding.encode_msgpack(payloads["columnar"]()),
+    }
+    print(f"\n{name}")
+    print(f"{'encoding':<18}{'coding':<9}{'ms':>9}{'bytes':>12}")
+    for label, encode in encoders.items():
+        for coding in CODINGS:
+            durations = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                body = encoding.compress(encode(), coding)
+                durations.append(time.perf_counter() - started)
+            print(f"{label:<18}{coding or 'identity':<9}{statistics.median(durations) * 1000:>9.1f}{len(body):>12,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=36, help="heatmap frames (captures in the season)")
+    parser.add_argument("--size", type=int, default=100, help="heatmap cells per side")
+    parser.add_argument("--results", type=int, default=1000, help="results in the comparison page")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    run(f"growth heatmap: {args.frames} frames of {args.size}x{args.size}", heatmap_payloads(season_heatmap(args.frames, args.size)), args.repeats)
+    run(f"inter-field comparison: {args.results} results", comparison_payloads(args.results), args.repeats)
+
+
+if __name__ == "__main__":
+    main()
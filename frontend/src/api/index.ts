@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { decode } from './msgpack';
 
 const apiClient = axios.create({
     baseURL: '/api/v1',
@@ -15,4 +16,28 @@ apiClient.interceptors.request.use(config => {
     return Promise.reject(error);
 });
 
+// List endpoints are paginated: the X-Next-Cursor response header holds the
+// cursor of the next page. Fetches every page and concatenates them.
+export async function getAllPages<T>(url: string, params: Record<string, unknown> = {}): Promise<T[]> {
+    const items: T[] = [];
+    let cursor: string | undefined;
+    do {
+        const response = await apiClient.get<T[]>(url, { params: { ...params, limit: 1000, cursor } });
+        items.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return items;
+}
+
+// Analysis endpoints that offer it send a columnar msgpack body instead of
+// JSON: numeric columns and grids arrive as binary arrays (see msgpack.ts).
+export async function getColumnar<T>(url: string, params: Record<string, unknown> = {}): Promise<T> {
+    const response = await apiClient.get<ArrayBuffer>(url, {
+        params,
+        responseType: 'arraybuffer',
+        headers: { Accept: 'application/msgpack' },
+    });
+    return decode<T>(response.data);
+}
+
 export default apiClient;
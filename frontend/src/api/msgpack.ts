@@ -0,0 +1,120 @@
+// Minimal MessagePack decoder for the columnar analysis responses
+// (backend/app/api/v1/encoding.py). Only decoding is needed; extension types
+// are not used by the backend and are rejected.
+
+const textDecoder = new TextDecoder();
+
+class Reader {
+    private view: DataView;
+    private offset = 0;
+
+    constructor(private bytes: Uint8Array) {
+        this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    }
+
+    private take(length: number): Uint8Array {
+        if (this.offset + length > this.bytes.byteLength) {
+            throw new Error('msgpack: unexpected end of data');
+        }
+        const slice = this.bytes.subarray(this.offset, this.offset + length);
+        this.offset += length;
+        return slice;
+    }
+
+    private uint(size: 1 | 2 | 4 | 8): number {
+        const offset = this.offset;
+        this.take(size);
+        switch (size) {
+            case 1: return this.view.getUint8(offset);
+            case 2: return this.view.getUint16(offset);
+            case 4: return this.view.getUint32(offset);
+            default: return Number(this.view.getBigUint64(offset));
+        }
+    }
+
+    private int(size: 1 | 2 | 4 | 8): number {
+        const offset = this.offset;
+        this.take(size);
+        switch (size) {
+            case 1: return this.view.getInt8(offset);
+            case 2: return this.view.getInt16(offset);
+            case 4: return this.view.getInt32(offset);
+            default: return Number(this.view.getBigInt64(offset));
+        }
+    }
+
+    private float(size: 4 | 8): number {
+        const offset = this.offset;
+        this.take(size);
+        return size === 4 ? this.view.getFloat32(offset) : this.view.getFloat64(offset);
+    }
+
+    private str(length: number): string {
+        return textDecoder.decode(this.take(length));
+    }
+
+    private array(length: number): unknown[] {
+        const items = new Array(length);
+        for (let i = 0; i < length; i++) items[i] = this.value();
+        return items;
+    }
+
+    private map(length: number): Record<string, unknown> {
+        const entries: Record<string, unknown> = {};
+        for (let i = 0; i < length; i++) {
+            const key = this.value();
+            entries[String(key)] = this.value();
+        }
+        return entries;
+    }
+
+    value(): unknown {
+        const type = this.uint(1);
+        if (type <= 0x7f) return type;
+        if (type >= 0xe0) return type - 0x100;
+        if (type >= 0x80 && type <= 0x8f) return this.map(type & 0x0f);
+        if (type >= 0x90 && type <= 0x9f) return this.array(type & 0x0f);
+        if (type >= 0xa0 && type <= 0xbf) return this.str(type & 0x1f);
+        switch (type) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            // bin: a view into the response buffer, see int32Array/float64Array
+            case 0xc4: return this.take(this.uint(1));
+            case 0xc5: return this.take(this.uint(2));
+            case 0xc6: return this.take(this.uint(4));
+            case 0xca: return this.float(4);
+            case 0xcb: return this.float(8);
+            case 0xcc: return this.uint(1);
+            case 0xcd: return this.uint(2);
+            case 0xce: return this.uint(4);
+            case 0xcf: return this.uint(8);
+            case 0xd0: return this.int(1);
+            case 0xd1: return this.int(2);
+            case 0xd2: return this.int(4);
+            case 0xd3: return this.int(8);
+            case 0xd9: return this.str(this.uint(1));
+            case 0xda: return this.str(this.uint(2));
+            case 0xdb: return this.str(this.uint(4));
+            case 0xdc: return this.array(this.uint(2));
+            case 0xdd: return this.array(this.uint(4));
+            case 0xde: return this.map(this.uint(2));
+            case 0xdf: return this.map(this.uint(4));
+            default: throw new Error(`msgpack: unsupported type 0x${type.toString(16)}`);
+        }
+    }
+}
+
+export function decode<T>(buffer: ArrayBuffer): T {
+    return new Reader(new Uint8Array(buffer)).value() as T;
+}
+
+// Typed views of the little-endian arrays packed as bin values. The bytes
+// are copied first: a bin inside the response is not necessarily aligned.
+export function int32Array(bytes: Uint8Array): Int32Array {
+    return new Int32Array(bytes.slice().buffer);
+}
+
+export function float64Array(bytes: Uint8Array): Float64Array {
+    return new Float64Array(bytes.slice().buffer);
+}